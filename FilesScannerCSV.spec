@@ -1,4 +1,9 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# Профиль быстрого запуска: MAV_UTILS_ONEDIR=1 собирает каталог вместо одного файла,
+# что избавляет от распаковки во временный каталог при каждом запуске
+ONEDIR = os.environ.get("MAV_UTILS_ONEDIR") == "1"
 
 
 a = Analysis(
@@ -10,23 +15,20 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Сканер не работает с изображениями
+    excludes=["PIL", "numpy", "unittest", "pydoc", "xmlrpc"],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
+exe_options = dict(
     name='FilesScannerCSV',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX замедляет запуск: каждая библиотека распаковывается при загрузке
+    upx=not ONEDIR,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=True,
@@ -36,3 +38,9 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if ONEDIR:
+    exe = EXE(pyz, a.scripts, [], exclude_binaries=True, **exe_options)
+    coll = COLLECT(exe, a.binaries, a.datas, strip=False, upx=False, upx_exclude=[], name='FilesScannerCSV')
+else:
+    exe = EXE(pyz, a.scripts, a.binaries, a.datas, [], **exe_options)
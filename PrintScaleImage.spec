@@ -1,4 +1,27 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# Профиль быстрого запуска: MAV_UTILS_ONEDIR=1 собирает каталог вместо одного файла,
+# что избавляет от распаковки во временный каталог при каждом запуске
+ONEDIR = os.environ.get("MAV_UTILS_ONEDIR") == "1"
+
+# Неиспользуемые плагины и модули PIL (читаются только JPEG, PNG, BMP и TIFF)
+PIL_EXCLUDES = [
+    f"PIL.{name}"
+    for name in (
+        "AvifImagePlugin", "BlpImagePlugin", "BufrStubImagePlugin", "CurImagePlugin", "DcxImagePlugin",
+        "DdsImagePlugin", "EpsImagePlugin", "FitsImagePlugin", "FliImagePlugin", "FpxImagePlugin",
+        "FtexImagePlugin", "GbrImagePlugin", "GifImagePlugin", "GribStubImagePlugin", "Hdf5StubImagePlugin",
+        "IcnsImagePlugin", "IcoImagePlugin", "ImImagePlugin", "ImtImagePlugin", "IptcImagePlugin",
+        "Jpeg2KImagePlugin", "McIdasImagePlugin", "MicImagePlugin", "MpegImagePlugin", "MspImagePlugin",
+        "PalmImagePlugin", "PcdImagePlugin", "PcxImagePlugin", "PdfImagePlugin", "PdfParser", "PixarImagePlugin",
+        "PpmImagePlugin", "PsdImagePlugin", "QoiImagePlugin", "SgiImagePlugin", "SpiderImagePlugin",
+        "SunImagePlugin", "TgaImagePlugin", "WebPImagePlugin", "WmfImagePlugin", "XVThumbImagePlugin",
+        "XbmImagePlugin", "XpmImagePlugin", "ImageCms", "ImageGrab", "ImageMorph", "ImageQt", "ImageShow",
+        "PSDraw", "_avif", "_imagingcms", "_imagingmorph", "_webp",
+    )
+]
+
 a = Analysis(
     ['src\\print_scale_images\\__main__.py'],
     pathex=[],
@@ -8,23 +31,19 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=PIL_EXCLUDES + ["numpy", "unittest", "pydoc", "xmlrpc"],
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
+exe_options = dict(
     name='PrintScaleImageA4',
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # UPX замедляет запуск: каждая библиотека распаковывается при загрузке
+    upx=not ONEDIR,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -34,4 +53,10 @@ exe = EXE(
     codesign_identity=None,
     entitlements_file=None,
     icon='resources\\print_scale_images.ico'
-)
\ No newline at end of file
+)
+
+if ONEDIR:
+    exe = EXE(pyz, a.scripts, [], exclude_binaries=True, **exe_options)
+    coll = COLLECT(exe, a.binaries, a.datas, strip=False, upx=False, upx_exclude=[], name='PrintScaleImageA4')
+else:
+    exe = EXE(pyz, a.scripts, a.binaries, a.datas, [], **exe_options)
@@ -0,0 +1,175 @@
+"""Benchmark CRC32 file hashing strategies
+
+Usage:
+    python scripts/benchmark_crc.py                          # 512 MB synthetic file
+    python scripts/benchmark_crc.py --file D:/archive/big.tif --repeat 3
+    python scripts/benchmark_crc.py --buffers 2 4 8 --buffer-size 256 1024 4096
+    python scripts/benchmark_crc.py --io-mode buffered stream direct
+    python scripts/benchmark_crc.py --json crc.json
+
+Strategies: "sequential" reads a chunk and hashes it in turn (the disk idles while the
+CPU hashes), "read-ahead" overlaps reads and hashing through a ring of buffers filled
+by a background thread (iter_read_ahead), "blocks" hashes ranges of the file in
+parallel and combines the CRCs (crc32_blocks). --io-mode runs each of them in the given
+reading modes (see src.utils.file_io) and reports how much of the file stayed in the cache.
+
+Before every run the file is evicted from the OS page cache with
+posix_fadvise(DONTNEED) where available, so reads come from the disk. Elsewhere
+(Windows, macOS) runs after the first are served from the cache and measure the
+hashing rather than the disk.
+"""
+
+import argparse
+import ctypes
+import json
+import mmap
+import os
+import platform
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.utils.crc import crc32_blocks, crc32_file  # noqa: E402
+from src.utils.file_io import IO_BUFFERED, IO_MODES  # noqa: E402
+from src.utils.files import iter_read_ahead  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def make_file(path: Path, size_mb: int) -> None:
+    """Incompressible test file"""
+    with path.open("wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(MB))
+        # Dirty pages can't be dropped from the cache: write them out first
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def evict(path: Path) -> bool:
+    """Drop the file from the OS page cache (False if not supported)"""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    with path.open("rb") as f:
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+    return True
+
+
+def cached_mb(path: Path) -> Optional[float]:
+    """How much of the file is in the OS page cache, MB (mincore, Linux only; None elsewhere)"""
+    if not sys.platform.startswith("linux") or path.stat().st_size == 0:
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        # A private mapping is writable for ctypes and is never touched, so no page is read in
+        with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) as mapped:
+            vector = (ctypes.c_ubyte * -(-len(mapped) // mmap.PAGESIZE))()
+            address = ctypes.addressof((ctypes.c_char * len(mapped)).from_buffer(mapped))
+            result = libc.mincore(ctypes.c_void_p(address), ctypes.c_size_t(len(mapped)), vector)
+    except (OSError, AttributeError):
+        return None
+    if result != 0:
+        return None
+    return sum(page & 1 for page in vector) * mmap.PAGESIZE / MB
+
+
+def crc32_read_ahead(path: Path, buffer_count: int, buffer_size: int, io_mode: str) -> int:
+    crc = 0
+    for chunk in iter_read_ahead(path, buffer_count, buffer_size, io_mode):
+        crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def measure(path: Path, run: Callable[[], int], repeat: int) -> tuple[float, int, bool]:
+    """Best wall time of repeat runs, the CRC and whether the cache was dropped"""
+    best, crc, cold = float("inf"), 0, False
+    for _ in range(repeat):
+        cold = evict(path)
+        start = time.perf_counter()
+        crc = run()
+        best = min(best, time.perf_counter() - start)
+    return best, crc, cold
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark CRC32 file hashing strategies")
+    parser.add_argument("--file", help="hash this file instead of a synthetic one")
+    parser.add_argument("--size", type=int, default=512, help="synthetic file size, MB (default 512)")
+    parser.add_argument("--buffers", type=int, nargs="+", default=[2, 4, 8], help="read-ahead buffer counts")
+    parser.add_argument(
+        "--buffer-size", type=int, nargs="+", default=[1024], help="read-ahead buffer sizes, KB (default 1024)"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 1], help="block hashing threads")
+    parser.add_argument(
+        "--io-mode", nargs="+", choices=IO_MODES, default=[IO_BUFFERED], help="reading modes (default buffered)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per strategy, the best is reported (default 3)")
+    parser.add_argument("--json", help="save results to a JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.file:
+            path = Path(args.file)
+        else:
+            path = Path(temp_dir) / "crc_benchmark.bin"
+            make_file(path, args.size)
+        size = path.stat().st_size
+
+        strategies: dict[str, Callable[[], int]] = {}
+        for mode in args.io_mode:
+            suffix = "" if mode == IO_BUFFERED else f" [{mode}]"
+            strategies[f"sequential{suffix}"] = lambda mode=mode: crc32_file(path, io_mode=mode)
+            for buffer_count in args.buffers:
+                for buffer_kb in args.buffer_size:
+                    strategies[f"read-ahead {buffer_count}x{buffer_kb}KB{suffix}"] = (
+                        lambda count=buffer_count, kb=buffer_kb, mode=mode: crc32_read_ahead(
+                            path, count, kb * 1024, mode
+                        )
+                    )
+            for workers in args.workers:
+                strategies[f"blocks {workers} threads{suffix}"] = lambda workers=workers, mode=mode: crc32_blocks(
+                    path, workers=workers, io_mode=mode
+                ).crc32
+
+        results = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "file_mb": round(size / MB, 1),
+            "strategies": {},
+        }
+        reference = None
+        for name, run in strategies.items():
+            seconds, crc, cold = measure(path, run, args.repeat)
+            if reference is None:
+                reference = crc
+            elif crc != reference:
+                print(f"{name:<37} CRC mismatch: {crc:08X} != {reference:08X}")  # noqa: T201
+                return 1
+
+            left = cached_mb(path)
+            results["strategies"][name] = {
+                "seconds": seconds,
+                "mb_per_s": size / MB / seconds,
+                "cold": cold,
+                "cached_mb_after": left,
+            }
+            print(  # noqa: T201
+                f"{name:<37} {seconds:7.3f}s  {size / MB / seconds:8.1f} MB/s  {'cold' if cold else 'cached'}"
+                + ("" if left is None else f"  left in cache {left:.0f} MB")
+            )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=4), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,380 @@
+"""Benchmark the print_scale_images pipeline on synthetic inputs
+
+Usage:
+    python scripts/benchmark_pipeline.py                              # all scenarios, PDF export
+    python scripts/benchmark_pipeline.py --scenario huge_bilevel_tiff --format tif
+    python scripts/benchmark_pipeline.py --json bench.json --tracemalloc
+    python scripts/benchmark_pipeline.py --baseline bench.json        # exit code 1 on regression
+
+Each scenario runs headlessly in a fresh process, so peak RSS is measured per
+scenario. Stages are timed separately: "process" (open, decode and scale with
+A4ImageProcessor), "caption" (CaptionBuilder.add_caption, raster mode only) and
+"export" (exporter time, excluding the upstream pages it waits for).
+
+With --tracemalloc every scenario is run once more with tracemalloc enabled and
+the top allocators at the traced peak are reported. Pillow allocates pixel
+buffers outside the Python allocator, so they show up in peak RSS only.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+from pathlib import Path
+from typing import Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from PIL import Image, ImageDraw, features  # noqa: E402
+
+from src.print_scale_images.config import ImageConfig  # noqa: E402
+from src.print_scale_images.handlers.caption_builder import CaptionBuilder  # noqa: E402
+from src.print_scale_images.handlers.exporters import create_exporter  # noqa: E402
+from src.print_scale_images.handlers.image_processor import (  # noqa: E402
+    A4ImageProcessor,
+)
+
+# Сценарий -> (тип входных файлов, количество при --scale 1)
+SCENARIOS = {
+    "small_jpeg": (("small_jpeg", 40),),
+    "huge_bilevel_tiff": (("huge_bilevel_tiff", 3),),
+    "cmyk": (("cmyk_jpeg", 10),),
+    "mixed": (("small_jpeg", 10), ("huge_bilevel_tiff", 1), ("cmyk_jpeg", 4)),
+}
+
+# Сколько мест выделения памяти выводить для tracemalloc
+TRACEMALLOC_TOP = 10
+
+# Выделения памяти импортом модулей и чтением исходников не относятся к конвейеру
+TRACEMALLOC_IGNORE = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "*/linecache.py")
+
+
+def make_small_jpeg(path: Path) -> None:
+    """Photo-like RGB JPEG, 1600x1200"""
+    size = (1600, 1200)
+    channels = [
+        Image.linear_gradient("L").resize(size),
+        Image.effect_noise(size, 48),
+        Image.radial_gradient("L").resize(size),
+    ]
+    Image.merge("RGB", channels).save(path, "JPEG", quality=90)
+
+
+def make_huge_bilevel_tiff(path: Path) -> None:
+    """A0 drawing at 300 dpi (14043x9933), bilevel, CCITT G4 in strips"""
+    image = Image.new("1", (14043, 9933), 1)
+    draw = ImageDraw.Draw(image)
+    for x in range(0, image.width, 250):
+        draw.line((x, 0, x, image.height), fill=0, width=3)
+    for y in range(0, image.height, 250):
+        draw.line((0, y, image.width, y), fill=0, width=3)
+    for offset in range(0, image.width, 700):
+        draw.ellipse((offset, offset % image.height, offset + 600, offset % image.height + 600), outline=0, width=5)
+    compression = "group4" if features.check("libtiff") else "packbits"
+    image.save(path, "TIFF", compression=compression, dpi=(300, 300))
+
+
+def make_cmyk_jpeg(path: Path) -> None:
+    """Print-ready CMYK JPEG, 3000x2000"""
+    size = (3000, 2000)
+    channels = [
+        Image.linear_gradient("L").resize(size),
+        Image.radial_gradient("L").resize(size),
+        Image.effect_noise(size, 32),
+        Image.new("L", size, 20),
+    ]
+    Image.merge("CMYK", channels).save(path, "JPEG", quality=90)
+
+
+INPUT_MAKERS = {
+    "small_jpeg": (make_small_jpeg, ".jpg"),
+    "huge_bilevel_tiff": (make_huge_bilevel_tiff, ".tif"),
+    "cmyk_jpeg": (make_cmyk_jpeg, ".jpg"),
+}
+
+
+def prepare_inputs(data_dir: Path, scenario: str, scale: float) -> list[str]:
+    """Create (or reuse) the synthetic inputs of a scenario"""
+    paths = []
+    for kind, count in SCENARIOS[scenario]:
+        maker, suffix = INPUT_MAKERS[kind]
+        for index in range(max(1, round(count * scale))):
+            path = data_dir / f"{kind}_{index:03d}{suffix}"
+            if not path.exists():
+                maker(path)
+            paths.append(str(path))
+    return paths
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of the current process, MB"""
+    if os.name == "nt":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / 2**20
+
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss - килобайты в Linux, байты в macOS
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+class StageTimer:
+    """Accumulates per-stage wall time and keeps the tracemalloc snapshot at the traced peak"""
+
+    def __init__(self, trace: bool):
+        self.stages: dict[str, list[float]] = {}
+        self.trace = trace
+        self.peak_traced = 0
+        self.peak_snapshot: tracemalloc.Snapshot | None = None
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages.setdefault(stage, []).append(seconds)
+        if self.trace:
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.peak_traced:
+                self.peak_traced = current
+                self.peak_snapshot = tracemalloc.take_snapshot()
+
+    def summary(self) -> dict:
+        return {
+            stage: {"total": sum(times), "mean": sum(times) / len(times), "max": max(times), "count": len(times)}
+            for stage, times in self.stages.items()
+        }
+
+
+def run_scenario(paths: list[str], config: ImageConfig, output_format: str, workers: int, trace: bool) -> dict:
+    """Run the pipeline on the inputs in this process and return the measurements"""
+    if trace:
+        tracemalloc.start(25)
+
+    processor = A4ImageProcessor()
+    caption_builder = CaptionBuilder()
+    timer = StageTimer(trace)
+    upstream = 0.0
+
+    def pages() -> Iterator:
+        nonlocal upstream
+        for path in paths:
+            started = time.perf_counter()
+            with Image.open(path) as image:
+                if config.pdf_mode == "vector":
+                    info = processor.layout(image, config)
+                    info.caption = caption_builder.generate_caption(path, info.scale_ratio)
+                else:
+                    info = processor.process(image, config)
+            info.original_path = path
+            processed = time.perf_counter()
+            timer.add("process", processed - started)
+
+            if info.a4_image is not None:
+                info.a4_image = caption_builder.add_caption(info.a4_image, path, info.scale_ratio, config)
+                timer.add("caption", time.perf_counter() - processed)
+
+            upstream += time.perf_counter() - started
+            yield info
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = str(Path(output_dir) / f"result.{output_format}")
+        started = time.perf_counter()
+        create_exporter(output_path, config, workers).export(pages(), output_path)
+        wall = time.perf_counter() - started
+
+    timer.stages["export"] = [wall - upstream]
+    result = {
+        "images": len(paths),
+        "input_mb": sum(Path(path).stat().st_size for path in paths) / 2**20,
+        "wall": wall,
+        "pages_per_s": len(paths) / wall,
+        "stages": timer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = (timer.peak_snapshot or tracemalloc.take_snapshot()).filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in TRACEMALLOC_IGNORE]
+        )
+        tracemalloc.stop()
+        result["tracemalloc"] = {
+            "peak_mb": peak / 2**20,
+            "top": [
+                {"where": str(stat.traceback[0]), "size_kb": stat.size / 2**10, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]
+            ],
+        }
+
+    return result
+
+
+def run_child(args: argparse.Namespace, scenario: str, data_dir: Path, trace: bool) -> dict:
+    """Run one scenario in a fresh interpreter so its peak RSS is not shared with other scenarios"""
+    command = [
+        sys.executable,
+        __file__,
+        "--child",
+        scenario,
+        "--data-dir",
+        str(data_dir),
+        "--scale",
+        str(args.scale),
+        "--format",
+        args.format,
+        "--pdf-mode",
+        args.pdf_mode,
+        "--workers",
+        str(args.workers),
+    ]
+    if trace:
+        command.append("--tracemalloc")
+
+    # Команда - интерпретатор и этот же скрипт с аргументами из argparse, без оболочки
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, check=False)  # noqa: S603
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def git_revision() -> str | None:
+    """Current commit of the working tree, if available"""
+    try:
+        # Постоянная команда без пользовательского ввода
+        completed = subprocess.run(  # noqa: S603
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=False  # noqa: S607
+        )
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """List the scenarios that got slower or bigger than the baseline by more than the tolerance"""
+    regressions = []
+    for scenario, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(scenario)
+        if previous is None:
+            continue
+
+        if current["pages_per_s"] < previous["pages_per_s"] * (1 - tolerance):
+            regressions.append(f"{scenario}: pages/s {previous['pages_per_s']:.2f} -> {current['pages_per_s']:.2f}")
+        if current["peak_rss_mb"] and previous.get("peak_rss_mb"):
+            if current["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario}: peak RSS {previous['peak_rss_mb']:.0f} MB -> {current['peak_rss_mb']:.0f} MB"
+                )
+    return regressions
+
+
+def print_result(scenario: str, result: dict) -> None:
+    """Print a one-scenario summary"""
+    stages = "  ".join(f"{stage} {values['total']:.2f}s" for stage, values in result["stages"].items())
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] else "n/a"
+    print(  # noqa: T201
+        f"{scenario:<18} {result['images']:>3} pages  {result['wall']:.2f}s  {result['pages_per_s']:.2f} pages/s  "
+        f"peak RSS {rss}  [{stages}]"
+    )
+    for stat in result.get("tracemalloc", {}).get("top", []):
+        print(f"{'':<18} {stat['size_kb']:>10.0f} KB  {stat['count']:>7}  {stat['where']}")  # noqa: T201
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the print_scale_images pipeline")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), help="scenarios to run (default all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the number of inputs (default 1)")
+    parser.add_argument("--format", default="pdf", choices=("pdf", "tif", "png", "jpg"), help="export format")
+    parser.add_argument("--pdf-mode", default="raster", choices=("raster", "vector"))
+    parser.add_argument("--workers", type=int, default=0, help="export encoding threads (0 - CPU count)")
+    parser.add_argument("--data-dir", help="keep the synthetic inputs in this directory between runs")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report top Python allocators")
+    parser.add_argument("--json", help="save results to a JSON file")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression (default 0.15)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    config = replace(ImageConfig(), pdf_mode=args.pdf_mode, cache_size_mb=0)
+
+    if args.child:
+        paths = prepare_inputs(Path(args.data_dir), args.child, args.scale)
+        result = run_scenario(paths, config, args.format, args.workers, args.tracemalloc)
+        print(json.dumps(result))  # noqa: T201
+        return 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = Path(args.data_dir or temp_dir)
+        data_dir.mkdir(parents=True, exist_ok=True)
+
+        results = {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pillow": Image.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "settings": {
+                "scale": args.scale,
+                "format": args.format,
+                "pdf_mode": args.pdf_mode,
+                "workers": args.workers,
+            },
+            "scenarios": {},
+        }
+
+        for scenario in args.scenario or SCENARIOS:
+            # Входные файлы создаются заранее, чтобы их генерация не попала в замеры
+            prepare_inputs(data_dir, scenario, args.scale)
+            try:
+                result = run_child(args, scenario, data_dir, trace=False)
+                if args.tracemalloc:
+                    result["tracemalloc"] = run_child(args, scenario, data_dir, trace=True)["tracemalloc"]
+            except RuntimeError as e:
+                print(f"{scenario:<18} failed: {e}")  # noqa: T201
+                continue
+
+            results["scenarios"][scenario] = result
+            print_result(scenario, result)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=4), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")  # noqa: T201
+        if regressions:
+            return 1
+
+    return 0 if results["scenarios"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Measure time-to-first-window for the bundled tools
+
+Usage:
+    python scripts/measure_startup.py                 # executables from dist/
+    python scripts/measure_startup.py --source        # python -m src.<module> from the source tree
+    python scripts/measure_startup.py --runs 10 --json startup.json
+
+Each tool is started with MAV_UTILS_STARTUP_PROBE pointing to a temp file; the
+tool writes a timestamp there once its first window is shown and exits.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.utils.startup import STARTUP_PROBE_ENV  # noqa: E402
+
+# Имя сборки PyInstaller -> модуль в исходниках
+TOOLS = {
+    "FilesScanner": "src.files_scanner",
+    "FilesScannerCSV": "src.files_scanner_csv",
+    "PrintScaleImageA4": "src.print_scale_images",
+}
+
+
+def find_executable(dist_dir: Path, name: str) -> Path | None:
+    """Find a one-file or one-dir build of the tool"""
+    suffix = ".exe" if os.name == "nt" else ""
+    for candidate in (dist_dir / f"{name}{suffix}", dist_dir / name / f"{name}{suffix}"):
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def measure_once(command: list[str], timeout: float) -> float:
+    """Start the tool once and return seconds until its first window appeared"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        probe_path = Path(temp_dir) / "probe.txt"
+        env = {**os.environ, STARTUP_PROBE_ENV: str(probe_path)}
+
+        started = time.time()
+        # The command is a built executable or sys.executable -m <module>, never run through a shell
+        subprocess.run(command, env=env, cwd=ROOT, timeout=timeout, check=False, capture_output=True)  # noqa: S603
+
+        if not probe_path.exists():
+            raise RuntimeError(f"no window was reported by: {' '.join(command)}")
+        return float(probe_path.read_text(encoding="utf-8")) - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure time-to-first-window of the tools")
+    parser.add_argument("--runs", type=int, default=5, help="runs per tool (default 5)")
+    parser.add_argument("--source", action="store_true", help="run from the source tree instead of dist/")
+    parser.add_argument("--dist", default=str(ROOT / "dist"), help="PyInstaller dist directory")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout per run, seconds")
+    parser.add_argument("--json", help="save results to a JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module in TOOLS.items():
+        if args.source:
+            command = [sys.executable, "-m", module]
+        else:
+            executable = find_executable(Path(args.dist), name)
+            if executable is None:
+                print(f"{name:<20} not built, skipped")  # noqa: T201
+                continue
+            command = [str(executable)]
+
+        try:
+            timings = [measure_once(command, args.timeout) for _ in range(args.runs)]
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{name:<20} failed: {e}")  # noqa: T201
+            continue
+
+        results[name] = {
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "max": max(timings),
+            "runs": timings,
+        }
+        print(  # noqa: T201
+            f"{name:<20} min {min(timings):.3f}s  median {statistics.median(timings):.3f}s  max {max(timings):.3f}s"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=4), encoding="utf-8")
+
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
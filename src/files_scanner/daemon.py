@@ -0,0 +1,250 @@
+"""Daemon mode: one full scan, then the report is kept up to date from filesystem change events
+
+    python -m src.files_scanner.daemon <folder> --output report.csv [--interval 60]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from src.files_scanner.scanner import (
+    process_file,
+    save_report,
+    scan_folder,
+    temp_report_path,
+)
+from src.utils import configure_logger
+from src.utils.file_io import IO_BUFFERED, IO_MODES
+from src.utils.files import natural_sort_key
+from src.utils.io_lanes import parse_lane_workers
+from src.utils.watcher import (
+    CREATED,
+    DELETED,
+    MODIFIED,
+    RESCAN,
+    DirectoryWatcher,
+    FileEvent,
+)
+
+
+class ReportDaemon:
+    """Keeps a scan report (CSV or scan database) of a folder up to date
+
+    The watcher is started before the initial scan, so nothing changed during the scan
+    is missed. Afterwards only created and modified files are re-hashed (and only if
+    their size or mtime actually changed), deleted files and folders are dropped, and
+    the report is rewritten atomically at most every `interval` seconds when it changed.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        output_file: str,
+        include_subfolders: bool = True,
+        interval: float = 60.0,
+        settle: float = 2.0,
+        use_inotify: bool = True,
+        io_mode: str = IO_BUFFERED,
+        lane_workers: Optional[dict[str, int]] = None,
+    ):
+        self.folder = str(Path(folder))
+        self.output_path = Path(output_file).resolve()
+        self.include_subfolders = include_subfolders
+        self.interval = interval
+        self.settle = settle
+        self.use_inotify = use_inotify
+        self.io_mode = io_mode
+        self.lane_workers = lane_workers
+
+        # path -> report row, path -> (size, mtime_ns) the row was computed for
+        self._entries: dict[str, dict] = {}
+        self._signatures: dict[str, tuple[int, int]] = {}
+        self._dirty = False
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Scan, write the report and keep it current until stop_event is set"""
+
+        with DirectoryWatcher(
+            self.folder,
+            recursive=self.include_subfolders,
+            settle=self.settle,
+            poll_interval=self.settle,
+            use_inotify=self.use_inotify,
+        ) as watcher:
+            self._full_scan()
+            self._write()
+            logger.info(f"Watching {self.folder} ({watcher.backend}), report every {self.interval:g}s if changed")
+
+            next_write = time.monotonic() + self.interval
+            try:
+                while stop_event is None or not stop_event.is_set():
+                    for event in watcher.poll(0.5):
+                        self._apply(event)
+                    if self._dirty and time.monotonic() >= next_write:
+                        self._write()
+                        next_write = time.monotonic() + self.interval
+            finally:
+                if self._dirty:
+                    self._write()
+
+    def _full_scan(self) -> None:
+        """Hash every file of the folder (initial scan)
+
+        Signatures are taken before hashing. A file whose signature changed by the time its
+        hash is ready was modified while it was read and is re-hashed right away: a signature
+        taken after hashing would match its change event and keep the stale row.
+        """
+
+        signatures = {str(file_path): self._signature(str(file_path)) for file_path in self._iter_files()}
+        files_data, _ = scan_folder(self.folder, self.include_subfolders, self.io_mode, self.lane_workers)
+        for file_data in files_data:
+            path = str(file_data["path"])
+            signature = signatures.get(path)
+            if signature is not None and signature == self._signature(path) and not self._is_report(path):
+                self._entries[path] = file_data
+                self._signatures[path] = signature
+            else:
+                self._update(path)
+
+    def _rescan(self) -> None:
+        """Reconcile with the folder after lost events: re-hash only what differs"""
+
+        logger.warning(f"Change events were lost, re-checking {self.folder}")
+        present = set()
+        for file_path in self._iter_files():
+            present.add(str(file_path))
+            self._update(str(file_path))
+        for path in [path for path in self._entries if path not in present]:
+            self._remove(path)
+
+    def _iter_files(self) -> Iterator[Path]:
+        """Files of the watched folder (with subfolders if enabled)"""
+
+        folder = Path(self.folder)
+        if not folder.is_dir():
+            return iter(())
+        files = folder.rglob("*") if self.include_subfolders else folder.iterdir()
+        return (file_path for file_path in files if file_path.is_file())
+
+    def _apply(self, event: FileEvent) -> None:
+        """Update the report rows for a settled change"""
+
+        if event.kind == RESCAN:
+            self._rescan()
+        elif event.kind == DELETED and event.is_dir:
+            prefix = event.path + os.sep
+            for path in [path for path in self._entries if path.startswith(prefix)]:
+                self._remove(path)
+        elif event.kind == DELETED:
+            self._remove(event.path)
+        elif event.kind in (CREATED, MODIFIED):
+            self._update(event.path)
+
+    def _update(self, path: str) -> None:
+        """Re-hash a file if its size or mtime changed"""
+
+        if self._is_report(path):
+            return
+        signature = self._signature(path)
+        if signature is None:
+            self._remove(path)
+            return
+        if self._signatures.get(path) == signature:
+            return
+
+        self._entries[path] = process_file(Path(path), self.io_mode)
+        self._signatures[path] = signature
+        self._dirty = True
+        logger.debug(f"Re-hashed: {path}")
+
+    def _remove(self, path: str) -> None:
+        if self._entries.pop(path, None) is not None:
+            self._signatures.pop(path, None)
+            self._dirty = True
+            logger.debug(f"Removed: {path}")
+
+    def _write(self) -> None:
+        """Rewrite the report atomically"""
+
+        files_data = [self._entries[path] for path in sorted(self._entries, key=natural_sort_key)]
+        if save_report(files_data, self.output_path, self.folder):
+            self._dirty = False
+
+    def _is_report(self, path: str) -> bool:
+        """The report (and its temporary file) may live inside the watched folder"""
+        resolved = Path(path).resolve()
+        return resolved in (self.output_path, temp_report_path(self.output_path))
+
+    @staticmethod
+    def _signature(path: str) -> Optional[tuple[int, int]]:
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Keep a CRC32 scan report of a folder up to date")
+    parser.add_argument("folder", help="Folder to scan and watch")
+    parser.add_argument("--output", "-o", required=True, help="Report file: .csv or a scan database (.db, .sqlite)")
+    parser.add_argument(
+        "--interval", type=float, default=60.0, help="Rewrite the report at most every N seconds (default 60)"
+    )
+    parser.add_argument("--no-subfolders", action="store_true", help="Do not scan subfolders")
+    parser.add_argument(
+        "--settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it is hashed"
+    )
+    parser.add_argument("--poll", action="store_true", help="Poll the folder instead of inotify (network shares)")
+    parser.add_argument(
+        "--io-mode",
+        choices=IO_MODES,
+        default=IO_BUFFERED,
+        help="Reading mode: buffered (default), stream - do not fill the OS page cache, direct - O_DIRECT",
+    )
+    parser.add_argument(
+        "--lane-workers",
+        action="append",
+        metavar="KIND=N",
+        help="Files hashed at once per device of a kind: hdd (default 1), ssd, network (default 4), unknown (1)",
+    )
+    args = parser.parse_args(argv)
+    try:
+        args.lane_workers = parse_lane_workers(args.lane_workers)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    if not Path(args.folder).is_dir():
+        logger.error(f"Folder does not exist: {args.folder}")
+        return 1
+
+    daemon = ReportDaemon(
+        args.folder,
+        args.output,
+        include_subfolders=not args.no_subfolders,
+        interval=args.interval,
+        settle=args.settle,
+        use_inotify=not args.poll,
+        io_mode=args.io_mode,
+        lane_workers=args.lane_workers,
+    )
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        logger.info("Stopped")
+    return 0
+
+
+if __name__ == "__main__":
+    configure_logger()
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Scan database commands
+
+    python -m src.files_scanner.db diff old.db new.db [--csv diff.csv]
+    python -m src.files_scanner.db export scan.db report.csv
+"""
+
+import argparse
+import sys
+import time
+from typing import Optional
+
+from loguru import logger
+
+from src.utils import configure_logger
+from src.utils.scan_db import ScanDiff, diff_scans, export_to_csv, write_diff_csv
+
+
+def print_diff(diff: ScanDiff) -> None:
+    """List the differences, one per line: + added, - removed, ~ changed, > moved"""
+    for path, size, crc32 in diff.added:
+        print(f"+ {path} ({size}, {crc32})")  # noqa: T201
+    for path, size, crc32 in diff.removed:
+        print(f"- {path} ({size}, {crc32})")  # noqa: T201
+    for path, old_size, old_crc32, size, crc32 in diff.changed:
+        print(f"~ {path} ({old_size}, {old_crc32} -> {size}, {crc32})")  # noqa: T201
+    for old_path, new_path, _, _ in diff.moved:
+        print(f"> {old_path} -> {new_path}")  # noqa: T201
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare and export scan databases")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    diff = commands.add_parser("diff", help="List added, removed, changed and moved files")
+    diff.add_argument("old", help="Earlier scan database")
+    diff.add_argument("new", help="Later scan database")
+    diff.add_argument("--csv", help="Save the differences to a CSV file instead of listing them")
+
+    export = commands.add_parser("export", help="Export a scan database to a CSV report")
+    export.add_argument("db", help="Scan database")
+    export.add_argument("output", help="CSV report file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Exit code as in diff(1): 0 - no differences (or export done), 1 - scans differ, 2 - error"""
+    args = parse_args(argv)
+
+    try:
+        if args.command == "export":
+            count = export_to_csv(args.db, args.output)
+            logger.success(f"Exported {count} files to: {args.output}")
+            return 0
+
+        start = time.perf_counter()
+        diff = diff_scans(args.old, args.new)
+        if args.csv:
+            write_diff_csv(diff, args.csv)
+        else:
+            print_diff(diff)
+    except Exception as e:
+        logger.error(f"Error: {e}")
+        return 2
+
+    logger.info(
+        f"Added: {len(diff.added)}, removed: {len(diff.removed)}, changed: {len(diff.changed)}, "
+        f"moved: {len(diff.moved)} ({time.perf_counter() - start:.2f}s)"
+    )
+    return 0 if diff.is_empty else 1
+
+
+if __name__ == "__main__":
+    configure_logger()
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Scanning and CSV report functions shared by the GUI and the daemon mode (no tkinter)"""
+
+import csv
+import os
+from pathlib import Path
+
+from loguru import logger
+
+from src.utils import calculate_crc32, get_file_date, get_file_size
+from src.utils.file_io import IO_BUFFERED
+from src.utils.io_lanes import DeviceLanes
+from src.utils.scan_db import is_scan_db, save_to_db
+
+
+def scan_folder(folder_path, include_subfolders=True, io_mode=IO_BUFFERED, lane_workers=None):
+    """Scan folder and collect file information
+
+    Files are hashed in one worker lane per device, lane_workers sets the workers per device
+    kind (see src.utils.io_lanes). io_mode selects how files are read (see src.utils.file_io).
+    """
+    files_data = []
+    total_files = 0
+
+    logger.info(f"Starting scan in folder: {folder_path}")
+    logger.info(f"Include subfolders: {include_subfolders}")
+
+    folder = Path(folder_path)
+    if not folder.exists():
+        logger.error(f"Folder does not exist: {folder_path}")
+        return files_data, total_files
+
+    # With subfolders using pathlib, or only the current folder
+    files = folder.rglob("*") if include_subfolders else folder.iterdir()
+    with DeviceLanes(lane_workers) as lanes:
+        # Every device lane works through its own files, results come in walk order
+        for file_path, file_data in lanes.map(process_file, (path for path in files if path.is_file()), io_mode):
+            files_data.append(file_data)
+            total_files += 1
+            logger.debug(f"Processed: {file_path.name}")
+
+            # Логируем прогресс каждые 100 файлов
+            if total_files % 100 == 0:
+                logger.info(f"Processed {total_files} files...")
+
+    logger.info(f"Scan completed. Total files: {total_files}")
+    return files_data, total_files
+
+
+def process_file(file_path, io_mode=IO_BUFFERED):
+    """Process individual file and return its data"""
+    try:
+        file_data = {
+            "path": file_path,
+            "size": get_file_size(file_path),
+            "crc32": calculate_crc32(file_path, io_mode=io_mode),
+            "modified": get_file_date(file_path),
+        }
+        return file_data
+    except Exception as e:
+        logger.error(f"Error processing file {file_path}: {e}")
+        return {
+            "path": file_path,
+            "size": 0,
+            "crc32": "ERROR",
+            "modified": "Unknown",
+        }
+
+
+def save_to_csv(files_data, output_file):
+    """Save data to CSV file
+
+    The report is written to a temporary file next to it and then renamed, so readers
+    never see a half-written report.
+    """
+    output_path = Path(output_file)
+    tmp_path = temp_report_path(output_path)
+    try:
+        with tmp_path.open("w", newline="", encoding="utf-8-sig") as csvfile:
+            fieldnames = ["File", "Size", "CRC32", "LastModified"]
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=";")
+
+            writer.writeheader()
+            for file_data in files_data:
+                writer.writerow(
+                    {
+                        "File": file_data["path"],
+                        "Size": file_data["size"],
+                        "CRC32": file_data["crc32"],
+                        "LastModified": file_data["modified"],
+                    }
+                )
+        tmp_path.replace(output_path)
+        logger.success(f"Results successfully saved to: {output_file}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving to CSV {output_file}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def temp_report_path(output_path):
+    """Temporary file the report is written to before it replaces the old one"""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+
+
+def save_report(files_data, output_file, folder_path):
+    """Save the scan as a scan database (.db, .sqlite) or as CSV, by the output file extension"""
+    if is_scan_db(output_file):
+        return save_to_db(files_data, output_file, folder_path)
+    return save_to_csv(files_data, output_file)
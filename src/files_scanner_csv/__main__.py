@@ -6,7 +6,15 @@ from tkinter import filedialog, messagebox
 
 from loguru import logger
 
-from src.utils import calculate_crc32, configure_logger, get_file_size
+from src.utils import (
+    calculate_crc32,
+    configure_logger,
+    get_file_size,
+    report_first_window,
+)
+from src.utils.file_io import IO_BUFFERED, IO_MODES
+from src.utils.io_lanes import DeviceLanes, parse_lane_workers
+from src.utils.scan_db import ScanDatabaseWriter
 
 # Константа для имени выходного файла
 DEFAULT_OUTPUT_FILENAME = "scan_results.csv"
@@ -16,13 +24,29 @@ def select_folder():
     """Open folder selection dialog"""
     root = tk.Tk()
     root.withdraw()  # Hide the main window
+    report_first_window(root)
 
     folder_path = filedialog.askdirectory(title="Выберите каталог для сканирования")
     return folder_path
 
 
-def scan_folder(folder_path, include_subfolders=True):
-    """Scan folder and collect PSD and TIF file information"""
+def scan_folder(
+    folder_path,
+    include_subfolders=True,
+    on_file=None,
+    crc_workers=1,
+    manifest_dir=None,
+    io_mode=IO_BUFFERED,
+    lane_workers=None,
+):
+    """Scan folder and collect PSD and TIF file information
+
+    on_file is called with the data of every hashed file (e.g. to write a scan database).
+    crc_workers > 1 hashes large files in parallel blocks; with manifest_dir the per-block
+    CRCs of every file are saved there (<relative path>.crc.json) for verify.py.
+    io_mode selects how files are read (see src.utils.file_io). Files are hashed in one worker
+    lane per device, lane_workers sets the workers per device kind (see src.utils.io_lanes).
+    """
     files_data = []
     total_files = 0
 
@@ -34,6 +58,12 @@ def scan_folder(folder_path, include_subfolders=True):
         logger.error(f"Folder does not exist: {folder_path}")
         return files_data, total_files
 
+    def file_crc32(file_path):
+        manifest_path = None
+        if manifest_dir is not None:
+            manifest_path = manifest_path_for(manifest_dir, folder, file_path)
+        return calculate_crc32(file_path, workers=crc_workers, manifest_path=manifest_path, io_mode=io_mode)
+
     # Collect all PSD and TIF files
     psd_files = {}
     tif_files = {}
@@ -47,31 +77,27 @@ def scan_folder(folder_path, include_subfolders=True):
         pattern_psd = "*.psd"
         pattern_tif = "*.tif"
 
-    # Find PSD files
-    for file_path in folder.glob(pattern_psd):
-        if file_path.is_file():
-            filename = file_path.stem  # filename without extension
-            psd_files[filename] = {
-                "path": file_path,
-                "size": get_file_size(file_path),
-                "crc32": calculate_crc32(file_path),
-                "folder": file_path.parent.name,
-            }
-            total_files += 1
-            logger.debug(f"Found PSD: {file_path.name}")
+    def file_data(file_path):
+        return {
+            "path": file_path,
+            "size": get_file_size(file_path),
+            "crc32": file_crc32(file_path),
+            "folder": file_path.parent.name,
+        }
 
-    # Find TIF files
-    for file_path in folder.glob(pattern_tif):
-        if file_path.is_file():
+    found = (
+        file_path for pattern in (pattern_psd, pattern_tif) for file_path in folder.glob(pattern) if file_path.is_file()
+    )
+    with DeviceLanes(lane_workers) as lanes:
+        # Find PSD and TIF files: every device lane hashes its own ones
+        for file_path, data in lanes.map(file_data, found):
+            kind, files = ("PSD", psd_files) if file_path.suffix.lower() == ".psd" else ("TIF", tif_files)
             filename = file_path.stem  # filename without extension
-            tif_files[filename] = {
-                "path": file_path,
-                "size": get_file_size(file_path),
-                "crc32": calculate_crc32(file_path),
-                "folder": file_path.parent.name,
-            }
+            files[filename] = data
             total_files += 1
-            logger.debug(f"Found TIF: {file_path.name}")
+            logger.debug(f"Found {kind}: {file_path.name}")
+            if on_file is not None:
+                on_file(files[filename])
 
     # Match PSD and TIF files with same names
     all_filenames = set(psd_files.keys()) | set(tif_files.keys())
@@ -99,6 +125,11 @@ def scan_folder(folder_path, include_subfolders=True):
     return files_data, total_files
 
 
+def manifest_path_for(manifest_dir, folder, file_path):
+    """Manifest file of a scanned file: the folder structure is mirrored in manifest_dir"""
+    return Path(manifest_dir) / f"{Path(file_path).relative_to(folder)}.crc.json"
+
+
 def format_crc32_for_excel(crc32_value):
     """Format CRC32 value to prevent Excel from converting it to scientific notation"""
     if crc32_value and crc32_value.strip():
@@ -173,8 +204,8 @@ def save_to_csv(files_data, output_file):
         return False
 
 
-def get_output_filename():
-    """Get output filename from command line arguments or use default"""
+def parse_args():
+    """Parse command line arguments (only known ones, to avoid conflicts with tkinter)"""
     parser = argparse.ArgumentParser(description="PSD/TIF File Scanner")
     parser.add_argument(
         "--output",
@@ -182,10 +213,35 @@ def get_output_filename():
         default=DEFAULT_OUTPUT_FILENAME,
         help=f"Output CSV filename (default: {DEFAULT_OUTPUT_FILENAME})",
     )
+    parser.add_argument("--db", help="Also save every scanned file to a scan database (.db)")
+    parser.add_argument(
+        "--crc-workers", type=int, default=1, help="Threads hashing one large file in parallel blocks (default 1)"
+    )
+    parser.add_argument("--manifests", help="Save per-block CRC manifests to this folder (see verify.py)")
+    parser.add_argument(
+        "--io-mode",
+        choices=IO_MODES,
+        default=IO_BUFFERED,
+        help="Reading mode: buffered (default), stream - do not fill the OS page cache, direct - O_DIRECT",
+    )
+    parser.add_argument(
+        "--lane-workers",
+        action="append",
+        metavar="KIND=N",
+        help="Files hashed at once per device of a kind: hdd (default 1), ssd, network (default 4), unknown (1)",
+    )
 
     # Parse only known arguments to avoid conflicts with tkinter
     args, _ = parser.parse_known_args()
+    try:
+        args.lane_workers = parse_lane_workers(args.lane_workers)
+    except ValueError as e:
+        parser.error(str(e))
+    return args
+
 
+def get_output_filename(args):
+    """Get output filename from command line arguments or use default"""
     output_file = Path(args.output)
 
     # If no extension provided, add .csv
@@ -203,7 +259,8 @@ def main():
     logger.info("=== PSD/TIF File Scanner ===")
 
     # Get output filename from arguments or use default
-    output_file = get_output_filename()
+    args = parse_args()
+    output_file = get_output_filename(args)
     logger.info(f"Output file: {output_file}")
 
     # Select folder
@@ -224,7 +281,23 @@ def main():
 
     # Scan files
     logger.info("Scanning PSD and TIF files...")
-    files_data, total_files = scan_folder(folder_path, include_subfolders)
+    crc_options = {
+        "crc_workers": args.crc_workers,
+        "manifest_dir": args.manifests,
+        "io_mode": args.io_mode,
+        "lane_workers": args.lane_workers,
+    }
+    if args.db:
+        with ScanDatabaseWriter(args.db, folder_path) as db_writer:
+            files_data, total_files = scan_folder(
+                folder_path,
+                include_subfolders,
+                lambda data: db_writer.add(data["path"], data["size"], data["crc32"]),
+                **crc_options,
+            )
+        logger.success(f"Scan database saved to: {args.db}")
+    else:
+        files_data, total_files = scan_folder(folder_path, include_subfolders, **crc_options)
 
     # Save results
     logger.info("Saving results...")
@@ -0,0 +1,74 @@
+"""Verify scanned files against their per-block CRC manifests and show which regions changed
+
+    python -m src.files_scanner_csv.verify <folder> <manifests folder> [--workers N] [--io-mode stream]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from src.utils import configure_logger
+from src.utils.crc import CrcManifest, verify_manifest
+from src.utils.file_io import IO_BUFFERED, IO_MODES
+
+MANIFEST_SUFFIX = ".crc.json"
+
+
+def verify_folder(folder_path, manifest_dir, workers: Optional[int] = None, io_mode: str = IO_BUFFERED) -> int:
+    """Verify every manifest in manifest_dir, returns the number of changed or missing files"""
+
+    folder = Path(folder_path)
+    manifest_root = Path(manifest_dir)
+    failed = checked = 0
+
+    for manifest_path in sorted(manifest_root.rglob(f"*{MANIFEST_SUFFIX}")):
+        relative = manifest_path.relative_to(manifest_root).as_posix()[: -len(MANIFEST_SUFFIX)]
+        file_path = folder / relative
+        checked += 1
+
+        if not file_path.is_file():
+            logger.error(f"Missing: {relative}")
+            failed += 1
+            continue
+
+        try:
+            changed = verify_manifest(file_path, CrcManifest.load(manifest_path), workers, io_mode)
+        except Exception as e:
+            logger.error(f"Error verifying {relative}: {e}")
+            failed += 1
+            continue
+
+        if not changed:
+            logger.debug(f"OK: {relative}")
+            continue
+
+        failed += 1
+        regions = ", ".join(f"{offset}+{length}" for offset, length in changed)
+        logger.warning(f"Changed: {relative}, regions (offset+length): {regions}")
+
+    logger.info(f"Verified {checked} files, changed or missing: {failed}")
+    return failed
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verify files against per-block CRC manifests")
+    parser.add_argument("folder", help="Scanned folder")
+    parser.add_argument("manifests", help="Folder with manifests saved by the scanner (--manifests)")
+    parser.add_argument("--workers", type=int, help="Threads hashing one file (default: CPU count)")
+    parser.add_argument(
+        "--io-mode",
+        choices=IO_MODES,
+        default=IO_BUFFERED,
+        help="Reading mode: buffered (default), stream - do not fill the OS page cache, direct - O_DIRECT",
+    )
+    args = parser.parse_args(argv)
+
+    return 1 if verify_folder(args.folder, args.manifests, args.workers, args.io_mode) else 0
+
+
+if __name__ == "__main__":
+    configure_logger()
+    sys.exit(main())
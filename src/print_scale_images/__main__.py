@@ -1,10 +1,20 @@
-from src.print_scale_images.config import LoggerConfig
-from src.print_scale_images.handlers.main_controller import MainController
+import sys
+
+from src.print_scale_images.config import get_app_config
 from src.utils import configure_logger
 
 
 def main():
-    configure_logger(file_name=LoggerConfig.filename, console=LoggerConfig.console)
+    # С аргументами командной строки работаем в пакетном режиме без GUI
+    if len(sys.argv) > 1:
+        from src.print_scale_images.cli import main as cli_main
+
+        sys.exit(cli_main())
+
+    from src.print_scale_images.handlers.main_controller import MainController
+
+    logger_config = get_app_config().logger_config
+    configure_logger(file_name=logger_config.filename, console=logger_config.console)
     app = MainController()
     app.run()
 
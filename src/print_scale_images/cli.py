@@ -0,0 +1,325 @@
+"""Пакетный режим без графического интерфейса (tkinter не импортируется)"""
+
+import argparse
+import glob
+import re
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from loguru import logger
+
+from src.print_scale_images.config import (
+    SUPPORTED_FORMATS,
+    AppConfig,
+    ImageConfig,
+    ImageInfo,
+    PrintConfig,
+)
+from src.print_scale_images.handlers.exporters import create_exporter
+from src.print_scale_images.handlers.image_service import ImageProcessingService
+from src.print_scale_images.handlers.scale_planner import get_planner, plan_page
+from src.utils import configure_logger
+from src.utils.files import iter_files
+
+# Поля конфигурации, которые можно переопределить из командной строки
+CONFIG_OVERRIDE_FIELDS = (
+    "dpi",
+    "margin",
+    "font_size",
+    "font_style",
+    "text_margin",
+    "pdf_mode",
+    "color_mode",
+    "allowed_scales",
+    "export_workers",
+    "pack_pages",
+    "cache_size_mb",
+)
+
+# Как часто писать прогресс в лог (в изображениях)
+PROGRESS_LOG_STEP = 50
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки"""
+
+    parser = argparse.ArgumentParser(description="Масштабирование изображений на A4 и экспорт без GUI")
+    parser.add_argument("--input", "-i", nargs="+", help="Файлы, каталоги или glob-шаблоны с изображениями")
+    parser.add_argument(
+        "--output", "-o", help="Итоговый файл: .pdf, .tif (многостраничный) или .png/.jpg (файл на страницу)"
+    )
+    parser.add_argument(
+        "--print", action="store_true", dest="print_", help="Печатать по мере обработки вместо сохранения файла"
+    )
+    parser.add_argument("--printer", help="Имя принтера (по умолчанию - из конфигурации или системный)")
+    parser.add_argument("--chunk-pages", type=int, help="Страниц в одном задании печати (0 - одним заданием)")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="Количество процессов обработки (по умолчанию 1)")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Искать изображения во вложенных каталогах")
+    parser.add_argument("--config", default="config.json", help="Файл конфигурации (по умолчанию config.json)")
+    parser.add_argument(
+        "--init-config", action="store_true", help="Создать файл конфигурации со значениями по умолчанию и выйти"
+    )
+    parser.add_argument(
+        "--plan", action="store_true", help="Показать выбранные масштабы и размеры без обработки изображений"
+    )
+
+    watch = parser.add_argument_group("горячая папка")
+    watch.add_argument(
+        "--watch",
+        action="store_true",
+        help="Следить за каталогом --input: новые изображения дописываются в PDF --output или печатаются (--print)",
+    )
+    watch.add_argument(
+        "--settle", type=float, default=2.0, help="Сколько секунд файл не должен меняться перед обработкой"
+    )
+    watch.add_argument("--poll", action="store_true", help="Опрашивать каталог вместо inotify (сетевые папки)")
+    watch.add_argument("--state", help="Файл состояния (по умолчанию <output>.watch.json)")
+
+    overrides = parser.add_argument_group("переопределение конфигурации")
+    overrides.add_argument("--dpi", type=int)
+    overrides.add_argument("--margin", type=int)
+    overrides.add_argument("--font-size", type=int)
+    overrides.add_argument("--font-style")
+    overrides.add_argument("--text-margin", type=int)
+    overrides.add_argument("--pdf-mode", choices=("raster", "vector"))
+    overrides.add_argument("--color-mode", choices=("auto", "rgb"))
+    overrides.add_argument(
+        "--allowed-scales", nargs="+", metavar="SCALE", help="Допустимые масштабы, например 1:2 1:2.5"
+    )
+    overrides.add_argument(
+        "--pack", action="store_true", default=None, dest="pack_pages", help="Размещать несколько изображений на листе"
+    )
+    overrides.add_argument("--export-workers", type=int, help="Потоков сжатия страниц (0 - по числу ядер)")
+    overrides.add_argument(
+        "--cache-size-mb", type=int, help="Включить кэш страниц с этим лимитом, МБ (0 - отключен, по умолчанию)"
+    )
+    overrides.add_argument("--no-cache", action="store_true", help="Не использовать кэш страниц")
+
+    args = parser.parse_args(argv)
+    if args.plan and not args.input:
+        parser.error("необходимо указать --input")
+    if not (args.init_config or args.plan) and not (args.input and (args.output or args.print_)):
+        parser.error("необходимо указать --input и --output (или --print)")
+    if args.watch:
+        if len(args.input) != 1 or not Path(args.input[0]).is_dir():
+            parser.error("для --watch в --input нужен один каталог")
+        if args.output and Path(args.output).suffix.lower() != ".pdf" and not args.print_:
+            parser.error("в режиме --watch изображения дописываются только в PDF")
+
+    return args
+
+
+def build_config(args: argparse.Namespace) -> ImageConfig:
+    """Загружает конфигурацию и применяет переопределения из командной строки"""
+
+    config = AppConfig(args.config).image_config
+    overrides = {field: getattr(args, field) for field in CONFIG_OVERRIDE_FIELDS if getattr(args, field) is not None}
+    if args.no_cache:
+        overrides["cache_size_mb"] = 0
+
+    return replace(config, **overrides)
+
+
+def build_print_config(args: argparse.Namespace) -> PrintConfig:
+    """Загружает конфигурацию печати и применяет переопределения из командной строки"""
+
+    config = AppConfig(args.config).print_config
+    overrides = {}
+    if args.printer is not None:
+        overrides["printer_name"] = args.printer
+    if args.chunk_pages is not None:
+        overrides["chunk_pages"] = args.chunk_pages
+
+    return replace(config, **overrides)
+
+
+def iter_input_paths(inputs: Iterable[str], recursive: bool = False, output: Optional[str] = None) -> Iterator[str]:
+    """Раскрывает файлы, каталоги и glob-шаблоны в пути к изображениям
+
+    Итоговый файл output (и файлы его страниц PNG/JPEG) пропускается: каталог обходится
+    во время экспорта, и сохраняемый в него результат иначе попадет во входные.
+    """
+
+    is_output = output_matcher(output)
+    seen = set()
+    for item in inputs:
+        path = Path(item)
+        if path.is_file():
+            candidates = [path]
+        elif path.is_dir():
+            candidates = (Path(file) for file in iter_files(path, SUPPORTED_FORMATS, recursive))
+        else:
+            candidates = [Path(match) for match in sorted(glob.glob(item, recursive=True))]  # noqa: PTH207
+            if not candidates:
+                logger.warning(f"Не найдено файлов по шаблону: {item}")
+
+        for candidate in candidates:
+            if candidate != path and not candidate.name.lower().endswith(SUPPORTED_FORMATS):
+                continue
+            key = candidate.resolve()
+            if not candidate.is_file() or key in seen or is_output(key):
+                continue
+
+            seen.add(key)
+            yield str(candidate)
+
+
+def output_matcher(output: Optional[str]) -> Callable[[Path], bool]:
+    """Проверка абсолютного пути: итоговый файл экспорта или файл его страницы (<имя>_0001.png)"""
+
+    if not output:
+        return lambda path: False
+
+    output_path = Path(output).resolve()
+    page_name = re.compile(rf"{re.escape(output_path.stem)}_\d{{4,}}{re.escape(output_path.suffix)}")
+    return lambda path: path == output_path or (
+        path.parent == output_path.parent and page_name.fullmatch(path.name) is not None
+    )
+
+
+def print_plan(image_paths: Iterable[str], config: ImageConfig) -> int:
+    """Выводит план размещения изображений (читаются только заголовки файлов)"""
+
+    from PIL import Image
+
+    failed = 0
+    for image_path in image_paths:
+        try:
+            with Image.open(image_path) as image:
+                plan = plan_page(image.size, config)
+                width, height = image.size
+        except Exception as e:
+            logger.error(f"Ошибка чтения {image_path}: {e}")
+            failed += 1
+            continue
+
+        scaled_width, scaled_height = plan.scaled_size
+        logger.info(f"{image_path}: {width}x{height} -> {scaled_width}x{scaled_height} ({plan.scale_text})")
+
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """Точка входа пакетного режима, возвращает код завершения"""
+
+    args = parse_args(argv)
+    configure_logger(console=True)
+
+    if args.init_config:
+        AppConfig(args.config).create_default_config()
+        return 0
+
+    config = build_config(args)
+    try:
+        get_planner(config)
+    except ValueError as e:
+        logger.error(f"Ошибка конфигурации масштабов: {e}")
+        return 1
+
+    if args.plan:
+        return print_plan(iter_input_paths(args.input, args.recursive), config)
+
+    if args.watch:
+        return watch_folder(args, config)
+
+    if args.print_:
+        return print_batch(args, config)
+    return export_batch(args, config)
+
+
+def iter_batch_pages(
+    args: argparse.Namespace, config: ImageConfig, service: ImageProcessingService, stats: dict
+) -> Iterator[ImageInfo]:
+    """Обрабатывает входные изображения и размещает их на страницах
+
+    В stats считаются обработанные изображения ("inputs") и полученные страницы ("pages").
+    """
+
+    def on_progress(done: int, image_path: str) -> None:
+        stats["inputs"] = done
+        if done % PROGRESS_LOG_STEP == 0:
+            logger.info(f"Обработано изображений: {done}")
+
+    def counted(image_infos: Iterable[ImageInfo]) -> Iterator[ImageInfo]:
+        for image_info in image_infos:
+            stats["pages"] += 1
+            yield image_info
+
+    image_paths = iter_input_paths(args.input, args.recursive, args.output)
+    image_infos = counted(service.iter_process_images(image_paths, on_progress=on_progress))
+    if config.pack_pages:
+        from src.print_scale_images.handlers.page_packer import PagePacker
+
+        image_infos = PagePacker(config).pack(image_infos)
+    return image_infos
+
+
+def print_batch(args: argparse.Namespace, config: ImageConfig) -> int:
+    """Печатает изображения по мере обработки"""
+
+    from src.print_scale_images.handlers.print_service import PrinterService
+
+    service = ImageProcessingService(config, workers=max(1, args.workers))
+    stats = {"inputs": 0, "pages": 0}
+    logger.info(f"Пакетная печать: {', '.join(args.input)} (процессов: {service.workers})")
+    try:
+        printer = PrinterService(build_print_config(args), config)
+        printed = printer.print_images(iter_batch_pages(args, config, service, stats), wait=True)
+    except Exception as e:
+        logger.error(f"Ошибка пакетной печати: {e}")
+        return 1
+
+    logger.info(f"Напечатано страниц: {stats['pages']} из {stats['inputs']} изображений")
+    return 0 if printed and stats["pages"] == stats["inputs"] else 1
+
+
+def export_batch(args: argparse.Namespace, config: ImageConfig) -> int:
+    """Сохраняет обработанные изображения в файл --output"""
+
+    try:
+        exporter = create_exporter(args.output, config)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    service = ImageProcessingService(config, workers=max(1, args.workers))
+    stats = {"inputs": 0, "pages": 0}
+    logger.info(f"Пакетная обработка: {', '.join(args.input)} -> {args.output} (процессов: {service.workers})")
+    try:
+        result_path = exporter.export(iter_batch_pages(args, config, service, stats), args.output)
+    except Exception as e:
+        logger.error(f"Ошибка пакетной обработки: {e}")
+        return 1
+
+    logger.success(f"Сохранено: {result_path}, страниц: {stats['pages']} из {stats['inputs']} изображений")
+
+    # Ненулевой код, если часть изображений не удалось обработать
+    return 0 if stats["pages"] == stats["inputs"] else 1
+
+
+def watch_folder(args: argparse.Namespace, config: ImageConfig) -> int:
+    """Режим горячей папки: работает до прерывания (Ctrl+C)"""
+
+    from src.print_scale_images.handlers.hot_folder import HotFolderService
+
+    service = HotFolderService(
+        args.input[0],
+        config,
+        output_path=None if args.print_ else args.output,
+        print_config=build_print_config(args) if args.print_ else None,
+        state_path=args.state,
+        recursive=args.recursive,
+        settle=args.settle,
+        use_inotify=not args.poll,
+        workers=max(1, args.workers),
+    )
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        logger.info("Наблюдение остановлено")
+    except Exception as e:
+        logger.error(f"Ошибка режима горячей папки: {e}")
+        return 1
+
+    return 0
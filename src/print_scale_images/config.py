@@ -1,12 +1,22 @@
 from __future__ import annotations
 
 import json
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from loguru import logger
-from PIL import Image
+
+if TYPE_CHECKING:
+    # PIL нужен только для аннотаций: не загружаем его при импорте конфигурации
+    from PIL import Image
+
+# Поддерживаемые форматы изображений
+SUPPORTED_FORMATS = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif")
+
+# Допустимые масштабы по умолчанию
+DEFAULT_ALLOWED_SCALES = ("1:1", "1:2", "1:2.5", "1:4", "1:5")
 
 
 @dataclass
@@ -18,6 +28,22 @@ class ImageConfig:
     font_size: int = 40
     font_style: str = "calibri.ttf"
     text_margin: int = 180
+    # Режим PDF: "raster" - растровые страницы A4, "vector" - встраивание только масштабированного изображения
+    pdf_mode: str = "raster"
+    # Дисковый кэш обработанных страниц: пустой путь - временный каталог ОС, размер 0 - кэш отключен.
+    # По умолчанию выключен: он ускоряет только повторную обработку тех же файлов, а первую замедляет
+    cache_dir: str = ""
+    cache_size_mb: int = 0
+    # Лимит памяти на декодирование исходника: большие TIFF читаются по полосам (0 - без ограничения)
+    max_decode_mb: int = 512
+    # Режим цвета страниц: "auto" - черно-белые и серые изображения не переводятся в RGB, "rgb" - всегда RGB
+    color_mode: str = "auto"
+    # Допустимые масштабы ("1:2.5", "2:1"): выбирается наибольший, при котором изображение помещается на A4
+    allowed_scales: list[str] = field(default_factory=lambda: list(DEFAULT_ALLOWED_SCALES))
+    # Потоков сжатия страниц при экспорте (0 - по числу ядер)
+    export_workers: int = 0
+    # Размещать несколько изображений одного масштаба на одном листе
+    pack_pages: bool = False
 
     @classmethod
     def from_dict(cls, config_dict: dict[str, Any]) -> ImageConfig:
@@ -28,6 +54,14 @@ class ImageConfig:
             font_size=config_dict.get("font_size", 40),
             font_style=config_dict.get("font_style", "calibri.ttf"),
             text_margin=config_dict.get("text_margin", 180),
+            pdf_mode=config_dict.get("pdf_mode", "raster"),
+            cache_dir=config_dict.get("cache_dir", ""),
+            cache_size_mb=config_dict.get("cache_size_mb", 0),
+            max_decode_mb=config_dict.get("max_decode_mb", 512),
+            color_mode=config_dict.get("color_mode", "auto"),
+            allowed_scales=list(config_dict.get("allowed_scales", DEFAULT_ALLOWED_SCALES)),
+            export_workers=config_dict.get("export_workers", 0),
+            pack_pages=config_dict.get("pack_pages", False),
         )
 
 
@@ -44,6 +78,33 @@ class LoggerConfig:
         return cls(filename=config_dict.get("filename", "processing.log"), console=config_dict.get("console", False))
 
 
+@dataclass
+class PrintConfig:
+    """Конфигурация печати"""
+
+    # Бэкенд печати: "auto" (GDI в Windows, CUPS в Linux/macOS), "gdi", "cups" или "file"
+    printer_backend: str = "auto"
+    # Имя принтера: пустое - принтер по умолчанию
+    printer_name: str = ""
+    # Каталог заданий бэкенда "file": пустой путь - временный каталог ОС
+    spool_dir: str = ""
+    # Сколько ждать завершения задания печати, с
+    job_timeout: int = 3600
+    # Страниц в одном задании: большие пакеты печатаются частями (0 - одним заданием)
+    chunk_pages: int = 50
+
+    @classmethod
+    def from_dict(cls, config_dict: dict[str, Any]) -> PrintConfig:
+        """Создает конфиг печати из словаря"""
+        return cls(
+            printer_backend=config_dict.get("printer_backend", "auto"),
+            printer_name=config_dict.get("printer_name", ""),
+            spool_dir=config_dict.get("spool_dir", ""),
+            job_timeout=config_dict.get("job_timeout", 3600),
+            chunk_pages=config_dict.get("chunk_pages", 50),
+        )
+
+
 @dataclass
 class ImageInfo:
     """Информация об обработанном изображении"""
@@ -52,7 +113,14 @@ class ImageInfo:
     original_size: tuple[int, int]
     scaled_size: tuple[int, int]
     scale_ratio: tuple[int, int]
-    a4_image: Image.Image
+    a4_image: Image.Image | None = None
+    # Для векторного режима PDF: масштабированное изображение и его положение на странице
+    scaled_image: Image.Image | None = None
+    position: tuple[int, int] = (0, 0)
+    page_size: tuple[int, int] = (0, 0)
+    source_format: str | None = None
+    source_mode: str | None = None
+    caption: str = ""
 
 
 class AppConfig:
@@ -62,6 +130,7 @@ class AppConfig:
         self.config_path = Path(config_path)
         self.image_config: ImageConfig = ImageConfig()
         self.logger_config: LoggerConfig = LoggerConfig()
+        self.print_config: PrintConfig = PrintConfig()
         self._load_config()
 
     def _load_config(self) -> None:
@@ -74,23 +143,16 @@ class AppConfig:
 
                 self.image_config = ImageConfig.from_dict(config_data)
                 self.logger_config = LoggerConfig.from_dict(config_data)
+                self.print_config = PrintConfig.from_dict(config_data)
 
             except Exception as e:
                 logger.error(f"Ошибка загрузки конфигурации: {e}. Используются значения по умолчанию.")
         else:
-            self._create_default_config()
+            logger.debug(f"Файл конфигурации {self.config_path} не найден. Используются значения по умолчанию.")
 
-    def _create_default_config(self) -> None:
+    def create_default_config(self) -> None:
         """Создает файл с конфигурацией по умолчанию"""
-        default_config = {
-            "dpi": 300,
-            "margin": 100,
-            "font_size": 40,
-            "font_style": "calibri.ttf",
-            "text_margin": 180,
-            "filename": "processing.log",
-            "console": False,
-        }
+        default_config = {**asdict(ImageConfig()), **asdict(LoggerConfig()), **asdict(PrintConfig())}
 
         try:
             path = Path(self.config_path)
@@ -105,5 +167,7 @@ class AppConfig:
         self._load_config()
 
 
-# Глобальный экземпляр конфигурации
-app_config = AppConfig()
+@lru_cache(maxsize=None)
+def get_app_config() -> AppConfig:
+    """Возвращает глобальный экземпляр конфигурации, загружая его при первом обращении"""
+    return AppConfig()
@@ -34,7 +34,7 @@ class ActionDialog:
             row=2, column=0, padx=5, pady=10
         )
 
-        tk.Button(self.dialog, text="Экспорт в PDF", width=12, command=lambda: self._set_result(2)).grid(
+        tk.Button(self.dialog, text="Экспорт", width=12, command=lambda: self._set_result(2)).grid(
             row=2, column=1, padx=5, pady=10
         )
 
@@ -1,7 +1,10 @@
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog
-from typing import List
+from typing import Callable, Iterator, List, Optional
+
+from src.print_scale_images.config import SUPPORTED_FORMATS
+from src.utils.files import iter_files, iter_in_background
 
 
 class FileSelector:
@@ -22,24 +25,32 @@ class FileSelector:
         return list(file_paths)
 
     @staticmethod
-    def select_directory() -> List[str]:
-        """Выбирает все изображения из каталога"""
+    def select_directory() -> str:
+        """Выбирает каталог с изображениями"""
         root = tk.Tk()
         root.withdraw()
 
         directory = filedialog.askdirectory(title="Выберите папку с изображениями")
         root.destroy()
 
-        if not directory:
-            return []
-
-        # Поддерживаемые форматы изображений
-        supported_formats = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif")
-        image_files = []
-        directory_path = Path(directory)
+        return directory
 
-        for file in directory_path.iterdir():
-            if file.is_file() and file.name.lower().endswith(supported_formats):
-                image_files.append(str(file))
+    @staticmethod
+    def has_subdirectories(directory: str) -> bool:
+        """Проверяет, есть ли в каталоге подкаталоги"""
+        try:
+            return any(item.is_dir() for item in Path(directory).iterdir())
+        except OSError:
+            return False
 
-        return sorted(image_files)
+    @staticmethod
+    def iter_directory(
+        directory: str, recursive: bool = False, on_finished: Optional[Callable[[int], None]] = None
+    ) -> Iterator[str]:
+        """Находит изображения каталога потоково
+
+        Обход выполняется в фоновом потоке, найденные пути сразу передаются в обработку
+        (в пределах каталога - в естественном порядке сортировки). По окончании обхода
+        on_finished вызывается (в фоновом потоке) с числом найденных изображений.
+        """
+        return iter_in_background(iter_files(directory, SUPPORTED_FORMATS, recursive), on_finished=on_finished)
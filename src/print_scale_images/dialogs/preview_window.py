@@ -0,0 +1,225 @@
+import math
+import queue
+import tkinter as tk
+from concurrent.futures import Future
+from pathlib import Path
+
+from PIL import ImageTk
+
+from src.print_scale_images.config import ImageConfig
+from src.print_scale_images.handlers.scale_planner import plan_page
+from src.print_scale_images.handlers.thumbnail_service import (
+    THUMBNAIL_SIZE,
+    ThumbnailService,
+)
+
+
+class PreviewWindow:
+    """Окно предпросмотра: прокручиваемая сетка миниатюр с планируемым масштабом файлов
+
+    Ячейки рисуются и миниатюры строятся в фоне только для видимых строк (с небольшим
+    запасом). Ячейки, ушедшие с экрана, освобождают изображения и отменяют ожидающие задачи.
+    """
+
+    # Отступ вокруг миниатюры и высота подписи, пикселей
+    CELL_PADDING = 8
+    TEXT_HEIGHT = 36
+    # Строки сверх видимых, для которых миниатюры готовятся заранее
+    PREFETCH_ROWS = 2
+    # Период опроса готовых миниатюр, мс
+    POLL_INTERVAL_MS = 50
+    # Длина имени файла в подписи ячейки
+    NAME_LENGTH = 24
+
+    def __init__(self, parent, image_paths: list[str], config: ImageConfig):
+        self.parent = parent
+        self.image_paths = image_paths
+        self.config = config
+        self.result = False
+
+        self.thumbnail_service = ThumbnailService(config)
+        self.cell_width = THUMBNAIL_SIZE + 2 * self.CELL_PADDING
+        self.cell_height = THUMBNAIL_SIZE + self.TEXT_HEIGHT + 2 * self.CELL_PADDING
+        self._columns = 1
+
+        # Готовые миниатюры передаются из пула в UI через очередь
+        self._queue: queue.Queue = queue.Queue()
+        self._futures: dict[int, Future] = {}
+        self._photos: dict[int, ImageTk.PhotoImage] = {}
+        self._drawn: set[int] = set()
+
+        self._create_window()
+
+    def _create_window(self):
+        """Создает окно предпросмотра и ждет его закрытия"""
+
+        self.window = tk.Toplevel(self.parent)
+        self.window.title(f"Предпросмотр: {len(self.image_paths)} изображений")
+        self.window.geometry(f"{self.cell_width * 5 + 40}x{self.cell_height * 3 + 60}")
+        self.window.transient(self.parent)
+        self.window.grab_set()
+
+        # Кнопки
+        buttons = tk.Frame(self.window)
+        buttons.pack(side="bottom", fill="x", pady=8)
+        tk.Button(buttons, text="Обработать", width=12, command=lambda: self._close(True)).pack(side="right", padx=10)
+        tk.Button(buttons, text="Отмена", width=12, command=lambda: self._close(False)).pack(side="right")
+        tk.Label(buttons, text=f"Файлов: {len(self.image_paths)}").pack(side="left", padx=10)
+
+        # Сетка миниатюр
+        self.scrollbar = tk.Scrollbar(self.window, orient="vertical")
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(
+            self.window, background="white", yscrollincrement=self.cell_height, yscrollcommand=self._on_scroll
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar.configure(command=self.canvas.yview)
+
+        self.canvas.bind("<Configure>", lambda event: self._layout())
+        self.window.bind("<MouseWheel>", lambda event: self._scroll(-1 if event.delta > 0 else 1))
+        self.window.bind("<Button-4>", lambda event: self._scroll(-1))
+        self.window.bind("<Button-5>", lambda event: self._scroll(1))
+
+        self.window.protocol("WM_DELETE_WINDOW", lambda: self._close(False))
+        self._poll_id = self.window.after(self.POLL_INTERVAL_MS, self._poll_thumbnails)
+
+        # Ждем завершения диалога
+        self.parent.wait_window(self.window)
+
+    def _layout(self):
+        """Пересчитывает количество колонок по ширине окна и перерисовывает сетку"""
+
+        columns = max(1, self.canvas.winfo_width() // self.cell_width)
+        rows = math.ceil(len(self.image_paths) / columns)
+        self.canvas.configure(scrollregion=(0, 0, columns * self.cell_width, rows * self.cell_height))
+
+        if columns != self._columns:
+            self._columns = columns
+            self.canvas.delete("all")
+            self._drawn.clear()
+            self._photos.clear()
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+        self._update_visible()
+
+    def _scroll(self, rows: int):
+        """Прокручивает сетку колесом мыши"""
+        self.canvas.yview_scroll(rows, "units")
+
+    def _on_scroll(self, first: str, last: str):
+        """Синхронизирует полосу прокрутки и догружает показанные строки"""
+        self.scrollbar.set(first, last)
+        self._update_visible()
+
+    def _visible_indexes(self) -> range:
+        """Индексы файлов в видимых строках с запасом"""
+
+        top = self.canvas.canvasy(0)
+        bottom = self.canvas.canvasy(self.canvas.winfo_height())
+        first_row = max(0, int(top // self.cell_height) - self.PREFETCH_ROWS)
+        last_row = int(bottom // self.cell_height) + self.PREFETCH_ROWS
+
+        return range(first_row * self._columns, min(len(self.image_paths), (last_row + 1) * self._columns))
+
+    def _update_visible(self):
+        """Рисует видимые ячейки и освобождает ушедшие с экрана"""
+
+        visible = self._visible_indexes()
+
+        for index in [index for index in self._drawn if index not in visible]:
+            self.canvas.delete(f"cell{index}")
+            self._drawn.discard(index)
+            self._photos.pop(index, None)
+            future = self._futures.pop(index, None)
+            if future is not None:
+                future.cancel()
+
+        for index in visible:
+            if index not in self._drawn:
+                self._draw_cell(index)
+
+    def _cell_origin(self, index: int) -> tuple[int, int]:
+        """Левый верхний угол ячейки"""
+        row, column = divmod(index, self._columns)
+        return column * self.cell_width, row * self.cell_height
+
+    def _draw_cell(self, index: int):
+        """Рисует заготовку ячейки и запускает построение миниатюры"""
+
+        x, y = self._cell_origin(index)
+        tag = f"cell{index}"
+        self.canvas.create_rectangle(
+            x + self.CELL_PADDING,
+            y + self.CELL_PADDING,
+            x + self.CELL_PADDING + THUMBNAIL_SIZE,
+            y + self.CELL_PADDING + THUMBNAIL_SIZE,
+            outline="#d0d0d0",
+            tags=(tag, f"placeholder{index}"),
+        )
+        self.canvas.create_text(
+            x + self.cell_width // 2,
+            y + self.CELL_PADDING + THUMBNAIL_SIZE + 4,
+            text=self._short_name(index),
+            anchor="n",
+            justify="center",
+            tags=(tag, f"text{index}"),
+        )
+        self._drawn.add(index)
+
+        future = self.thumbnail_service.submit(self.image_paths[index])
+        future.add_done_callback(lambda done, cell=index: self._queue.put((cell, done)))
+        self._futures[index] = future
+
+    def _short_name(self, index: int) -> str:
+        """Имя файла, укороченное для подписи ячейки"""
+        name = Path(self.image_paths[index]).name
+        return name if len(name) <= self.NAME_LENGTH else name[: self.NAME_LENGTH - 1] + "…"
+
+    def _poll_thumbnails(self):
+        """Выводит готовые миниатюры (выполняется в потоке UI)"""
+
+        try:
+            while True:
+                index, future = self._queue.get_nowait()
+                if self._futures.get(index) is not future or future.cancelled():
+                    continue
+                del self._futures[index]
+                self._show_thumbnail(index, future)
+        except queue.Empty:
+            pass
+
+        self._poll_id = self.window.after(self.POLL_INTERVAL_MS, self._poll_thumbnails)
+
+    def _show_thumbnail(self, index: int, future: Future):
+        """Показывает миниатюру и планируемый масштаб в ячейке"""
+
+        name = self._short_name(index)
+        try:
+            thumbnail = future.result()
+        except Exception:
+            self.canvas.itemconfigure(f"text{index}", text=f"{name}\nне удалось прочитать", fill="red")
+            return
+
+        x, y = self._cell_origin(index)
+        photo = ImageTk.PhotoImage(thumbnail.image)
+        self._photos[index] = photo
+        self.canvas.create_image(
+            x + self.cell_width // 2,
+            y + self.CELL_PADDING + THUMBNAIL_SIZE // 2,
+            image=photo,
+            tags=(f"cell{index}",),
+        )
+        self.canvas.delete(f"placeholder{index}")
+
+        plan = plan_page(thumbnail.original_size, self.config)
+        width, height = thumbnail.original_size
+        self.canvas.itemconfigure(f"text{index}", text=f"{name}\n{width}x{height}, {plan.scale_text}")
+
+    def _close(self, result: bool):
+        """Закрывает окно и останавливает построение миниатюр"""
+        self.result = result
+        self.window.after_cancel(self._poll_id)
+        self.thumbnail_service.shutdown()
+        self.window.destroy()
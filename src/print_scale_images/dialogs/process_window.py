@@ -1,14 +1,15 @@
 import tkinter as tk
 from tkinter import ttk
+from typing import Callable, Optional
 
 
 class ProgressWindow:
     """Окно прогресса для длительных операций"""
 
-    def __init__(self, parent, title="Обработка"):
+    def __init__(self, parent, title="Обработка", maximum: int = 0, on_cancel: Optional[Callable[[], None]] = None):
         self.window = tk.Toplevel(parent)
         self.window.title(title)
-        self.window.geometry("300x100")
+        self.window.geometry("300x140" if on_cancel else "300x100")
         self.window.transient(parent)
         self.window.grab_set()
 
@@ -21,9 +22,42 @@ class ProgressWindow:
         self.label = tk.Label(self.window, text="Обработка...")
         self.label.pack(pady=10)
 
-        self.progress = ttk.Progressbar(self.window, mode="indeterminate")
+        # При известном количестве шагов показываем определенный прогресс
+        self.maximum = maximum
+        if maximum > 0:
+            self.progress = ttk.Progressbar(self.window, mode="determinate", maximum=maximum)
+        else:
+            self.progress = ttk.Progressbar(self.window, mode="indeterminate")
+            self.progress.start()
         self.progress.pack(pady=10, padx=20, fill="x")
-        self.progress.start()
+
+        # Кнопка отмены
+        self.on_cancel = on_cancel
+        if on_cancel:
+            self.btn_cancel = tk.Button(self.window, text="Отмена", width=12, command=self.cancel)
+            self.btn_cancel.pack(pady=(0, 10))
+            self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+
+    def set_maximum(self, maximum: int):
+        """Переключает неопределенный прогресс в определенный, когда стало известно число шагов"""
+        if maximum <= 0 or self.maximum > 0:
+            return
+        self.maximum = maximum
+        self.progress.stop()
+        self.progress.config(mode="determinate", maximum=maximum, value=0)
+
+    def set_progress(self, value: int, text: Optional[str] = None):
+        """Обновляет прогресс и текст"""
+        if self.maximum > 0:
+            self.progress["value"] = value
+        if text is not None:
+            self.label.config(text=text)
+
+    def cancel(self):
+        """Запрашивает отмену операции"""
+        self.btn_cancel.config(state="disabled")
+        self.label.config(text="Отмена...")
+        self.on_cancel()
 
     def close(self):
         """Закрывает окно прогресса"""
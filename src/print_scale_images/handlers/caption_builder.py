@@ -1,14 +1,24 @@
+from fractions import Fraction
+
 from PIL import Image, ImageDraw, ImageFont
 
 from src.print_scale_images.config import ImageConfig
+from src.print_scale_images.handlers.font_registry import get_font_registry
+from src.print_scale_images.handlers.scale_planner import format_scale
 from src.utils.files import get_filename_without_extension
 
+# Сколько ширин и смещений подписей хранить в кэше
+CAPTION_CACHE_SIZE = 4096
+
 
 class CaptionBuilder:
     """Строитель для добавления подписей к изображениям"""
 
     def __init__(self):
-        self._font_cache = {}
+        # Метрики шрифтов (ascent, descent), ширины подписей и смещения их базовой линии в пикселях
+        self._metrics_cache: dict[str, tuple[int, int]] = {}
+        self._width_cache: dict[tuple[str, str], float] = {}
+        self._offset_cache: dict[tuple[str, str], tuple[int, int]] = {}
 
     def add_caption(
         self, image: Image.Image, image_path: str, scale_ratio: tuple[int, int], config: ImageConfig
@@ -16,20 +26,74 @@ class CaptionBuilder:
         """Добавляет подпись к изображению"""
 
         draw = ImageDraw.Draw(image)
-        font = self._get_font(config.font_size, config.font_style)
+        font = self.get_font(config)
 
         # Генерируем текст подписи
-        caption = self._generate_caption(image_path, scale_ratio)
-
-        # Позиционируем текст по центру внизу
-        text_x = image.width // 2
-        text_y = image.height - config.text_margin // 2
+        caption = self.generate_caption(image_path, scale_ratio)
 
-        draw.text((text_x, text_y), caption, fill="black", font=font, anchor="mm")
+        draw.text(self.caption_origin(caption, image.size, config), caption, fill="black", font=font, anchor="ls")
         return image
 
+    def caption_origin(self, caption: str, page_size: tuple[int, int], config: ImageConfig) -> tuple[float, float]:
+        """Вычисляет начало базовой линии подписи, выровненной по центру
+
+        С anchor="ls" от этой точки подпись рисуется пиксель в пиксель так же, как
+        с anchor="mm" от центра. Одна и та же раскладка используется для растровой
+        страницы и текста в PDF.
+        """
+
+        offset_x, offset_y = self.caption_offset(caption, config)
+        center_x, center_y = self.caption_center(page_size, config)
+        return center_x + offset_x, center_y + offset_y
+
+    def caption_offset(self, caption: str, config: ImageConfig) -> tuple[int, int]:
+        """Возвращает смещение начала базовой линии подписи от ее центра в пикселях
+
+        Берется из рамок текста PIL для anchor="mm" и "ls", поэтому учитывает то же
+        округление, что и отрисовка.
+        """
+
+        font_key = f"{config.font_style}_{config.font_size}"
+        offset = self._offset_cache.get((font_key, caption))
+        if offset is None:
+            if len(self._offset_cache) >= CAPTION_CACHE_SIZE:
+                self._offset_cache.clear()
+            font = self.get_font(config)
+            middle_left, middle_top, _, _ = font.getbbox(caption, anchor="mm")
+            base_left, base_top, _, _ = font.getbbox(caption, anchor="ls")
+            offset = self._offset_cache[(font_key, caption)] = (middle_left - base_left, middle_top - base_top)
+        return offset
+
+    def caption_metrics(self, config: ImageConfig) -> tuple[int, int]:
+        """Возвращает (ascent, descent) шрифта подписи в пикселях"""
+
+        font_key = f"{config.font_style}_{config.font_size}"
+        metrics = self._metrics_cache.get(font_key)
+        if metrics is None:
+            metrics = self._metrics_cache[font_key] = self.get_font(config).getmetrics()
+        return metrics
+
+    def caption_width(self, caption: str, config: ImageConfig) -> float:
+        """Возвращает ширину подписи в пикселях"""
+
+        font_key = f"{config.font_style}_{config.font_size}"
+        width = self._width_cache.get((font_key, caption))
+        if width is None:
+            if len(self._width_cache) >= CAPTION_CACHE_SIZE:
+                self._width_cache.clear()
+            width = self._width_cache[(font_key, caption)] = self.get_font(config).getlength(caption)
+        return width
+
+    @staticmethod
+    def caption_center(page_size: tuple[int, int], config: ImageConfig) -> tuple[int, int]:
+        """Вычисляет центр подписи на странице"""
+
+        # Позиционируем текст по центру внизу
+        width, height = page_size
+        return width // 2, height - config.text_margin // 2
+
     @classmethod
-    def _generate_caption(cls, image_path: str, scale_ratio: tuple[int, int]) -> str:
+    def generate_caption(cls, image_path: str, scale_ratio: tuple[int, int]) -> str:
         """Генерирует текст подписи"""
 
         filename = get_filename_without_extension(image_path)
@@ -41,39 +105,9 @@ class CaptionBuilder:
         """Генерирует текст масштаба"""
 
         denominator, numerator = scale_ratio
-
-        if denominator == 1 and numerator == 1:
-            scale_text = "1:1"
-        elif denominator == 5 and numerator == 2:
-            scale_text = "1:2.5"
-        else:
-            scale_text = f"1:{denominator}"
-
-        return f"Масштаб: {scale_text}"
-
-    def _get_font(self, size: int, font_style: str) -> ImageFont.FreeTypeFont:
-        """Получает шрифт (с кэшированием)"""
-
-        cache_key = f"{font_style}_{size}"
-        if cache_key not in self._font_cache:
-            self._font_cache[cache_key] = self._load_font(size, font_style)
-        return self._font_cache[cache_key]
+        return f"Масштаб: {format_scale(Fraction(numerator, denominator))}"
 
     @staticmethod
-    def _load_font(size: int, preferred_font: str) -> ImageFont.FreeTypeFont:
-        """Загружает шрифт с fallback'ами"""
-
-        font_paths = (
-            preferred_font,
-            "arial.ttf",
-            "DejaVuSans.ttf",
-            "LiberationSans-Regular.ttf",
-        )
-
-        for font_path in font_paths:
-            try:
-                return ImageFont.truetype(font_path, size)
-            except OSError:
-                continue
-
-        return ImageFont.load_default()
+    def get_font(config: ImageConfig) -> ImageFont.FreeTypeFont:
+        """Получает шрифт подписи согласно конфигурации (общий для всего процесса)"""
+        return get_font_registry(config.cache_dir).get_font(config.font_style, config.font_size)
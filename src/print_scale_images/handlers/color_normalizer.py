@@ -0,0 +1,107 @@
+from typing import Optional
+
+from PIL import Image, ImageChops
+
+# Режимы страницы после нормализации: черно-белый, оттенки серого, цветной
+PAGE_MODES = ("1", "L", "RGB")
+
+# Режимы с прозрачностью: изображение накладывается на белый фон
+ALPHA_MODES = ("LA", "La", "PA", "RGBA", "RGBa")
+
+
+class ColorNormalizer:
+    """Явное приведение цветового режима изображения к режиму страницы
+
+    Исходник переводится в рабочий режим (1, L или RGB) без неявных преобразований
+    при вставке, а результат масштабирования - в режим страницы: черно-белые чертежи
+    остаются в режиме 1, серые изображения - в L, в RGB хранятся только цветные.
+    """
+
+    def __init__(self, color_mode: str = "auto"):
+        # "auto" - определять режим по содержимому, "rgb" - всегда цветные страницы
+        self.color_mode = color_mode
+
+    def source_page_mode(self, image: Image.Image) -> Optional[str]:
+        """Режим страницы, известный по режиму исходника (None - определить по пикселям)"""
+
+        if self.color_mode == "rgb":
+            return "RGB"
+        if image.mode == "1":
+            return "1"
+        return None
+
+    def to_working(self, image: Image.Image) -> Image.Image:
+        """Переводит исходник в режим 1, L или RGB"""
+
+        mode = image.mode
+        if mode in PAGE_MODES:
+            return image
+
+        if mode in ALPHA_MODES or (mode == "P" and "transparency" in image.info):
+            white = Image.new("RGBA", image.size, "white")
+            return Image.alpha_composite(white, image.convert("RGBA")).convert("RGB")
+
+        if mode == "P":
+            palette = image.getpalette() or []
+            is_grey_palette = all(palette[i] == palette[i + 1] == palette[i + 2] for i in range(0, len(palette), 3))
+            return image.convert("L" if is_grey_palette else "RGB")
+
+        if mode.startswith("I;16"):
+            return image.convert("I").point(lambda value: value / 256).convert("L")
+
+        if mode in ("I", "F"):
+            # Растягиваем фактический диапазон значений на 0..255
+            low, high = image.getextrema()
+            scale = 255 / (high - low) if high > low else 1
+            return image.point(lambda value: (value - low) * scale).convert("L")
+
+        return image.convert("RGB")
+
+    def for_resize(self, image: Image.Image) -> Image.Image:
+        """Переводит исходник в режим для масштабирования (черно-белые - в L, чтобы не терять линии)"""
+
+        image = self.to_working(image)
+        return image.convert("L") if image.mode == "1" else image
+
+    def detect_page_mode(self, image: Image.Image) -> Optional[str]:
+        """Определяет режим страницы по пикселям рабочего изображения"""
+
+        if self.color_mode == "rgb":
+            return "RGB"
+        if image.mode == "1" or (image.mode == "L" and self.is_bilevel(image)):
+            return "1"
+        return None
+
+    def to_page_mode(self, image: Image.Image, page_mode: Optional[str], scale: float) -> Image.Image:
+        """Приводит масштабированное изображение к режиму страницы
+
+        scale - коэффициент уменьшения, от него зависит порог для черно-белых изображений.
+        """
+
+        if page_mode == "1":
+            if image.mode == "1":
+                return image
+            # Линия толщиной в пиксель после уменьшения становится серой: порог
+            # выбирается так, чтобы она оставалась черной
+            threshold = 255 * (1 - min(scale, 1) / 2)
+            return image.convert("L").point([0 if value < threshold else 255 for value in range(256)], "1")
+
+        if page_mode == "RGB":
+            return image if image.mode == "RGB" else image.convert("RGB")
+
+        if image.mode == "RGB" and self.is_greyscale(image):
+            return image.convert("L")
+        return image
+
+    @staticmethod
+    def is_bilevel(image: Image.Image) -> bool:
+        """Содержит ли изображение в режиме L только черный и белый"""
+        return not any(image.histogram()[1:255])
+
+    @staticmethod
+    def is_greyscale(image: Image.Image) -> bool:
+        """Совпадают ли все каналы изображения RGB"""
+        red, green, blue = image.split()
+        return (
+            ImageChops.difference(red, green).getbbox() is None and ImageChops.difference(green, blue).getbbox() is None
+        )
@@ -0,0 +1,242 @@
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+from loguru import logger
+from PIL import Image, TiffImagePlugin
+
+from src.print_scale_images.config import ImageConfig, ImageInfo, get_app_config
+from src.print_scale_images.handlers.caption_builder import CaptionBuilder
+from src.print_scale_images.handlers.pdf_writer import EncodedImage, PDFWriter
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def render_page(info: ImageInfo, config: ImageConfig, caption_builder: CaptionBuilder) -> Image.Image:
+    """Растеризует страницу A4 (для векторных страниц - с подписью)"""
+
+    if info.a4_image is not None:
+        return info.a4_image
+
+    page = Image.new(info.scaled_image.mode, info.page_size, "white")
+    page.paste(info.scaled_image, info.position)
+    return caption_builder.add_caption(page, info.original_path, info.scale_ratio, config)
+
+
+def check_page_count(page_count: int, action: str = "экспорта") -> None:
+    """Проверяет, что экспортирована (напечатана) хотя бы одна страница"""
+    if page_count == 0:
+        text = f"Нет страниц для {action}"
+        logger.error(text)
+        raise ValueError(text)
+
+
+class PageExporter(ABC):
+    """Экспортер обработанных страниц
+
+    Сжатие страниц выполняется в пуле потоков (кодеры Pillow и zlib отпускают GIL),
+    а запись в итоговый файл - в вызывающем потоке строго по порядку страниц.
+    В работе одновременно не более 2 * workers страниц.
+    """
+
+    def __init__(self, config: Optional[ImageConfig] = None, workers: Optional[int] = None):
+        self.config = config or get_app_config().image_config
+        self.workers = workers or self.config.export_workers or os.cpu_count() or 1
+        self.caption_builder = CaptionBuilder()
+
+    @abstractmethod
+    def export(self, image_infos: Iterable[ImageInfo], output_path: str) -> str:
+        """Экспортирует страницы и возвращает путь к результату"""
+
+    def _iter_encoded(self, items: Iterable[T], encode: Callable[[T], R]) -> Iterator[tuple[T, R]]:
+        """Сжимает элементы в пуле потоков и выдает результаты в исходном порядке"""
+
+        pending: deque = deque()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="export") as executor:
+            try:
+                for item in items:
+                    pending.append((item, executor.submit(encode, item)))
+                    if len(pending) >= 2 * self.workers:
+                        item, future = pending.popleft()
+                        yield item, future.result()
+
+                while pending:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            finally:
+                # При ошибке записи или прерывании экспорта ожидающие страницы не сжимаются
+                for _, future in pending:
+                    future.cancel()
+
+    def _iter_pages(self, image_infos: Iterable[ImageInfo]) -> Iterator[Image.Image]:
+        """Растеризует страницы в вызывающем потоке (шрифт подписи не разделяется между потоками)"""
+        for info in image_infos:
+            yield render_page(info, self.config, self.caption_builder)
+
+
+class PdfPageExporter(PageExporter):
+    """Экспорт в PDF: векторные страницы остаются векторными"""
+
+    def export(self, image_infos: Iterable[ImageInfo], output_path: str) -> str:
+        with PDFWriter(output_path, self.config.dpi) as writer:
+            check_page_count(self.write_pages(writer, image_infos))
+
+        return output_path
+
+    def write_pages(self, writer: PDFWriter, image_infos: Iterable[ImageInfo]) -> int:
+        """Записывает страницы в открытый PDF (файл или поток) и возвращает их количество"""
+
+        for info, encoded in self._iter_encoded(image_infos, self.encode_page):
+            self.add_page(writer, info, encoded)
+        return writer.page_count
+
+    def add_page(self, writer: PDFWriter, info: ImageInfo, encoded: Optional[EncodedImage] = None) -> None:
+        """Добавляет обработанное изображение в открытый PDF (encoded - заранее сжатое encode_page)"""
+
+        if encoded is None:
+            encoded = self.encode_page(info)
+
+        if info.a4_image is not None:
+            writer.add_raster_page(encoded)
+            return
+
+        # Векторный режим: встраиваем только масштабированное изображение и текст подписи
+        writer.add_image_page(
+            info.page_size,
+            encoded,
+            info.position,
+            caption=info.caption,
+            caption_origin=self.caption_builder.caption_origin(info.caption, info.page_size, self.config),
+            font=self.caption_builder.get_font(self.config),
+        )
+
+    @classmethod
+    def encode_page(cls, info: ImageInfo) -> EncodedImage:
+        """Сжимает изображение страницы (может выполняться в другом потоке)"""
+
+        if info.a4_image is not None:
+            return PDFWriter.encode_raster_page(info.a4_image)
+        return PDFWriter.encode_image(info.scaled_image, cls._jpeg_passthrough(info))
+
+    @staticmethod
+    def _jpeg_passthrough(info: ImageInfo) -> Optional[bytes]:
+        """Возвращает исходный JPEG, если его можно встроить без перекодирования"""
+
+        if (
+            info.source_format != "JPEG"
+            or info.scale_ratio != (1, 1)
+            or info.scaled_size != info.original_size
+            or info.scaled_image.mode not in ("L", "RGB")
+            or info.scaled_image.mode != info.source_mode
+        ):
+            return None
+
+        try:
+            return Path(info.original_path).read_bytes()
+        except OSError as e:
+            logger.warning(f"Не удалось прочитать исходный JPEG {info.original_path}: {e}")
+            return None
+
+
+class TiffPageExporter(PageExporter):
+    """Экспорт в многостраничный TIFF: черно-белые страницы - CCITT G4, остальные - LZW
+
+    Каждая страница сжимается в отдельный TIFF в памяти, а AppendingTiffWriter
+    дописывает его в итоговый файл, исправляя смещения.
+    """
+
+    def export(self, image_infos: Iterable[ImageInfo], output_path: str) -> str:
+        page_count = 0
+        try:
+            with TiffImagePlugin.AppendingTiffWriter(output_path, new=True) as tiff:
+                for _, data in self._iter_encoded(self._iter_pages(image_infos), self._encode):
+                    tiff.write(data)
+                    tiff.newFrame()
+                    page_count += 1
+            check_page_count(page_count)
+        except BaseException:
+            # Незавершенный TIFF бесполезен - удаляем его
+            Path(output_path).unlink(missing_ok=True)
+            raise
+
+        return output_path
+
+    def _encode(self, page: Image.Image) -> bytes:
+        """Сжимает страницу в одностраничный TIFF"""
+
+        buffer = BytesIO()
+        compression = "group4" if page.mode == "1" else "tiff_lzw"
+        page.save(buffer, "TIFF", compression=compression, dpi=(self.config.dpi, self.config.dpi))
+        return buffer.getvalue()
+
+
+class ImageFilesExporter(PageExporter):
+    """Экспорт каждой страницы в отдельный файл PNG или JPEG: <имя>_0001.png, <имя>_0002.png, ..."""
+
+    def __init__(self, image_format: str, config: Optional[ImageConfig] = None, workers: Optional[int] = None):
+        super().__init__(config, workers)
+        self.image_format = image_format
+
+    def export(self, image_infos: Iterable[ImageInfo], output_path: str) -> str:
+        """Возвращает путь к файлу первой страницы"""
+
+        output = Path(output_path)
+        page_paths = []
+        for _, data in self._iter_encoded(self._iter_pages(image_infos), self._encode):
+            page_path = output.with_name(f"{output.stem}_{len(page_paths) + 1:04d}{output.suffix}")
+            page_path.write_bytes(data)
+            page_paths.append(page_path)
+        check_page_count(len(page_paths))
+
+        return str(page_paths[0])
+
+    def _encode(self, page: Image.Image) -> bytes:
+        """Сжимает страницу в PNG или JPEG"""
+
+        if self.image_format == "JPEG" and page.mode not in ("L", "RGB", "CMYK"):
+            page = page.convert("L" if page.mode == "1" else "RGB")
+
+        buffer = BytesIO()
+        page.save(buffer, self.image_format, dpi=(self.config.dpi, self.config.dpi))
+        return buffer.getvalue()
+
+
+# Форматы экспорта по расширению итогового файла
+EXPORT_FORMATS = {
+    ".pdf": "PDF",
+    ".tif": "TIFF",
+    ".tiff": "TIFF",
+    ".png": "PNG",
+    ".jpg": "JPEG",
+    ".jpeg": "JPEG",
+}
+
+# Типы файлов для диалога сохранения
+EXPORT_FILETYPES = [
+    ("PDF", "*.pdf"),
+    ("Многостраничный TIFF", "*.tif *.tiff"),
+    ("PNG (файл на страницу)", "*.png"),
+    ("JPEG (файл на страницу)", "*.jpg *.jpeg"),
+]
+
+
+def create_exporter(
+    output_path: str, config: Optional[ImageConfig] = None, workers: Optional[int] = None
+) -> PageExporter:
+    """Создает экспортер по расширению итогового файла"""
+
+    image_format = EXPORT_FORMATS.get(Path(output_path).suffix.lower())
+    match image_format:
+        case "PDF":
+            return PdfPageExporter(config, workers)
+        case "TIFF":
+            return TiffPageExporter(config, workers)
+        case "PNG" | "JPEG":
+            return ImageFilesExporter(image_format, config, workers)
+
+    raise ValueError(f"Неподдерживаемый формат экспорта: {output_path} (допустимы {', '.join(EXPORT_FORMATS)})")
@@ -0,0 +1,185 @@
+import json
+import os
+import platform
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from PIL import ImageFont
+
+from src.print_scale_images.handlers.page_cache import DEFAULT_CACHE_DIR
+
+# Версия формата индекса шрифтов
+INDEX_VERSION = 1
+
+# Расширения файлов шрифтов
+FONT_SUFFIXES = (".ttf", ".otf", ".ttc")
+
+# Шрифты, которые пробуются, если запрошенный не найден
+FALLBACK_FONTS = ("arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf")
+
+
+def font_directories() -> list[Path]:
+    """Системные и пользовательские каталоги шрифтов текущей ОС"""
+
+    home = Path.home()
+    system_name = platform.system()
+
+    if system_name == "Windows":
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        directories = [Path(windir) / "Fonts"]
+        if local_app_data := os.environ.get("LOCALAPPDATA"):
+            directories.append(Path(local_app_data) / "Microsoft" / "Windows" / "Fonts")
+    elif system_name == "Darwin":
+        directories = [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"]
+    else:
+        data_dirs = os.environ.get("XDG_DATA_DIRS") or "/usr/local/share:/usr/share"
+        data_home = os.environ.get("XDG_DATA_HOME") or str(home / ".local" / "share")
+        directories = [Path(data_home) / "fonts", home / ".fonts"]
+        directories += [Path(data_dir) / "fonts" for data_dir in data_dirs.split(os.pathsep) if data_dir]
+
+    # Без повторов, в исходном порядке
+    return list(dict.fromkeys(directories))
+
+
+class FontRegistry:
+    """Реестр шрифтов процесса
+
+    Каталоги шрифтов обходятся один раз, индекс "имя файла -> путь" сохраняется на диск
+    и считается действительным, пока не изменилось время изменения ни одного из
+    проиндексированных каталогов. Загруженные шрифты кэшируются и разделяются всеми
+    строителями подписей процесса; процессы пула обработки читают готовый индекс с диска.
+    """
+
+    def __init__(self, index_path: Optional[Path] = None, directories: Optional[list[Path]] = None):
+        self.index_path = index_path or font_index_path()
+        self.directories = directories if directories is not None else font_directories()
+
+        # Загрузка шрифта под блокировкой обращается к индексу под той же блокировкой
+        self._lock = threading.RLock()
+        self._index: Optional[dict[str, str]] = None
+        self._fonts: dict[tuple[str, int], ImageFont.FreeTypeFont | ImageFont.ImageFont] = {}
+
+    def get_font(self, name: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+        """Шрифт по имени файла ("calibri.ttf", "Calibri") или пути, с запасными шрифтами"""
+
+        key = (name, size)
+        font = self._fonts.get(key)
+        if font is not None:
+            return font
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                font = self._fonts[key] = self._load_font(name, size)
+        return font
+
+    def find(self, name: str) -> Optional[str]:
+        """Путь к файлу шрифта по имени (None, если шрифт не найден)"""
+
+        if Path(name).is_file():
+            return name
+
+        return self._get_index().get(Path(name).name.lower())
+
+    def _load_font(self, name: str, size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+        """Загружает шрифт или первый найденный запасной"""
+
+        for candidate in (name, *FALLBACK_FONTS):
+            path = self.find(candidate)
+            if path is None:
+                continue
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError as e:
+                logger.warning(f"Не удалось загрузить шрифт {path}: {e}")
+
+        logger.warning(f"Шрифт {name} и запасные шрифты не найдены, используется встроенный")
+        return ImageFont.load_default(size)
+
+    def _get_index(self) -> dict[str, str]:
+        """Индекс шрифтов: с диска, если он действителен, иначе - новый обход каталогов"""
+
+        if self._index is not None:
+            return self._index
+
+        with self._lock:
+            if self._index is None:
+                self._index = self._read_index()
+                if self._index is None:
+                    self._index = self._build_index()
+        return self._index
+
+    def _read_index(self) -> Optional[dict[str, str]]:
+        """Читает индекс с диска (None, если его нет или каталоги шрифтов изменились)"""
+
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != INDEX_VERSION or data.get("roots") != [str(path) for path in self.directories]:
+            return None
+        for directory, mtime_ns in data["directories"].items():
+            if _mtime_ns(Path(directory)) != mtime_ns:
+                return None
+
+        return data["fonts"]
+
+    def _build_index(self) -> dict[str, str]:
+        """Обходит каталоги шрифтов и сохраняет индекс на диск"""
+
+        fonts: dict[str, str] = {}
+        directories: dict[str, Optional[int]] = {}
+        for root in self.directories:
+            # Отсутствующий каталог тоже запоминается: его появление делает индекс недействительным
+            directories[str(root)] = _mtime_ns(root)
+            for directory, _, files in os.walk(root):
+                directories[directory] = _mtime_ns(Path(directory))
+                for file_name in files:
+                    path = Path(directory) / file_name
+                    if path.suffix.lower() in FONT_SUFFIXES:
+                        # Шрифт находится и по имени файла, и по имени без расширения
+                        fonts.setdefault(path.name.lower(), str(path))
+                        fonts.setdefault(path.stem.lower(), str(path))
+
+        logger.debug(f"Проиндексировано шрифтов: {len(fonts)} в {len(directories)} каталогах")
+
+        data = {
+            "version": INDEX_VERSION,
+            "roots": [str(path) for path in self.directories],
+            "directories": directories,
+            "fonts": fonts,
+        }
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(data, f)
+            tmp_path.replace(self.index_path)
+        except OSError as e:
+            logger.warning(f"Не удалось сохранить индекс шрифтов: {e}")
+
+        return fonts
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    """Время изменения каталога (None, если его нет)"""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def font_index_path(cache_dir: str = "") -> Path:
+    """Путь индекса шрифтов: в своем подкаталоге, чтобы его не учитывал и не вытеснял кэш страниц"""
+    return (Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR) / "fonts" / "font_index.json"
+
+
+@lru_cache(maxsize=None)
+def get_font_registry(cache_dir: str = "") -> FontRegistry:
+    """Возвращает реестр шрифтов процесса для каталога кэша, создавая его при первом обращении"""
+    return FontRegistry(font_index_path(cache_dir))
@@ -0,0 +1,190 @@
+"""Подмножество шрифта TrueType для встраивания в PDF
+
+В подмножестве остаются только глифы использованных символов (и составляющие составных
+глифов), контуры остальных удаляются, а номера глифов сохраняются - поэтому таблицы
+cmap и hmtx остаются верными. Из таблиц остаются только нужные PDF для FontFile2.
+"""
+
+import struct
+from typing import Iterable
+
+# Таблицы, нужные для шрифта FontFile2 простого шрифта TrueType (остальные не встраиваются)
+KEPT_TABLES = (b"cmap", b"cvt ", b"fpgm", b"glyf", b"head", b"hhea", b"hmtx", b"loca", b"maxp", b"prep")
+
+# Флаги компонента составного глифа
+_ARG_1_AND_2_ARE_WORDS = 0x0001
+_WE_HAVE_A_SCALE = 0x0008
+_MORE_COMPONENTS = 0x0020
+_WE_HAVE_AN_X_AND_Y_SCALE = 0x0040
+_WE_HAVE_A_TWO_BY_TWO = 0x0080
+
+
+def subset_truetype(data: bytes, chars: Iterable[str]) -> bytes:
+    """Возвращает шрифт только с глифами символов chars (исходный шрифт, если его не удалось разобрать)"""
+
+    try:
+        return _subset(data, chars)
+    except (struct.error, KeyError, ValueError, IndexError):
+        return data
+
+
+def _subset(data: bytes, chars: Iterable[str]) -> bytes:
+    tables = _read_tables(data)
+    glyf = tables[b"glyf"]
+    head = bytearray(tables[b"head"])
+    glyph_count = struct.unpack_from(">H", tables[b"maxp"], 4)[0]
+
+    loca = tables[b"loca"]
+    if struct.unpack_from(">h", head, 50)[0] == 0:
+        offsets = [offset * 2 for offset in struct.unpack_from(f">{glyph_count + 1}H", loca)]
+    else:
+        offsets = list(struct.unpack_from(f">{glyph_count + 1}I", loca))
+
+    cmap = _read_cmap(tables[b"cmap"])
+    # Глиф 0 (.notdef) обязателен
+    pending = [0] + [cmap[ord(char)] for char in chars if ord(char) in cmap]
+    kept = set()
+    while pending:
+        glyph = pending.pop()
+        if glyph in kept or glyph >= glyph_count:
+            continue
+        kept.add(glyph)
+        pending.extend(_components(glyf[offsets[glyph] : offsets[glyph + 1]]))
+
+    new_glyf = bytearray()
+    new_offsets = []
+    for glyph in range(glyph_count):
+        new_offsets.append(len(new_glyf))
+        if glyph in kept:
+            new_glyf += glyf[offsets[glyph] : offsets[glyph + 1]]
+            new_glyf += bytes(-len(new_glyf) % 4)
+    new_offsets.append(len(new_glyf))
+
+    # Длинный формат loca и обнуленная контрольная сумма (пересчитывается при сборке)
+    struct.pack_into(">h", head, 50, 1)
+    struct.pack_into(">I", head, 8, 0)
+
+    tables[b"glyf"] = bytes(new_glyf)
+    tables[b"loca"] = struct.pack(f">{len(new_offsets)}I", *new_offsets)
+    tables[b"head"] = bytes(head)
+    return _build({tag: table for tag, table in tables.items() if tag in KEPT_TABLES})
+
+
+def _read_tables(data: bytes) -> dict[bytes, bytes]:
+    """Таблицы шрифта по тегам"""
+
+    if data[:4] not in (b"\x00\x01\x00\x00", b"true"):
+        raise ValueError("не шрифт TrueType")
+    table_count = struct.unpack_from(">H", data, 4)[0]
+    tables = {}
+    for index in range(table_count):
+        tag, _, offset, length = struct.unpack_from(">4sIII", data, 12 + 16 * index)
+        tables[tag] = data[offset : offset + length]
+    return tables
+
+
+def _read_cmap(cmap: bytes) -> dict[int, int]:
+    """Код символа Unicode -> номер глифа (подтаблица Windows Unicode формата 12 или 4)"""
+
+    subtables = {}
+    for index in range(struct.unpack_from(">H", cmap, 2)[0]):
+        platform_id, encoding_id, offset = struct.unpack_from(">HHI", cmap, 4 + 8 * index)
+        subtables[(platform_id, encoding_id)] = offset
+
+    for key in ((3, 10), (0, 4), (3, 1), (0, 3)):
+        offset = subtables.get(key)
+        if offset is None:
+            continue
+        table_format = struct.unpack_from(">H", cmap, offset)[0]
+        if table_format == 12:
+            return _read_cmap_12(cmap, offset)
+        if table_format == 4:
+            return _read_cmap_4(cmap, offset)
+    raise ValueError("нет подтаблицы cmap Unicode")
+
+
+def _read_cmap_4(cmap: bytes, offset: int) -> dict[int, int]:
+    segment_count = struct.unpack_from(">H", cmap, offset + 6)[0] // 2
+    ends_at = offset + 14
+    starts_at = ends_at + 2 * segment_count + 2
+    deltas_at = starts_at + 2 * segment_count
+    range_offsets_at = deltas_at + 2 * segment_count
+
+    ends = struct.unpack_from(f">{segment_count}H", cmap, ends_at)
+    starts = struct.unpack_from(f">{segment_count}H", cmap, starts_at)
+    deltas = struct.unpack_from(f">{segment_count}h", cmap, deltas_at)
+    range_offsets = struct.unpack_from(f">{segment_count}H", cmap, range_offsets_at)
+
+    mapping = {}
+    for segment, (start, end, delta, range_offset) in enumerate(zip(starts, ends, deltas, range_offsets)):
+        for code in range(start, min(end, 0xFFFE) + 1):
+            if range_offset == 0:
+                glyph = (code + delta) & 0xFFFF
+            else:
+                # Смещение отсчитывается от самого элемента idRangeOffset
+                glyph_at = range_offsets_at + 2 * segment + range_offset + 2 * (code - start)
+                glyph = struct.unpack_from(">H", cmap, glyph_at)[0]
+                if glyph:
+                    glyph = (glyph + delta) & 0xFFFF
+            if glyph:
+                mapping[code] = glyph
+    return mapping
+
+
+def _read_cmap_12(cmap: bytes, offset: int) -> dict[int, int]:
+    mapping = {}
+    for index in range(struct.unpack_from(">I", cmap, offset + 12)[0]):
+        start, end, glyph = struct.unpack_from(">III", cmap, offset + 16 + 12 * index)
+        for code in range(start, end + 1):
+            mapping[code] = glyph + code - start
+    return mapping
+
+
+def _components(glyph: bytes) -> list[int]:
+    """Номера глифов - составляющих составного глифа"""
+
+    if len(glyph) < 10 or struct.unpack_from(">h", glyph, 0)[0] >= 0:
+        return []
+
+    components = []
+    position = 10
+    while True:
+        flags, component = struct.unpack_from(">HH", glyph, position)
+        components.append(component)
+        position += 4 + (4 if flags & _ARG_1_AND_2_ARE_WORDS else 2)
+        if flags & _WE_HAVE_A_SCALE:
+            position += 2
+        elif flags & _WE_HAVE_AN_X_AND_Y_SCALE:
+            position += 4
+        elif flags & _WE_HAVE_A_TWO_BY_TWO:
+            position += 8
+        if not flags & _MORE_COMPONENTS:
+            return components
+
+
+def _checksum(data: bytes) -> int:
+    data += bytes(-len(data) % 4)
+    return sum(struct.unpack(f">{len(data) // 4}I", data)) & 0xFFFFFFFF
+
+
+def _build(tables: dict[bytes, bytes]) -> bytes:
+    """Собирает файл шрифта из таблиц"""
+
+    tags = sorted(tables)
+    entry_selector = max(len(tags).bit_length() - 1, 0)
+    search_range = 16 * (1 << entry_selector)
+    header = struct.pack(">IHHHH", 0x00010000, len(tags), search_range, entry_selector, 16 * len(tags) - search_range)
+
+    directory = bytearray()
+    body = bytearray()
+    offset = len(header) + 16 * len(tags)
+    for tag in tags:
+        table = tables[tag]
+        directory += struct.pack(">4sIII", tag, _checksum(table), offset + len(body), len(table))
+        body += table + bytes(-len(table) % 4)
+
+    font = bytearray(header + directory + body)
+    if b"head" in tables:
+        head_offset = offset + sum(len(tables[tag]) + -len(tables[tag]) % 4 for tag in tags[: tags.index(b"head")])
+        struct.pack_into(">I", font, head_offset + 8, (0xB1B0AFBA - _checksum(bytes(font))) & 0xFFFFFFFF)
+    return bytes(font)
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from loguru import logger
+
+from src.print_scale_images.config import (
+    SUPPORTED_FORMATS,
+    ImageConfig,
+    ImageInfo,
+    PrintConfig,
+)
+from src.print_scale_images.handlers.exporters import PdfPageExporter
+from src.print_scale_images.handlers.image_service import ImageProcessingService
+from src.print_scale_images.handlers.pdf_writer import PDFWriter
+from src.utils.files import iter_files, natural_sort_key
+from src.utils.watcher import CREATED, MODIFIED, RESCAN, DirectoryWatcher, FileEvent
+
+# Версия формата файла состояния
+STATE_VERSION = 1
+
+# Имя файла состояния в наблюдаемом каталоге (для печати, когда итогового файла нет)
+PRINT_STATE_NAME = ".print_scale_images.watch.json"
+
+
+class HotFolderService:
+    """Режим горячей папки: новые изображения обрабатываются по мере появления
+
+    Изображения, которые еще копируются, пропускаются, пока их размер и время изменения
+    не перестанут меняться (settle секунд). Каждая готовая пачка обрабатывается
+    ImageProcessingService и дописывается в PDF (с контрольной точкой после пачки)
+    или отправляется на печать. Обработанные файлы (путь, размер, время изменения)
+    и состояние PDF сохраняются в файл состояния, поэтому после перезапуска уже
+    обработанные изображения не повторяются, а PDF продолжается с последней пачки.
+    Измененный файл обрабатывается заново и добавляется новой страницей.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        config: ImageConfig,
+        output_path: Optional[str] = None,
+        print_config: Optional[PrintConfig] = None,
+        state_path: Optional[str] = None,
+        recursive: bool = False,
+        settle: float = 2.0,
+        use_inotify: bool = True,
+        workers: int = 1,
+    ):
+        self.directory = directory
+        self.config = config
+        self.output_path = output_path
+        self.print_config = print_config
+        self.recursive = recursive
+        self.settle = settle
+        self.use_inotify = use_inotify
+
+        if state_path is None:
+            if output_path is not None:
+                state_path = f"{output_path}.watch.json"
+            else:
+                state_path = str(Path(directory) / PRINT_STATE_NAME)
+        self.state_path = Path(state_path)
+
+        self.service = ImageProcessingService(config, workers=workers)
+        self.exporter = PdfPageExporter(config)
+        self._printer = None
+        self._writer: Optional[PDFWriter] = None
+        self._pdf_state: Optional[dict] = None
+        # Обработанные файлы: абсолютный путь -> [размер, время изменения в нс]
+        self._processed: dict[str, list[int]] = {}
+
+    def run(self, stop_event: Optional[threading.Event] = None) -> None:
+        """Обрабатывает имеющиеся и новые изображения, пока не установлен stop_event"""
+
+        self._load_state()
+        if self.output_path is None:
+            from src.print_scale_images.handlers.print_service import PrinterService
+
+            self._printer = PrinterService(self.print_config, self.config)
+
+        watcher = DirectoryWatcher(
+            self.directory,
+            recursive=self.recursive,
+            extensions=SUPPORTED_FORMATS,
+            settle=self.settle,
+            poll_interval=self.settle,
+            use_inotify=self.use_inotify,
+            report_existing=True,
+        )
+        target = self.output_path or "печать"
+        logger.info(
+            f"Наблюдение за {self.directory} ({watcher.backend}) -> {target}, обработано ранее: {len(self._processed)}"
+        )
+
+        try:
+            for batch in watcher.iter_batches(stop_event):
+                image_paths = self._select(batch)
+                if image_paths:
+                    self._process(image_paths)
+        finally:
+            watcher.close()
+            if self._writer is not None:
+                # Все обработанные пачки уже записаны контрольными точками
+                self._writer.abort()
+                self._writer = None
+
+    def _select(self, batch: list[FileEvent]) -> list[str]:
+        """Отбирает новые и измененные изображения, которые еще не обработаны"""
+
+        candidates = []
+        for event in batch:
+            if event.kind == RESCAN:
+                logger.warning(f"События изменений потеряны, каталог {self.directory} проверяется заново")
+                candidates.extend(iter_files(self.directory, SUPPORTED_FORMATS, self.recursive))
+            elif event.kind in (CREATED, MODIFIED) and not event.is_dir:
+                candidates.append(event.path)
+
+        image_paths = []
+        for image_path in dict.fromkeys(candidates):
+            try:
+                stat = Path(image_path).stat()
+            except OSError:
+                continue
+            if self._processed.get(self._key(image_path)) != [stat.st_size, stat.st_mtime_ns]:
+                image_paths.append(image_path)
+
+        return sorted(image_paths, key=natural_sort_key)
+
+    def _process(self, image_paths: list[str]) -> None:
+        """Обрабатывает пачку изображений, дописывает ее в PDF или печатает и сохраняет состояние"""
+
+        # Файл, удаленный или недоступный после отбора, пропускается и не отмечается обработанным:
+        # он обработается, когда снова появится или изменится
+        signatures = {}
+        available = []
+        for image_path in image_paths:
+            try:
+                stat = Path(image_path).stat()
+            except OSError as e:
+                logger.warning(f"Изображение пропущено: {e}")
+                continue
+            signatures[self._key(image_path)] = [stat.st_size, stat.st_mtime_ns]
+            available.append(image_path)
+        if not available:
+            return
+        image_paths = available
+
+        logger.info(f"Новых изображений: {len(image_paths)}")
+        image_infos: Iterable[ImageInfo] = self.service.iter_process_images(image_paths)
+        if self.config.pack_pages:
+            from src.print_scale_images.handlers.page_packer import PagePacker
+
+            image_infos = PagePacker(self.config).pack(image_infos)
+
+        if self._printer is not None:
+            # Пачка печатается целиком до следующей: сервис обработки и шрифты не разделяются
+            # между пачками, а файлы отмечаются обработанными только после печати
+            if not self._printer.print_images(image_infos, wait=True):
+                logger.error(f"Пачка не напечатана, изображений: {len(image_paths)} (не отмечены обработанными)")
+                return
+        else:
+            writer = self._get_writer()
+            page_count = writer.page_count
+            self.exporter.write_pages(writer, image_infos)
+            self._pdf_state = writer.checkpoint()
+            logger.info(
+                f"Добавлено страниц: {writer.page_count - page_count}, всего в {self.output_path}: {writer.page_count}"
+            )
+
+        # Изображения с ошибками тоже отмечаются: они обработаются снова, только если файл изменится
+        self._processed.update(signatures)
+        self._save_state()
+
+    def _get_writer(self) -> PDFWriter:
+        """Открывает итоговый PDF: продолжает его с последней контрольной точки или создает новый"""
+
+        if self._writer is None:
+            self._writer = PDFWriter(self.output_path, self.config.dpi, self._pdf_state)
+        return self._writer
+
+    def _load_state(self) -> None:
+        """Читает файл состояния; если итоговый PDF не совпадает с ним, все начинается заново"""
+
+        try:
+            with self.state_path.open("r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"Не удалось прочитать состояние {self.state_path}: {e}")
+            return
+
+        if state.get("version") != STATE_VERSION:
+            return
+
+        pdf_state = state.get("pdf")
+        if self.output_path is not None:
+            try:
+                size = Path(self.output_path).stat().st_size
+            except OSError:
+                size = -1
+            if pdf_state is None or size < pdf_state["size"]:
+                logger.warning(f"{self.output_path} не соответствует состоянию {self.state_path}, создается заново")
+                return
+
+        self._processed = state.get("processed", {})
+        self._pdf_state = pdf_state
+
+    def _save_state(self) -> None:
+        """Атомарно сохраняет файл состояния"""
+
+        state = {"version": STATE_VERSION, "processed": self._processed, "pdf": self._pdf_state}
+        tmp_path = self.state_path.with_name(f"{self.state_path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path.replace(self.state_path)
+
+    @staticmethod
+    def _key(image_path: str) -> str:
+        """Ключ файла в состоянии"""
+        return str(Path(image_path).resolve())
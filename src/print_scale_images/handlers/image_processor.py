@@ -3,6 +3,9 @@ from abc import ABC, abstractmethod
 from PIL import Image
 
 from src.print_scale_images.config import ImageConfig, ImageInfo
+from src.print_scale_images.handlers.color_normalizer import ColorNormalizer
+from src.print_scale_images.handlers.scale_planner import A4_SIZE_LANDSCAPE, plan_page
+from src.print_scale_images.handlers.tiled_reader import resize_low_memory
 
 
 class ImageProcessor(ABC):
@@ -17,8 +20,7 @@ class A4ImageProcessor(ImageProcessor):
     """Обработчик для подготовки изображений к изменению размера на A4"""
 
     def __init__(self):
-        # A4 в альбомной ориентации 300 DPI: 297mm x 210mm
-        self.a4_size_landscape = (3508, 2480)  # высота x ширина
+        self.a4_size_landscape = A4_SIZE_LANDSCAPE
 
     def process(self, image: Image.Image, config: ImageConfig) -> ImageInfo:
         """Обрабатывает изображение для изменения размеров на A4"""
@@ -34,66 +36,64 @@ class A4ImageProcessor(ImageProcessor):
             a4_image=a4_image,
         )
 
+    def layout(self, image: Image.Image, config: ImageConfig) -> ImageInfo:
+        """Масштабирует изображение и вычисляет его положение на A4 без растеризации страницы"""
+
+        scaled_image, scale_ratio, (x, y, *_) = self._scale_image(image, config)
+
+        return ImageInfo(
+            original_path="",
+            original_size=image.size,
+            scaled_size=scaled_image.size,
+            scale_ratio=scale_ratio,
+            scaled_image=scaled_image,
+            position=(x, y),
+            page_size=self.a4_size_landscape,
+            source_format=image.format,
+            source_mode=image.mode,
+        )
+
     def _scale_image(
         self, image: Image.Image, config: ImageConfig
     ) -> tuple[Image.Image, tuple[int, int], tuple[int, int, int, int]]:
-        """Масштабирует изображение для вписывания в A4 с целочисленными коэффициентами"""
-
-        # Максимальный размер с учетом отступов и места для подписи
-        max_width = self.a4_size_landscape[0] - 2 * config.margin
-        max_height = self.a4_size_landscape[1] - 2 * config.margin - config.text_margin
-
-        # Вычисляем масштаб для вписывания
-        width_ratio = max_width / image.width
-        height_ratio = max_height / image.height
-        scale = min(width_ratio, height_ratio)
-
-        # Если изображение уже помещается, используем оригинальный размер
-        if scale >= 1.0:
-            scale_ratio = (1, 1)
-            new_size = image.size
-        else:
-            # Находим ближайший меньший масштаб из допустимых: 1:1, 1:2, 1:2.5, 1:4, 1:5
-            allowed_scales = [1.0, 0.5, 0.4, 0.25, 0.2]  # 1:1, 1:2, 1:2.5, 1:4, 1:5
-            scale_ratio = (1, 1)
-
-            # Ищем наибольший допустимый масштаб, который <= вычисленного
-            for allowed_scale in allowed_scales:
-                if allowed_scale <= scale:
-                    new_scale = allowed_scale
-                    break
-            else:
-                # Если ни один не подошел, берем самый маленький
-                new_scale = allowed_scales[-1]
+        """Масштабирует изображение для вписывания в A4 с допустимыми масштабами из конфигурации"""
+
+        plan = plan_page(image.size, config)
+        scaled_image = self._resize(image, plan.scaled_size, config)
 
-            # Преобразуем масштаб в ratio для подписи
-            if new_scale == 1.0:
-                scale_ratio = (1, 1)
-            elif new_scale == 0.5:
-                scale_ratio = (2, 1)
-            elif new_scale == 0.4:
-                scale_ratio = (5, 2)  # 1:2.5
-            elif new_scale == 0.25:
-                scale_ratio = (4, 1)
-            elif new_scale == 0.2:
-                scale_ratio = (5, 1)
+        return scaled_image, plan.scale_ratio, (*plan.position, *plan.scaled_size)
 
-            scale = new_scale
-            new_size = (int(image.width * scale), int(image.height * scale))
+    @staticmethod
+    def _resize(image: Image.Image, new_size: tuple[int, int], config: ImageConfig) -> Image.Image:
+        """Масштабирует изображение с явным приведением к режиму страницы (1, L или RGB)"""
 
-        # Масштабируем изображение
-        scaled_image = image.resize(new_size, Image.Resampling.LANCZOS)
+        normalizer = ColorNormalizer(config.color_mode)
+        page_mode = normalizer.source_page_mode(image)
+        scale = new_size[0] / image.width
 
-        # Вычисляем позицию для центрирования
-        x = (self.a4_size_landscape[0] - new_size[0]) // 2
-        y = (self.a4_size_landscape[1] - new_size[1] - config.text_margin) // 2
+        # Черно-белые изображения уменьшаются усреднением, без ореолов LANCZOS
+        resample = Image.Resampling.BOX if page_mode == "1" else Image.Resampling.LANCZOS
+
+        # Большие TIFF масштабируются по полосам, не декодируя их целиком
+        scaled_image = resize_low_memory(image, new_size, resample, config.max_decode_mb, normalizer.for_resize)
+        if scaled_image is None:
+            working_image = normalizer.to_working(image)
+            page_mode = page_mode or normalizer.detect_page_mode(working_image)
+            if page_mode == "1":
+                resample = Image.Resampling.BOX
+
+            if new_size == working_image.size:
+                scaled_image = working_image.copy()
+            else:
+                scaled_image = normalizer.for_resize(working_image).resize(new_size, resample)
 
-        return scaled_image, scale_ratio, (x, y, new_size[0], new_size[1])
+        return normalizer.to_page_mode(scaled_image, page_mode, scale)
 
     def _create_a4_page(self, image: Image.Image, config: ImageConfig) -> Image.Image:
         """Создает страницу A4 с изображением"""
 
-        a4_image = Image.new("RGB", self.a4_size_landscape, "white")
+        # Страница создается в режиме изображения: черно-белые и серые страницы не переводятся в RGB
+        a4_image = Image.new(image.mode, self.a4_size_landscape, "white")
 
         # Центрируем изображение
         x = (self.a4_size_landscape[0] - image.width) // 2
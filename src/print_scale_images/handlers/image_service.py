@@ -1,42 +1,156 @@
-from typing import List
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterable, Iterator, List, Optional
 
 from loguru import logger
 from PIL import Image
 
-from src.print_scale_images.config import ImageInfo, app_config
+from src.print_scale_images.config import ImageConfig, ImageInfo, get_app_config
 from src.print_scale_images.handlers.caption_builder import CaptionBuilder
 from src.print_scale_images.handlers.image_processor import A4ImageProcessor
+from src.print_scale_images.handlers.page_cache import PageCache
 
 
 class ImageProcessingService:
     """Сервис для управления процессом печати"""
 
-    def __init__(self):
+    def __init__(self, config: Optional[ImageConfig] = None, workers: int = 1):
         self.image_processor = A4ImageProcessor()
         self.caption_builder = CaptionBuilder()
-        self.config = app_config.image_config
+        self.config = config or get_app_config().image_config
+        # Количество процессов для обработки (1 - обработка в текущем процессе)
+        self.workers = workers
+        self.page_cache = PageCache.from_config(self.config)
 
     def process_images(self, image_paths: List[str]) -> List[ImageInfo]:
         """Обрабатывает список изображений"""
+        return list(self.iter_process_images(image_paths))
 
-        processed_images = []
+    def iter_process_images(
+        self,
+        image_paths: Iterable[str],
+        on_progress: Optional[Callable[[int, str], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[ImageInfo]:
+        """Обрабатывает изображения по одному, не удерживая в памяти уже выданные страницы
+
+        on_progress вызывается после каждого файла (в том числе неудачного) с числом
+        обработанных файлов и путем; установка cancel_event прекращает обработку.
+        """
+
+        if self.workers > 1:
+            results = self._iter_parallel(image_paths, cancel_event)
+        else:
+            results = self._iter_serial(image_paths, cancel_event)
+
+        for done, (image_path, image_info) in enumerate(results, 1):
+            if on_progress is not None:
+                on_progress(done, image_path)
+
+            if image_info is not None:
+                yield image_info
+
+    def _iter_serial(
+        self, image_paths: Iterable[str], cancel_event: Optional[threading.Event]
+    ) -> Iterator[tuple[str, Optional[ImageInfo]]]:
+        """Обрабатывает изображения последовательно в текущем процессе"""
 
         for image_path in image_paths:
-            try:
-                with Image.open(image_path) as original_image:
-                    # Обрабатываем изображение
-                    image_info = self.image_processor.process(original_image, self.config)
-                    image_info.original_path = image_path
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Обработка изображений отменена")
+                return
+
+            yield image_path, self.try_process_image(image_path)
+
+    def _iter_parallel(
+        self, image_paths: Iterable[str], cancel_event: Optional[threading.Event]
+    ) -> Iterator[tuple[str, Optional[ImageInfo]]]:
+        """Обрабатывает изображения в пуле процессов с сохранением порядка
+
+        В работе одновременно находится не более 2 * workers задач, поэтому
+        готовые страницы не накапливаются в памяти при медленном потребителе.
+        """
+
+        pending = deque()
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.config,)
+        ) as executor:
+            for image_path in image_paths:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+
+                pending.append((image_path, executor.submit(_process_in_worker, image_path)))
+                if len(pending) >= 2 * self.workers:
+                    image_path, future = pending.popleft()
+                    yield image_path, future.result()
+
+            while pending and not (cancel_event is not None and cancel_event.is_set()):
+                image_path, future = pending.popleft()
+                yield image_path, future.result()
+
+            if pending:
+                logger.info("Обработка изображений отменена")
+                executor.shutdown(cancel_futures=True)
+
+    def try_process_image(self, image_path: str) -> Optional[ImageInfo]:
+        """Обрабатывает одно изображение, при ошибке записывает ее в лог и возвращает None"""
+
+        try:
+            return self.process_image(image_path)
+        except Exception as e:
+            logger.error(f"Ошибка обработки {image_path}: {e}")
+            return None
+
+    def process_image(self, image_path: str) -> ImageInfo:
+        """Обрабатывает одно изображение (с использованием кэша страниц)"""
+
+        if self.page_cache is not None:
+            image_info = self.page_cache.get(image_path, self.config)
+            if image_info is not None:
+                logger.debug(f"Страница взята из кэша: {image_path}")
+                return image_info
+
+        image_info = self._render_image(image_path)
+
+        if self.page_cache is not None:
+            self.page_cache.put(image_info, self.config)
+
+        return image_info
+
+    def _render_image(self, image_path: str) -> ImageInfo:
+        """Декодирует и отрисовывает одно изображение"""
+
+        with Image.open(image_path) as original_image:
+            if self.config.pdf_mode == "vector" or self.config.pack_pages:
+                # Страница не растеризуется: подпись будет выведена в PDF текстом (или лист соберет упаковщик)
+                image_info = self.image_processor.layout(original_image, self.config)
+                image_info.original_path = image_path
+                image_info.caption = self.caption_builder.generate_caption(image_path, image_info.scale_ratio)
+                return image_info
+
+            # Обрабатываем изображение
+            image_info = self.image_processor.process(original_image, self.config)
+            image_info.original_path = image_path
+
+            # Добавляем подпись
+            image_info.a4_image = self.caption_builder.add_caption(
+                image_info.a4_image, image_path, image_info.scale_ratio, self.config
+            )
+
+            return image_info
+
+
+# Сервис в процессе пула обработки
+_worker_service: Optional[ImageProcessingService] = None
 
-                    # Добавляем подпись
-                    image_info.a4_image = self.caption_builder.add_caption(
-                        image_info.a4_image, image_path, image_info.scale_ratio, self.config
-                    )
 
-                    processed_images.append(image_info)
+def _init_worker(config: ImageConfig) -> None:
+    """Инициализирует сервис обработки в процессе пула"""
+    global _worker_service
+    _worker_service = ImageProcessingService(config)
 
-            except Exception as e:
-                logger.error(f"Ошибка обработки {image_path}: {e}")
-                continue
 
-        return processed_images
+def _process_in_worker(image_path: str) -> Optional[ImageInfo]:
+    """Обрабатывает изображение в процессе пула"""
+    return _worker_service.try_process_image(image_path)
@@ -1,38 +1,73 @@
 import os
 import platform
+import queue
+import threading
 import tkinter as tk
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
 from tkinter import filedialog, messagebox
-from typing import List, Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sized
 
 from loguru import logger
 
-from src.print_scale_images.config import ImageInfo
+from src.print_scale_images.config import ImageInfo, get_app_config
 from src.print_scale_images.dialogs.actions import ActionDialog
 from src.print_scale_images.dialogs.file_selector import FileSelector
 from src.print_scale_images.dialogs.process_window import ProgressWindow
-from src.print_scale_images.handlers.caption_builder import CaptionBuilder
-from src.print_scale_images.handlers.image_service import ImageProcessingService
-from src.print_scale_images.handlers.pdf_exporter import PDFExporter
-from src.print_scale_images.handlers.print_service import PrinterService
+from src.print_scale_images.handlers.scale_planner import get_planner
+from src.utils import report_first_window
 from src.utils.files import get_filename_without_extension
 
+if TYPE_CHECKING:
+    from src.print_scale_images.handlers.image_service import ImageProcessingService
+    from src.print_scale_images.handlers.print_service import PrinterService
+
 
 class MainController:
     """Контроллер для управления UI и бизнес-логикой"""
 
+    # Период опроса фоновой обработки, мс
+    POLL_INTERVAL_MS = 100
+
     def __init__(self):
-        self.process_service = ImageProcessingService()
         self.file_selector = FileSelector()
-        self.printer_service = PrinterService()
         self.root = tk.Tk()
+
+        # Фоновая обработка: результаты передаются в UI через очередь и опрос root.after
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-processing")
+        self._progress_queue: queue.Queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._inputs_done = 0
+        # Число изображений, найденных потоковым обходом каталога (None - обход еще идет)
+        self._discovered: Optional[int] = None
+        self._future: Optional[Future] = None
+        self._progress_window: Optional[ProgressWindow] = None
+
         self._setup_ui()
 
+    # Сервисы обработки и печати импортируют PIL, поэтому загружаются при первом
+    # использовании, а не при запуске: так главное окно появляется быстрее
+
+    @cached_property
+    def process_service(self) -> "ImageProcessingService":
+        """Сервис обработки изображений"""
+        from src.print_scale_images.handlers.image_service import ImageProcessingService
+
+        return ImageProcessingService()
+
+    @cached_property
+    def printer_service(self) -> "PrinterService":
+        """Сервис печати"""
+        from src.print_scale_images.handlers.print_service import PrinterService
+
+        return PrinterService()
+
     def _setup_ui(self):
         """Настраивает пользовательский интерфейс"""
 
         self.root.title("Экспорт изображений на A4")
-        self.root.geometry("450x200")
+        self.root.geometry("450x230")
 
         # Основные кнопки
         self.btn_files = tk.Button(self.root, text="Выбрать файлы для обработки", command=self.process_files, height=2)
@@ -43,42 +78,165 @@ class MainController:
         )
         self.btn_directory.pack(pady=10, fill="x", padx=20)
 
+        # Неверные масштабы в конфигурации не должны мешать запуску окна: сообщаем и блокируем обработку
+        try:
+            scales = get_planner(get_app_config().image_config).describe()
+        except ValueError as e:
+            text = f"Ошибка конфигурации масштабов: {e}"
+            logger.error(text)
+            messagebox.showerror("Ошибка конфигурации", text, parent=self.root)
+            scales = "ошибка конфигурации"
+            self.btn_files.config(state="disabled")
+            self.btn_directory.config(state="disabled")
+
         # Информационная метка
         self.info_label = tk.Label(
             self.root,
             text="Изображения автоматически масштабируются для вписывания в A4\n"
-            "Используются целочисленные масштабы (1:2, 1:2.5, 1:4, 1.5)\n"
-            "После обработки можно напечатать или сохранить в PDF",
+            f"Используются масштабы: {scales}\n"
+            "После обработки можно напечатать или сохранить в PDF, TIFF, PNG или JPEG",
             wraplength=400,
             justify="center",
         )
         self.info_label.pack(pady=10)
 
+        # Предпросмотру нужен полный список файлов, поэтому по умолчанию он выключен:
+        # иначе обработка папки ждет окончания ее обхода
+        self.preview_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.root, text="Предпросмотр перед обработкой", variable=self.preview_var).pack()
+
     def process_files(self):
         """Обработка выбранных файлов"""
 
-        self._process_images(self.file_selector.select_files())
+        image_paths = self.file_selector.select_files()
+        if image_paths and self.preview_var.get() and not self._preview(image_paths):
+            return
+
+        self._process_images(image_paths)
 
     def process_directory(self):
         """Обработка всей папки"""
 
-        image_paths = self.file_selector.select_directory()
-        if image_paths:
-            self._process_images(image_paths)
+        directory = self.file_selector.select_directory()
+        if not directory:
+            return
 
-    def _process_images(self, image_paths: List[str]):
-        """Основной метод обработки изображений"""
+        recursive = self.file_selector.has_subdirectories(directory) and messagebox.askyesno(
+            "Подкаталоги", "Включать в обработку подкаталоги?"
+        )
 
-        if not image_paths:
+        if self.preview_var.get():
+            # Предпросмотр показывает все изображения сразу: обход каталога дожидается окончания
+            image_paths = list(self.file_selector.iter_directory(directory, recursive))
+            if not image_paths:
+                messagebox.showwarning("Нет изображений", "Не найдено изображений для обработки")
+                return
+            if not self._preview(image_paths):
+                return
+            self._process_images(image_paths)
             return
 
+        # Изображения передаются в обработку по мере обнаружения
+        self._process_images(self.file_selector.iter_directory(directory, recursive, on_finished=self._set_discovered))
+
+    def _set_discovered(self, count: int):
+        """Вызывается из фонового потока по окончании обхода каталога"""
+        self._discovered = count
+
+    def _preview(self, image_paths: List[str]) -> bool:
+        """Показывает миниатюры с планируемыми масштабами, возвращает True для продолжения обработки"""
+        from src.print_scale_images.dialogs.preview_window import PreviewWindow
+
+        return PreviewWindow(self.root, image_paths, self.process_service.config).result
+
+    def _process_images(self, image_paths: Iterable[str]):
+        """Основной метод обработки изображений: запускает обработку в фоновом потоке
+
+        Для списка показывается определенный прогресс, для потока путей
+        (обход каталога еще идет) - неопределенный до окончания обхода.
+        """
+
+        if isinstance(image_paths, Sized):
+            if not image_paths:
+                return
+            title, total = f"Обработка {len(image_paths)} изображений", len(image_paths)
+        else:
+            title, total = "Обработка изображений", 0
+
         # Показываем прогресс
-        progress_window = ProgressWindow(self.root, f"Обработка {len(image_paths)} изображений")
-        self.root.update()
+        self._progress_queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._inputs_done = 0
+        self._discovered = None
+        self._progress_window = ProgressWindow(self.root, title, maximum=total, on_cancel=self._cancel_event.set)
+        # Сервис создается в главном потоке до запуска фоновой обработки
+        self.process_service  # noqa: B018
+        self._future = self._executor.submit(self._process_worker, image_paths, self._cancel_event)
+        self.root.after(self.POLL_INTERVAL_MS, self._poll_processing)
+
+    def _process_worker(
+        self, image_paths: Iterable[str], cancel_event: threading.Event
+    ) -> tuple[List[ImageInfo], List[ImageInfo]]:
+        """Обрабатывает изображения и размещает их на листах в фоновом потоке (без обращений к Tk)
+
+        Возвращает обработанные изображения и готовые страницы.
+        """
+
+        processed_images: List[ImageInfo] = []
+
+        def collect(image_infos: Iterable[ImageInfo]) -> Iterator[ImageInfo]:
+            for info in image_infos:
+                processed_images.append(info)
+                yield info
+
+        image_infos = self.process_service.iter_process_images(
+            image_paths,
+            on_progress=lambda done, path: self._progress_queue.put((done, path)),
+            cancel_event=cancel_event,
+        )
+        pages = list(self._pack_pages(collect(image_infos)))
+        return processed_images, pages
+
+    def _poll_processing(self):
+        """Переносит прогресс фоновой обработки в UI и дожидается ее завершения"""
 
+        # Состояние фиксируется до чтения очереди, чтобы не потерять последние сообщения
+        finished = self._future.done()
+        if self._discovered:
+            self._progress_window.set_maximum(self._discovered)
+        total = self._progress_window.maximum
         try:
-            # Обработка изображений
-            processed_images = self.process_service.process_images(image_paths)
+            while True:
+                done, path = self._progress_queue.get_nowait()
+                self._inputs_done = done
+                if self._cancel_event.is_set():
+                    continue
+
+                counter = f"{done} из {total}" if total else f"Обработано: {done}"
+                self._progress_window.set_progress(done, f"{counter}: {Path(path).name}")
+        except queue.Empty:
+            pass
+
+        if not finished:
+            self.root.after(self.POLL_INTERVAL_MS, self._poll_processing)
+            return
+
+        self._progress_window.close()
+        self._finish_processing()
+
+    def _finish_processing(self):
+        """Обрабатывает результаты фоновой обработки"""
+
+        try:
+            processed_images, pages = self._future.result()
+
+            if self._cancel_event.is_set():
+                logger.warning(f"Обработка отменена пользователем, обработано изображений: {len(processed_images)}")
+                return
+
+            if not self._inputs_done:
+                messagebox.showwarning("Нет изображений", "Не найдено изображений для обработки")
+                return
 
             if not processed_images:
                 text = "Не удалось обработать ни одного изображения"
@@ -96,17 +254,29 @@ class MainController:
             action = self._show_action_dialog(len(processed_images))
             match action:
                 case 1:
-                    self._print_images(processed_images)
+                    self._print_images(pages)
                 case 2:
-                    self._save_to_pdf(processed_images)
+                    self._save_to_file(pages)
             # Если 3 (Отмена) или закрыто окно - ничего не делаем
 
         except Exception as e:
             text = f"Произошла ошибка: {str(e)}"
             messagebox.showerror("Ошибка", text)
             logger.error(text)
-        finally:
-            progress_window.close()
+
+    def _pack_pages(self, image_infos: Iterable[ImageInfo]) -> Iterable[ImageInfo]:
+        """Размещает несколько изображений на листе, если это включено в конфигурации
+
+        Листы растеризуются по мере обработки изображений в фоновом потоке, а не в потоке Tk.
+        """
+
+        config = self.process_service.config
+        if not config.pack_pages:
+            return image_infos
+
+        from src.print_scale_images.handlers.page_packer import PagePacker
+
+        return PagePacker(config).pack(image_infos)
 
     def _show_action_dialog(self, processed_count: int) -> int:
         """Показывает диалог выбора действия"""
@@ -115,12 +285,31 @@ class MainController:
         return dialog.result if dialog.result else 3  # По умолчанию Отмена
 
     def _print_images(self, processed_images: List[ImageInfo]):
-        """Печатает обработанные изображения"""
+        """Печатает обработанные изображения в фоновом потоке
+
+        Страницы растеризуются и передаются спулеру долго, поэтому UI на это время
+        не блокируется: показывается окно прогресса, а результат забирается опросом.
+        """
+
+        # Сервис создается в главном потоке до окна прогресса: без бэкенда печати он
+        # выбрасывает исключение, которое показывается вызывающим кодом
+        printer_service = self.printer_service
+        self._progress_window = ProgressWindow(self.root, "Печать")
+        self._progress_window.set_progress(0, "Отправка на печать...")
+        # success = self.printer_service.print_images_with_dialog(processed_images)
+        self._future = self._executor.submit(printer_service.print_images, processed_images)
+        self.root.after(self.POLL_INTERVAL_MS, self._poll_printing)
+
+    def _poll_printing(self):
+        """Дожидается завершения фоновой печати и показывает ее результат"""
+
+        if not self._future.done():
+            self.root.after(self.POLL_INTERVAL_MS, self._poll_printing)
+            return
 
+        self._progress_window.close()
         try:
-            # success = self.printer_service.print_images_with_dialog(processed_images)
-            success = self.printer_service.print_images(processed_images)
-            if success:
+            if self._future.result():
                 messagebox.showinfo("Печать", "Изображения отправлены на печать!")
             else:
                 messagebox.showwarning("Печать", "Не удалось выполнить печать")
@@ -128,24 +317,26 @@ class MainController:
             messagebox.showerror("Ошибка печати", f"Ошибка при печати: {str(e)}")
             logger.error(f"Print error: {e}")
 
-    def _save_to_pdf(self, processed_images: List[ImageInfo]):
-        """Сохраняет обработанные изображения в PDF"""
+    def _save_to_file(self, processed_images: List[ImageInfo]):
+        """Сохраняет обработанные изображения в PDF, TIFF или файлы страниц PNG/JPEG"""
 
         output_path = self._select_output_path()
         if not output_path:
             return
 
+        from src.print_scale_images.handlers.exporters import create_exporter
+
         try:
-            result_path = PDFExporter().export_to_pdf(processed_images, output_path)
-            messagebox.showinfo("Сохранение", f"PDF успешно сохранен:\n{result_path}")
+            result_path = create_exporter(output_path).export(processed_images, output_path)
+            messagebox.showinfo("Сохранение", f"Файл успешно сохранен:\n{result_path}")
 
             # Предложение открыть результат
-            if messagebox.askyesno("Открыть файл", "Хотите открыть полученный PDF файл?"):
+            if messagebox.askyesno("Открыть файл", "Хотите открыть полученный файл?"):
                 self._open_file(result_path)
 
         except Exception as e:
-            messagebox.showerror("Ошибка", f"Ошибка при сохранении PDF: {str(e)}")
-            logger.error(f"PDF export error: {e}")
+            messagebox.showerror("Ошибка", f"Ошибка при сохранении: {str(e)}")
+            logger.error(f"Export error: {e}")
 
     @staticmethod
     def _open_file(file_path: str):
@@ -165,12 +356,14 @@ class MainController:
 
     @staticmethod
     def _select_output_path() -> Optional[str]:
-        """Выбирает путь для сохранения PDF"""
+        """Выбирает путь и формат для сохранения"""
+        from src.print_scale_images.handlers.exporters import EXPORT_FILETYPES
+
         root = tk.Tk()
         root.withdraw()
 
         output_path = filedialog.asksaveasfilename(
-            title="Сохранить PDF как", defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")]
+            title="Сохранить как", defaultextension=".pdf", filetypes=EXPORT_FILETYPES
         )
         root.destroy()
 
@@ -185,6 +378,7 @@ class MainController:
     @staticmethod
     def _log_results(processed_images: List[ImageInfo]):
         """Показывает результаты обработки"""
+        from src.print_scale_images.handlers.caption_builder import CaptionBuilder
 
         extended_result_info = f"Обработка завершена успешно!\n\n" f"Обработано изображений: {len(processed_images)}\n"
 
@@ -195,11 +389,16 @@ class MainController:
             scaled_w, scaled_h = info.scaled_size
             extended_result_info += (
                 f"• {filename}: {orig_w}x{orig_h} → {scaled_w}x{scaled_h} "
-                f"({CaptionBuilder().generate_caption_ratio(info.scale_ratio)})\n"
+                f"({CaptionBuilder.generate_caption_ratio(info.scale_ratio)})\n"
             )
 
         logger.info(extended_result_info)
 
     def run(self):
         """Запускает приложение"""
+        report_first_window(self.root)
         self.root.mainloop()
+
+        # Прерываем незавершенную обработку при закрытии приложения
+        self._cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
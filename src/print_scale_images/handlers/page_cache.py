@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from PIL import Image
+
+from src.print_scale_images.config import ImageConfig, ImageInfo
+
+# Версия формата кэша: при изменении алгоритма рендеринга старые записи становятся недействительными
+CACHE_VERSION = 3
+
+# Каталог кэша по умолчанию
+DEFAULT_CACHE_DIR = Path(tempfile.gettempdir()) / "print_scale_images_cache"
+
+# Временные файлы записей старше этого возраста (с) остались от прерванной записи и удаляются
+STALE_TMP_AGE = 3600
+
+# Поля конфигурации, влияющие на результат обработки
+CONFIG_KEY_FIELDS = (
+    "dpi",
+    "margin",
+    "font_size",
+    "font_style",
+    "text_margin",
+    "pdf_mode",
+    "color_mode",
+    "allowed_scales",
+    "pack_pages",
+)
+
+
+class DiskCache:
+    """Каталог файлов кэша с ограничением размера и вытеснением по LRU
+
+    Давность использования записи определяется временем изменения ее файлов:
+    при обращении к записи наследники обновляют его через os.utime.
+    """
+
+    # Расширения файлов записей кэша
+    ENTRY_SUFFIXES: tuple[str, ...] = ()
+
+    def __init__(self, cache_dir: Path, max_size_mb: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self._total_size: Optional[int] = None
+
+    def clear(self) -> None:
+        """Очищает кэш"""
+        for entry in self._entries():
+            entry.unlink(missing_ok=True)
+        self._total_size = 0
+
+    def _entries(self) -> list[Path]:
+        """Файлы записей кэша"""
+        if not self.cache_dir.exists():
+            return []
+        return [entry for entry in self.cache_dir.iterdir() if entry.suffix in self.ENTRY_SUFFIXES]
+
+    def _add_size(self, size: int) -> None:
+        """Учитывает размер новой записи и при переполнении вытесняет старые"""
+
+        if self._total_size is None:
+            self._remove_stale_tmp()
+            self._total_size = sum(entry.stat().st_size for entry in self._entries())
+        else:
+            self._total_size += size
+
+        if self._total_size > self.max_size:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Удаляет давно не использовавшиеся записи, пока кэш не станет меньше 90% лимита"""
+
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_size * 0.9
+        for _, size, entry in entries:
+            if total <= limit:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+        self._total_size = total
+        self._remove_stale_tmp()
+        logger.debug(f"Кэш {self.cache_dir} очищен до {total} байт")
+
+    def _remove_stale_tmp(self) -> None:
+        """Удаляет временные файлы прерванных записей (свежие могут дописываться другим процессом)"""
+
+        deadline = time.time() - STALE_TMP_AGE
+        for tmp_path in self.cache_dir.glob("*.tmp"):
+            try:
+                if tmp_path.stat().st_mtime < deadline:
+                    tmp_path.unlink()
+            except OSError:
+                continue
+
+
+class PageCache(DiskCache):
+    """Дисковый кэш обработанных страниц с вытеснением по LRU
+
+    Ключ - идентичность исходного файла (путь, размер, время изменения) и поля
+    ImageConfig. Хранится готовая страница (или масштабированное изображение
+    в векторном режиме) в TIFF со сжатием Deflate и метаданные ImageInfo в JSON.
+    """
+
+    ENTRY_SUFFIXES = (".json", ".tif")
+
+    def __init__(self, cache_dir: str = "", max_size_mb: int = 1024):
+        super().__init__(Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR, max_size_mb)
+
+    @classmethod
+    def from_config(cls, config: ImageConfig) -> Optional["PageCache"]:
+        """Создает кэш согласно конфигурации (None, если кэш отключен)"""
+        if config.cache_size_mb <= 0:
+            return None
+        return cls(config.cache_dir, config.cache_size_mb)
+
+    @staticmethod
+    def make_key(image_path: str, config: ImageConfig) -> str:
+        """Вычисляет ключ записи кэша"""
+
+        path = Path(image_path).resolve()
+        stat = path.stat()
+        key_data = [CACHE_VERSION, str(path), stat.st_size, stat.st_mtime_ns]
+        key_data.extend(getattr(config, field) for field in CONFIG_KEY_FIELDS)
+
+        return hashlib.sha1(json.dumps(key_data).encode("utf-8"), usedforsecurity=False).hexdigest()
+
+    def get(self, image_path: str, config: ImageConfig) -> Optional[ImageInfo]:
+        """Возвращает обработанную страницу из кэша или None"""
+
+        try:
+            key = self.make_key(image_path, config)
+            meta_path, image_path_in_cache = self._entry_paths(key)
+            if not meta_path.exists() or not image_path_in_cache.exists():
+                return None
+
+            with meta_path.open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            image = Image.open(image_path_in_cache)
+            image.load()
+
+            # Отмечаем использование записи для LRU
+            os.utime(meta_path)
+            os.utime(image_path_in_cache)
+        except Exception as e:
+            logger.warning(f"Ошибка чтения кэша для {image_path}: {e}")
+            return None
+
+        info = ImageInfo(
+            original_path=image_path,
+            original_size=tuple(meta["original_size"]),
+            scaled_size=tuple(meta["scaled_size"]),
+            scale_ratio=tuple(meta["scale_ratio"]),
+            position=tuple(meta["position"]),
+            page_size=tuple(meta["page_size"]),
+            source_format=meta["source_format"],
+            source_mode=meta["source_mode"],
+            caption=meta["caption"],
+        )
+        if meta["is_page"]:
+            info.a4_image = image
+        else:
+            info.scaled_image = image
+
+        return info
+
+    def put(self, info: ImageInfo, config: ImageConfig) -> None:
+        """Сохраняет обработанную страницу в кэш"""
+
+        try:
+            key = self.make_key(info.original_path, config)
+            meta_path, image_path = self._entry_paths(key)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+            image = info.a4_image if info.a4_image is not None else info.scaled_image
+            meta = {
+                "original_size": info.original_size,
+                "scaled_size": info.scaled_size,
+                "scale_ratio": info.scale_ratio,
+                "position": info.position,
+                "page_size": info.page_size,
+                "source_format": info.source_format,
+                "source_mode": info.source_mode,
+                "caption": info.caption,
+                "is_page": info.a4_image is not None,
+            }
+
+            # Пишем во временные файлы и атомарно переименовываем
+            # TIFF, в отличие от PNG, хранит любые режимы изображения (в том числе CMYK)
+            tmp_image_path = image_path.with_suffix(".tif.tmp")
+            image.save(tmp_image_path, "TIFF", compression="tiff_adobe_deflate")
+            tmp_image_path.replace(image_path)
+
+            tmp_meta_path = meta_path.with_suffix(".json.tmp")
+            with tmp_meta_path.open("w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            tmp_meta_path.replace(meta_path)
+
+            self._add_size(image_path.stat().st_size + meta_path.stat().st_size)
+        except Exception as e:
+            logger.warning(f"Ошибка записи кэша для {info.original_path}: {e}")
+
+    def _entry_paths(self, key: str) -> tuple[Path, Path]:
+        """Пути к файлам записи кэша"""
+        return self.cache_dir / f"{key}.json", self.cache_dir / f"{key}.tif"
@@ -0,0 +1,217 @@
+import math
+from dataclasses import dataclass, field, replace
+from typing import Iterable, Iterator, Optional
+
+from loguru import logger
+from PIL import Image, ImageDraw
+
+from src.print_scale_images.config import ImageConfig, ImageInfo
+from src.print_scale_images.handlers.caption_builder import CaptionBuilder
+from src.print_scale_images.handlers.exporters import render_page
+from src.print_scale_images.handlers.scale_planner import A4_SIZE_LANDSCAPE
+
+# Сколько листов одного масштаба и режима заполняется одновременно: изображение, не поместившееся
+# на один лист, может поместиться на другой, поэтому лист не закрывается при первой неудаче
+MAX_OPEN_SHEETS = 3
+
+# Сколько листов всех масштабов и режимов открыто одновременно: число масштабов не ограничено,
+# а открытый лист держит в памяти свои изображения, поэтому при превышении выдается самый старый лист
+MAX_OPEN_SHEETS_TOTAL = 12
+
+
+# Ключ открытых листов: масштаб и режим цвета изображений
+_SheetKey = tuple[tuple[int, int], str]
+
+
+@dataclass
+class _Shelf:
+    """Полка листа: ряд ячеек одной высоты"""
+
+    y: int
+    height: int
+    used_width: int = 0
+
+
+@dataclass
+class _Placement:
+    """Изображение с подписью, размещенное на листе"""
+
+    info: ImageInfo
+    x: int
+    y: int
+    cell_width: int
+
+
+# Листы сравниваются по идентичности: сравнение полей сравнивало бы изображения
+@dataclass(eq=False)
+class _Sheet:
+    """Заполняемый лист A4 с изображениями одного масштаба и режима цвета"""
+
+    left: int
+    top: int
+    right: int
+    bottom: int
+    spacing: int
+    shelves: list[_Shelf] = field(default_factory=list)
+    placements: list[_Placement] = field(default_factory=list)
+
+    def place(self, info: ImageInfo, cell_size: tuple[int, int]) -> bool:
+        """Размещает ячейку на первой подходящей полке или на новой, возвращает False, если лист заполнен"""
+
+        width, height = cell_size
+        for shelf in self.shelves:
+            x = self.left + shelf.used_width
+            if height <= shelf.height and x + width <= self.right:
+                self._add(info, shelf, x, width)
+                return True
+
+        y = self.top
+        if self.shelves:
+            last = self.shelves[-1]
+            y = last.y + last.height + self.spacing
+        if y + height > self.bottom:
+            return False
+
+        shelf = _Shelf(y, height)
+        self.shelves.append(shelf)
+        self._add(info, shelf, self.left, width)
+        return True
+
+    def _add(self, info: ImageInfo, shelf: _Shelf, x: int, width: int) -> None:
+        """Добавляет ячейку на полку"""
+        self.placements.append(_Placement(info, x, shelf.y, width))
+        shelf.used_width += width + self.spacing
+
+
+class PagePacker:
+    """Размещение нескольких изображений одного масштаба на листе A4 (полочный алгоритм)
+
+    Изображения принимаются по одному (из генератора) и размещаются на первом подходящем
+    из открытых листов своего масштаба и режима цвета (не более MAX_OPEN_SHEETS, всего -
+    не более MAX_OPEN_SHEETS_TOTAL), при переполнении сразу выдается самый старый лист. Режим
+    входит в ключ, чтобы черно-белые чертежи не попадали на цветной лист и сжимались G4.
+    Каждое изображение получает свою подпись под ним. Лист с единственным
+    изображением совпадает с обычной страницей без упаковки.
+    """
+
+    def __init__(self, config: ImageConfig, caption_builder: Optional[CaptionBuilder] = None):
+        self.config = config
+        self.caption_builder = caption_builder or CaptionBuilder()
+        self.page_size = A4_SIZE_LANDSCAPE
+        # Расстояние между изображением и его подписью
+        self.caption_gap = config.font_size // 2
+
+    def pack(self, image_infos: Iterable[ImageInfo]) -> Iterator[ImageInfo]:
+        """Упаковывает масштабированные изображения (ImageProcessor.layout) на листы"""
+
+        sheets: dict[_SheetKey, list[_Sheet]] = {}
+        # Открытые листы всех ключей в порядке открытия
+        opened: list[tuple[_SheetKey, _Sheet]] = []
+        images = pages = 0
+
+        for info in image_infos:
+            images += 1
+            if info.scaled_image is None:
+                # Готовая страница не упаковывается
+                pages += 1
+                yield info
+                continue
+
+            cell_size = self._cell_size(info)
+            key = (info.scale_ratio, info.scaled_image.mode)
+            open_sheets = sheets.setdefault(key, [])
+            if any(sheet.place(info, cell_size) for sheet in open_sheets):
+                continue
+
+            sheet = self._new_sheet()
+            if not sheet.place(info, cell_size):
+                # Ячейка с подписью не помещается даже на пустой лист: обычная страница
+                pages += 1
+                yield self._render_single(info)
+                continue
+
+            open_sheets.append(sheet)
+            opened.append((key, sheet))
+            if len(open_sheets) > MAX_OPEN_SHEETS:
+                oldest = (key, open_sheets[0])
+            elif len(opened) > MAX_OPEN_SHEETS_TOTAL:
+                oldest = opened[0]
+            else:
+                continue
+
+            pages += 1
+            yield self._render(self._close(sheets, opened, *oldest))
+
+        for _, sheet in opened:
+            pages += 1
+            yield self._render(sheet)
+
+        logger.info(f"Упаковано изображений: {images} на листов: {pages}")
+
+    @staticmethod
+    def _close(
+        sheets: dict[_SheetKey, list[_Sheet]], opened: list[tuple[_SheetKey, _Sheet]], key: _SheetKey, sheet: _Sheet
+    ) -> _Sheet:
+        """Убирает лист из открытых (и ключ без открытых листов), возвращает его"""
+
+        sheets[key].remove(sheet)
+        if not sheets[key]:
+            del sheets[key]
+        opened.remove((key, sheet))
+        return sheet
+
+    def _new_sheet(self) -> _Sheet:
+        """Пустой лист с полями"""
+        margin = self.config.margin
+        width, height = self.page_size
+        return _Sheet(margin, margin, width - margin, height - margin, spacing=margin)
+
+    def _cell_size(self, info: ImageInfo) -> tuple[int, int]:
+        """Размер ячейки: изображение и подпись под ним"""
+
+        ascent, descent = self.caption_builder.caption_metrics(self.config)
+        caption_width = math.ceil(self.caption_builder.caption_width(info.caption, self.config))
+        width, height = info.scaled_image.size
+        return max(width, caption_width), height + self.caption_gap + ascent + descent
+
+    def _render_single(self, info: ImageInfo) -> ImageInfo:
+        """Обычная страница с одним изображением (в векторном режиме остается векторной)"""
+
+        if self.config.pdf_mode == "vector":
+            return info
+        return replace(info, a4_image=render_page(info, self.config, self.caption_builder), scaled_image=None)
+
+    def _render(self, sheet: _Sheet) -> ImageInfo:
+        """Растеризует лист с размещенными изображениями и подписями"""
+
+        placements = sheet.placements
+        if len(placements) == 1:
+            return self._render_single(placements[0].info)
+
+        page = Image.new(placements[0].info.scaled_image.mode, self.page_size, "white")
+        draw = ImageDraw.Draw(page)
+        font = self.caption_builder.get_font(self.config)
+        ascent, _ = self.caption_builder.caption_metrics(self.config)
+
+        for placement in placements:
+            image = placement.info.scaled_image
+            page.paste(image, (placement.x + (placement.cell_width - image.width) // 2, placement.y))
+
+            caption = placement.info.caption
+            caption_width = self.caption_builder.caption_width(caption, self.config)
+            origin = (
+                placement.x + (placement.cell_width - caption_width) / 2,
+                placement.y + image.height + self.caption_gap + ascent,
+            )
+            draw.text(origin, caption, fill="black", font=font, anchor="ls")
+
+        first = placements[0].info
+        logger.debug(f"Лист {first.scale_ratio}: {', '.join(p.info.original_path for p in placements)}")
+        return replace(
+            first,
+            a4_image=page,
+            scaled_image=None,
+            position=(0, 0),
+            page_size=self.page_size,
+            caption="; ".join(placement.info.caption for placement in placements),
+        )
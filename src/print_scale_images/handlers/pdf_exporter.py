@@ -1,29 +1,34 @@
-from loguru import logger
+from typing import Iterable, Optional
+
 from PIL import Image
 
-from src.print_scale_images.config import ImageInfo
+from src.print_scale_images.config import ImageConfig, ImageInfo, get_app_config
+from src.print_scale_images.handlers.exporters import PdfPageExporter, check_page_count
+from src.print_scale_images.handlers.pdf_writer import PDFWriter
 
 
 class PDFExporter:
     """Экспортер для сохранения изображений в PDF"""
 
     @classmethod
-    def export(cls, images: list[Image.Image], output_path: str) -> str:
-        """Экспортирует список изображений в PDF"""
-        if not images:
-            text = "Нет изображений для экспорта"
-            logger.error(text)
-            raise ValueError(text)
-
-        # Сохраняем все изображения как одну страницу PDF
-        images[0].save(
-            output_path, "PDF", save_all=True, append_images=images[1:] if len(images) > 1 else [], resolution=100.0
-        )
+    def export(cls, images: Iterable[Image.Image], output_path: str, config: Optional[ImageConfig] = None) -> str:
+        """Экспортирует растровые страницы в PDF, записывая их по одной"""
+        config = config or get_app_config().image_config
+
+        with PDFWriter(output_path, config.dpi) as writer:
+            for image in images:
+                writer.add_raster_page(image)
+            check_page_count(writer.page_count)
 
         return output_path
 
     @classmethod
-    def export_to_pdf(cls, image_infos: list[ImageInfo], output_path: str) -> str:
-        """Экспортирует обработанные изображения в PDF"""
-        images = [info.a4_image for info in image_infos]
-        return cls.export(images, output_path)
+    def export_to_pdf(
+        cls, image_infos: Iterable[ImageInfo], output_path: str, config: Optional[ImageConfig] = None
+    ) -> str:
+        """Экспортирует обработанные изображения в PDF
+
+        Страницы принимаются по одной (в том числе из генератора), сжимаются в пуле потоков
+        и записываются в файл по порядку (см. PdfPageExporter).
+        """
+        return PdfPageExporter(config).export(image_infos, output_path)
@@ -0,0 +1,504 @@
+import hashlib
+import os
+import re
+import zlib
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from PIL import Image, ImageFont, TiffImagePlugin
+
+from src.print_scale_images.handlers.font_subset import subset_truetype
+
+# Количество типографских пунктов в дюйме
+POINTS_PER_INCH = 72
+
+
+@dataclass
+class EncodedImage:
+    """Сжатое изображение, готовое к записи в PDF как XObject"""
+
+    size: tuple[int, int]
+    # Словарь XObject без /Length
+    dictionary: bytes
+    data: bytes
+
+
+class _CaptionFont:
+    """Шрифт подписи, встраиваемый в PDF как простой TrueType шрифт
+
+    Встраивается подмножество шрифта - только глифы символов подписей. Если в подписях
+    появились новые символы, при контрольной точке файл шрифта записывается заново.
+    """
+
+    # Коды 32..126 совпадают с ASCII, остальные символы получают коды 128..255
+    FIRST_EXTRA_CODE = 128
+    LAST_CODE = 255
+
+    def __init__(self, font: ImageFont.FreeTypeFont | ImageFont.ImageFont, state: Optional[dict] = None):
+        self.font = font
+        self.data = self._read_font_data(font)
+        self._extra_codes: dict[str, int] = {}
+        # Символы подписей и символы уже записанного подмножества шрифта
+        self._used: set[str] = set()
+        self._written = ""
+        # Файл шрифта и его дескриптор записываются при изменении набора символов, словарь шрифта -
+        # при каждой контрольной точке
+        self._descriptor_ref: Optional[int] = None
+        self._file_ref: Optional[int] = None
+        if state is not None:
+            self._extra_codes = dict(state["extra_codes"])
+            self._descriptor_ref = state["descriptor_ref"]
+            self._file_ref = state.get("file_ref")
+            self._written = state.get("chars", "")
+            self._used = set(self._written)
+
+    def state(self) -> dict:
+        """Состояние для продолжения записи после перезапуска (см. PDFWriter.checkpoint)"""
+        return {
+            "extra_codes": self._extra_codes,
+            "descriptor_ref": self._descriptor_ref,
+            "file_ref": self._file_ref,
+            "chars": self._written,
+        }
+
+    @property
+    def embedded(self) -> bool:
+        """Встраивается ли файл шрифта (иначе используется стандартный Helvetica)"""
+        return self.data is not None
+
+    @staticmethod
+    def _read_font_data(font) -> Optional[bytes]:
+        """Читает файл TrueType шрифта для встраивания"""
+
+        source = getattr(font, "path", None)
+        if source is None:
+            return None
+
+        try:
+            if hasattr(source, "getvalue"):
+                data = source.getvalue()
+            else:
+                data = Path(source).read_bytes()
+        except OSError:
+            return None
+
+        # Коллекции шрифтов (.ttc) нельзя встроить как FontFile2
+        if data[:4] == b"ttcf":
+            return None
+        return data
+
+    def encode(self, text: str) -> bytes:
+        """Кодирует текст в коды простого шрифта"""
+
+        if not self.embedded:
+            return text.encode("cp1252", errors="replace")
+
+        codes = bytearray()
+        for char in text:
+            self._used.add(char)
+            if 32 <= ord(char) <= 126:
+                codes.append(ord(char))
+                continue
+
+            code = self._extra_codes.get(char)
+            if code is None:
+                code = self.FIRST_EXTRA_CODE + len(self._extra_codes)
+                if code > self.LAST_CODE:
+                    self._used.add("?")
+                    codes.append(ord("?"))
+                    continue
+                self._extra_codes[char] = code
+            codes.append(code)
+
+        return bytes(codes)
+
+    def metrics(self) -> tuple[int, int]:
+        """Возвращает (ascent, descent) в пикселях"""
+        return self.font.getmetrics()
+
+    def _units(self, value: float) -> int:
+        """Переводит пиксели в единицы глифа (1/1000 кегля)"""
+        return round(value * 1000 / self.font.size)
+
+    def write(self, writer: "PDFWriter", font_ref: int) -> None:
+        """Записывает объекты шрифта в PDF"""
+
+        if not self.embedded:
+            writer.write_object(
+                font_ref, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+            )
+            return
+
+        used = "".join(sorted(self._used))
+        family = self.font.getname()[0] or "Caption"
+        # Имя подмножества шрифта: шесть заглавных букв от набора символов, "+" и имя шрифта
+        tag = "".join(
+            chr(ord("A") + byte % 26) for byte in hashlib.md5(used.encode(), usedforsecurity=False).digest()[:6]
+        )
+        base_font = f"{tag}+{re.sub(r'[^A-Za-z0-9_-]', '', family) or 'Caption'}"
+
+        if self._file_ref is None or used != self._written:
+            ascent, descent = self.metrics()
+
+            # Прежняя версия файла шрифта и дескриптора заменяется инкрементным обновлением
+            if self._file_ref is None:
+                self._file_ref = writer.reserve()
+            if self._descriptor_ref is None:
+                self._descriptor_ref = writer.reserve()
+            data = subset_truetype(self.data, used)
+            writer.write_stream(
+                self._file_ref, f"/Filter /FlateDecode /Length1 {len(data)}".encode(), zlib.compress(data)
+            )
+            self._written = used
+
+            writer.write_object(
+                self._descriptor_ref,
+                (
+                    f"<< /Type /FontDescriptor /FontName /{base_font} /Flags 32 "
+                    f"/FontBBox [0 {-self._units(descent)} 1000 {self._units(ascent)}] /ItalicAngle 0 "
+                    f"/Ascent {self._units(ascent)} /Descent {-self._units(descent)} "
+                    f"/CapHeight {self._units(ascent)} /StemV 80 /FontFile2 {self._file_ref} 0 R >>"
+                ).encode(),
+            )
+
+        chars = {code: chr(code) for code in range(32, 127)}
+        chars.update({code: char for char, code in self._extra_codes.items()})
+        last_code = max(chars)
+        widths = " ".join(
+            str(self._units(self.font.getlength(chars[code]))) if code in chars else "0"
+            for code in range(32, last_code + 1)
+        )
+        differences = " ".join(f"/uni{ord(char):04X}" for char in self._extra_codes)
+
+        writer.write_object(
+            font_ref,
+            (
+                f"<< /Type /Font /Subtype /TrueType /BaseFont /{base_font} "
+                f"/FirstChar 32 /LastChar {last_code} /Widths [{widths}] "
+                f"/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding "
+                f"/Differences [{self.FIRST_EXTRA_CODE} {differences}] >> "
+                f"/FontDescriptor {self._descriptor_ref} 0 R >>"
+            ).encode(),
+        )
+
+
+class PDFWriter:
+    """Потоковый писатель PDF
+
+    Каждая страница записывается в файл сразу при добавлении, дерево страниц
+    и таблица xref - при закрытии, поэтому в памяти не держатся все страницы.
+    Вместо пути можно передать открытый поток (например, stdin процесса печати):
+    смещения объектов считаются самим писателем, поток не обязан поддерживать tell().
+
+    Для файла можно делать контрольные точки (checkpoint): дерево страниц и xref дописываются
+    инкрементным обновлением, после чего файл - корректный PDF, а запись продолжается.
+    По состоянию, возвращенному checkpoint, запись можно продолжить и после перезапуска (state).
+    """
+
+    def __init__(self, output: str | BinaryIO, dpi: int, state: Optional[dict] = None):
+        # Путь к файлу (None, если запись идет в переданный поток)
+        self.output_path = output if isinstance(output, str) else None
+        # Коэффициент перевода пикселей страницы в пункты PDF
+        self.scale = POINTS_PER_INCH / dpi
+
+        # Смещения объектов, записанных после последней таблицы xref
+        self._offsets: dict[int, int] = {}
+        self._caption_font: Optional[_CaptionFont] = None
+
+        if state is not None:
+            self._resume(state)
+            return
+
+        self._file = Path(output).open("wb") if self.output_path is not None else output
+        self._position = 0
+        self._next_ref = 1
+        self._page_refs: list[int] = []
+        self._font_ref: Optional[int] = None
+        self._font_state: Optional[dict] = None
+        # Смещение последней таблицы xref (None, пока не было контрольных точек)
+        self._xref_offset: Optional[int] = None
+
+        self._catalog_ref = self.reserve()
+        self._pages_ref = self.reserve()
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _resume(self, state: dict) -> None:
+        """Открывает файл для дописывания с последней контрольной точки"""
+
+        self._file = Path(self.output_path).open("r+b")
+        # Все, что записано после контрольной точки (при аварийном завершении), отбрасывается
+        self._file.truncate(state["size"])
+        self._file.seek(state["size"])
+        self._position = state["size"]
+        self._next_ref = state["next_ref"]
+        self._page_refs = list(state["page_refs"])
+        self._catalog_ref = state["catalog_ref"]
+        self._pages_ref = state["pages_ref"]
+        self._font_ref = state["font_ref"]
+        self._font_state = state["font"]
+        self._xref_offset = state["xref_offset"]
+        self._checkpoint_position = state["size"]
+
+    def __enter__(self) -> "PDFWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def abort(self) -> None:
+        """Прерывает запись в файл: возвращает его к последней контрольной точке или удаляет"""
+
+        if self.output_path is None:
+            return
+        if self._xref_offset is not None:
+            # До последней контрольной точки файл корректен
+            self._file.truncate(self._checkpoint_position)
+            self._file.close()
+        else:
+            # Незавершенный PDF бесполезен - удаляем его
+            self._file.close()
+            Path(self.output_path).unlink(missing_ok=True)
+
+    @property
+    def page_count(self) -> int:
+        """Количество записанных страниц"""
+        return len(self._page_refs)
+
+    def reserve(self) -> int:
+        """Резервирует номер объекта"""
+        ref = self._next_ref
+        self._next_ref += 1
+        return ref
+
+    def write_object(self, ref: int, body: bytes) -> None:
+        """Записывает объект PDF"""
+        self._offsets[ref] = self._position
+        self._write(f"{ref} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _write(self, data: bytes) -> None:
+        """Пишет данные в файл, отслеживая текущее смещение"""
+        self._file.write(data)
+        self._position += len(data)
+
+    def write_stream(self, ref: int, dictionary: bytes, data: bytes) -> None:
+        """Записывает потоковый объект PDF"""
+        self.write_object(
+            ref, b"<< " + dictionary + f" /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream"
+        )
+
+    def add_raster_page(self, page: Image.Image | EncodedImage) -> None:
+        """Добавляет готовую растровую страницу целиком (см. encode_raster_page)"""
+
+        if isinstance(page, Image.Image):
+            page = self.encode_raster_page(page)
+        self.add_image_page(page.size, page, (0, 0))
+
+    def add_image_page(
+        self,
+        page_size: tuple[int, int],
+        image: Image.Image | EncodedImage,
+        position: tuple[int, int],
+        jpeg_data: Optional[bytes] = None,
+        caption: str = "",
+        caption_origin: tuple[float, float] = (0, 0),
+        font: Optional[ImageFont.FreeTypeFont] = None,
+    ) -> None:
+        """Добавляет векторную страницу с изображением и текстовой подписью
+
+        Размеры и координаты (в том числе начало базовой линии подписи caption_origin) задаются
+        в пикселях страницы. Если передан jpeg_data, исходный JPEG встраивается без перекодирования.
+        Изображение может быть сжато заранее (encode_image), например в другом потоке.
+        """
+
+        page_width, page_height = (value * self.scale for value in page_size)
+
+        if isinstance(image, Image.Image):
+            image = self.encode_image(image, jpeg_data)
+        image_ref = self.reserve()
+        self.write_stream(image_ref, image.dictionary, image.data)
+
+        x, y = position
+        width, height = image.size
+        content = (
+            f"q {width * self.scale:.3f} 0 0 {height * self.scale:.3f} "
+            f"{x * self.scale:.3f} {page_height - (y + height) * self.scale:.3f} cm /Im0 Do Q\n"
+        ).encode()
+
+        resources = f"/XObject << /Im0 {image_ref} 0 R >>"
+        if caption and font is not None:
+            content += self._caption_operators(caption, caption_origin, font, page_height)
+            resources += f" /Font << /F1 {self._font_ref} 0 R >>"
+
+        content_ref = self.reserve()
+        self.write_stream(content_ref, b"/Filter /FlateDecode", zlib.compress(content))
+
+        page_ref = self.reserve()
+        self.write_object(
+            page_ref,
+            (
+                f"<< /Type /Page /Parent {self._pages_ref} 0 R "
+                f"/MediaBox [0 0 {page_width:.3f} {page_height:.3f}] "
+                f"/Resources << {resources} >> /Contents {content_ref} 0 R >>"
+            ).encode(),
+        )
+        self._page_refs.append(page_ref)
+        self._file.flush()
+
+    def _caption_operators(
+        self, caption: str, origin: tuple[float, float], font: ImageFont.FreeTypeFont, page_height: float
+    ) -> bytes:
+        """Формирует операторы вывода подписи от начала базовой линии"""
+
+        if self._caption_font is None:
+            self._caption_font = _CaptionFont(font, self._font_state)
+            if self._font_ref is None:
+                self._font_ref = self.reserve()
+
+        caption_font = self._caption_font
+        left, baseline = origin
+
+        return (
+            f"BT /F1 {caption_font.font.size * self.scale:.3f} Tf "
+            f"{left * self.scale:.3f} {page_height - baseline * self.scale:.3f} Td "
+            f"<{caption_font.encode(caption).hex()}> Tj ET\n"
+        ).encode()
+
+    @classmethod
+    def encode_raster_page(cls, page: Image.Image) -> EncodedImage:
+        """Сжимает растровую страницу: цветную - JPEG, черно-белую - CCITT G4, серую - Flate без потерь"""
+
+        jpeg_data = None
+        if page.mode == "RGB":
+            buffer = BytesIO()
+            page.save(buffer, "JPEG")
+            jpeg_data = buffer.getvalue()
+
+        return cls.encode_image(page, jpeg_data)
+
+    @classmethod
+    def encode_image(cls, image: Image.Image, jpeg_data: Optional[bytes] = None) -> EncodedImage:
+        """Сжимает изображение для XObject (JPEG без перекодирования, CCITT G4 или Flate)
+
+        Не использует состояние писателя, поэтому может выполняться параллельно с записью.
+        """
+
+        width, height = image.size
+
+        if image.mode == "1":
+            color_space, bits = "/DeviceGray", 1
+        elif image.mode == "L":
+            color_space, bits = "/DeviceGray", 8
+        elif image.mode == "CMYK" and jpeg_data is None:
+            color_space, bits = "/DeviceCMYK", 8
+        else:
+            color_space, bits = "/DeviceRGB", 8
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+
+        decode_parms = ""
+        if jpeg_data is not None:
+            data, decode_filter = jpeg_data, "/DCTDecode"
+        elif image.mode == "1" and (g4_data := cls._encode_g4(image)) is not None:
+            # В G4 из TIFF белый закодирован единицами (BlackIsZero), как и в PDF при BlackIs1
+            data, decode_filter = g4_data, "/CCITTFaxDecode"
+            decode_parms = f" /DecodeParms << /K -1 /Columns {width} /Rows {height} /BlackIs1 true >>"
+        else:
+            data, decode_filter = zlib.compress(image.tobytes()), "/FlateDecode"
+
+        dictionary = (
+            f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+            f"/ColorSpace {color_space} /BitsPerComponent {bits} /Filter {decode_filter}{decode_parms}"
+        ).encode()
+        return EncodedImage(image.size, dictionary, data)
+
+    @staticmethod
+    def _encode_g4(image: Image.Image) -> Optional[bytes]:
+        """Сжимает черно-белое изображение CCITT G4 (None, если libtiff недоступен)"""
+
+        buffer = BytesIO()
+        try:
+            # Одна полоса на все изображение: полосы G4 нельзя склеить в один поток
+            image.save(buffer, "TIFF", compression="group4", strip_size=2**31 - 1)
+        except OSError:
+            return None
+
+        tags = Image.open(buffer).tag_v2
+        offset, count = tags[TiffImagePlugin.STRIPOFFSETS][0], tags[TiffImagePlugin.STRIPBYTECOUNTS][0]
+        return buffer.getvalue()[offset : offset + count]
+
+    def checkpoint(self) -> dict:
+        """Дописывает дерево страниц и xref инкрементным обновлением и возвращает состояние писателя
+
+        После контрольной точки файл - корректный PDF со всеми добавленными страницами.
+        Состояние (словарь для JSON) позволяет продолжить запись в новом процессе: PDFWriter(path, dpi, state).
+        """
+
+        self._write_trailer()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        return {
+            "size": self._position,
+            "next_ref": self._next_ref,
+            "page_refs": list(self._page_refs),
+            "catalog_ref": self._catalog_ref,
+            "pages_ref": self._pages_ref,
+            "font_ref": self._font_ref,
+            "font": self._caption_font.state() if self._caption_font is not None else self._font_state,
+            "xref_offset": self._xref_offset,
+        }
+
+    def close(self) -> None:
+        """Записывает дерево страниц, таблицу xref и завершает файл
+
+        Переданный поток не закрывается, а только сбрасывается.
+        """
+
+        self._write_trailer()
+        if self.output_path is not None:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def _write_trailer(self) -> None:
+        """Записывает шрифт, дерево страниц, каталог и таблицу xref с трейлером"""
+
+        if self._caption_font is not None:
+            self._caption_font.write(self, self._font_ref)
+
+        kids = " ".join(f"{ref} 0 R" for ref in self._page_refs)
+        self.write_object(self._pages_ref, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_refs)} >>".encode())
+
+        xref_offset = self._position
+        xref = BytesIO()
+        if self._xref_offset is None:
+            self.write_object(self._catalog_ref, f"<< /Type /Catalog /Pages {self._pages_ref} 0 R >>".encode())
+            xref_offset = self._position
+            xref.write(f"xref\n0 {self._next_ref}\n0000000000 65535 f \n".encode())
+            for ref in range(1, self._next_ref):
+                xref.write(f"{self._offsets.get(ref, 0):010d} 00000 n \n".encode())
+            trailer = f"<< /Size {self._next_ref} /Root {self._catalog_ref} 0 R >>"
+        else:
+            # Инкрементное обновление: только объекты, записанные после предыдущей таблицы
+            # (и свободный объект 0 - некоторые программы ожидают секцию, начинающуюся с него)
+            xref.write(b"xref\n0 1\n0000000000 65535 f \n")
+            refs = sorted(self._offsets)
+            start = 0
+            for end in range(1, len(refs) + 1):
+                if end == len(refs) or refs[end] != refs[end - 1] + 1:
+                    xref.write(f"{refs[start]} {end - start}\n".encode())
+                    for ref in refs[start:end]:
+                        xref.write(f"{self._offsets[ref]:010d} 00000 n \n".encode())
+                    start = end
+            trailer = f"<< /Size {self._next_ref} /Root {self._catalog_ref} 0 R /Prev {self._xref_offset} >>"
+
+        xref.write(f"trailer\n{trailer}\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self._write(xref.getvalue())
+        self._offsets.clear()
+        self._xref_offset = xref_offset
+        self._checkpoint_position = self._position
@@ -1,156 +1,110 @@
-import ctypes
-import time
-from typing import List
-import tempfile
-import os
+import itertools
+import threading
+from typing import Iterable, Iterator, Optional
 
 from loguru import logger
 
-from src.print_scale_images.config import ImageInfo
-from src.print_scale_images.handlers.pdf_exporter import PDFExporter
+from src.print_scale_images.config import (
+    ImageConfig,
+    ImageInfo,
+    PrintConfig,
+    get_app_config,
+)
+from src.print_scale_images.handlers.print_spooler import (
+    PrintJob,
+    PrintSpooler,
+    create_spooler,
+)
+
+# Имя заданий печати в очереди принтера
+JOB_NAME = "PrintScaleImageA4"
 
 
 class PrinterService:
-    """Сервис для печати с использованием стандартных диалогов Windows"""
+    """Сервис печати: страницы передаются спулеру выбранного бэкенда"""
+
+    def __init__(
+        self,
+        print_config: Optional[PrintConfig] = None,
+        image_config: Optional[ImageConfig] = None,
+        spooler: Optional[PrintSpooler] = None,
+    ):
+        self.print_config = print_config or get_app_config().print_config
+        self.image_config = image_config or get_app_config().image_config
+        self.spooler = spooler or create_spooler(self.print_config, self.image_config)
+
+    def print_images(self, processed_images: Iterable[ImageInfo], wait: bool = False) -> bool:
+        """Отправляет изображения на печать частями по chunk_pages страниц
+
+        Части печатаются конвейером: следующая часть готовится и отправляется,
+        пока печатается предыдущая, а перед отправкой очередной части ожидается
+        завершение позапрошлой - в очереди принтера не больше двух частей.
+        При wait=False первая часть отправляется сразу, остальные - в фоновом потоке.
+        """
+
+        chunks = self._iter_chunks(processed_images)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            logger.error("Ошибка печати: нет страниц для печати")
+            return False
 
-    def print_images(self, processed_images: List[ImageInfo]) -> bool:
-        """Печатает изображения через стандартный диалог Windows"""
+        job = self._submit(first_chunk, 1)
+        if job is None:
+            return False
 
-        temp_path = None
-        try:
-            # Создаем временный PDF файл
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                temp_path = temp_file.name
+        if wait:
+            return self._print_remaining(job, chunks)
 
-            # Сохраняем PDF
-            PDFExporter().export_to_pdf(processed_images, temp_path)
-            logger.info(f"PDF создан: {temp_path}")
+        threading.Thread(target=self._print_remaining, args=(job, chunks), name="print-job-watch", daemon=True).start()
+        return True
 
-            # Показываем стандартный диалог печати
-            success = self._show_print_dialog(temp_path)
+    def _iter_chunks(self, processed_images: Iterable[ImageInfo]) -> Iterator[Iterator[ImageInfo]]:
+        """Делит страницы на части, не загружая часть в память целиком
 
-            return success
+        Каждая часть должна быть прочитана полностью до запроса следующей.
+        """
+
+        chunk_pages = self.print_config.chunk_pages
+        iterator = iter(processed_images)
+        for first in iterator:
+            yield itertools.chain([first], itertools.islice(iterator, chunk_pages - 1 if chunk_pages > 0 else None))
+
+    def _submit(self, chunk: Iterator[ImageInfo], number: int) -> Optional[PrintJob]:
+        """Отправляет часть на печать, при ошибке записывает ее в лог и возвращает None"""
 
-        except Exception as e:
-            logger.error(f"Ошибка печати: {e}")
-            return False
-        finally:
-            # Удаляем временный файл (с задержкой для печати)
-            if temp_path and os.path.exists(temp_path):
-                import threading
-
-                def delayed_delete():
-                    time.sleep(10)  # Ждем 10 секунд для завершения печати
-                    try:
-                        os.unlink(temp_path)
-                        logger.debug(f"Временный файл удален: {temp_path}")
-                    except Exception as e:
-                        logger.warning(f"Не удалось удалить временный файл: {e}")
-
-                threading.Thread(target=delayed_delete, daemon=True).start()
-
-    @staticmethod
-    def _show_print_dialog(file_path: str) -> bool:
-        """Показывает стандартный диалог печати Windows"""
         try:
-            # Используем ShellExecute для открытия диалога печати
-            result = ctypes.windll.shell32.ShellExecuteW(
-                None,  # hwnd
-                "print",  # operation
-                file_path,  # file
-                None,  # parameters
-                None,  # directory
-                0  # nShowCmd
-            )
-
-            # ShellExecute возвращает значение > 32 при успехе
-            if result > 32:
-                logger.info("Диалог печати открыт успешно")
-                return True
-            else:
-                logger.error(f"Ошибка открытия диалога печати: код {result}")
+            job = self.spooler.print_pages(chunk, f"{JOB_NAME} - {number}")
+        except Exception as e:
+            logger.error(f"Ошибка печати части {number}: {e}")
+            return None
+
+        logger.info(f"Задание печати {job.job_id} (часть {number}) отправлено, страниц: {job.page_count}")
+        return job
+
+    def _print_remaining(self, job: PrintJob, chunks: Iterator[Iterator[ImageInfo]]) -> bool:
+        """Отправляет оставшиеся части, пока печатается предыдущая, и дожидается завершения печати"""
+
+        success = True
+        for number, chunk in enumerate(chunks, 2):
+            next_job = self._submit(chunk, number)
+            success = self._wait_job(job) and success
+            if next_job is None:
                 return False
+            job = next_job
 
+        return self._wait_job(job) and success
+
+    def _wait_job(self, job: PrintJob) -> bool:
+        """Ожидает завершения задания и записывает результат в лог"""
+
+        try:
+            printed = self.spooler.wait(job, self.print_config.job_timeout)
         except Exception as e:
-            logger.error(f"Ошибка вызова диалога печати: {e}")
+            logger.error(f"Ошибка отслеживания задания печати {job.job_id}: {e}")
             return False
 
-# import os
-# import platform
-# import tempfile
-# import time
-# from pathlib import Path
-# from typing import List
-#
-# from loguru import logger
-#
-# from src.print_scale_images.config import ImageInfo
-# from src.print_scale_images.handlers.pdf_exporter import PDFExporter
-#
-#
-# class PrinterService:
-#     """Кроссплатформенный сервис для работы с печатью"""
-#
-#     def print_images(self, processed_images: List[ImageInfo]) -> bool:
-#         """Печатает список обработанных изображений через временный PDF"""
-#
-#         temp_path = None
-#         try:
-#             # Создаем временный PDF файл
-#             with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-#                 temp_path = temp_file.name
-#
-#             # Сохраняем PDF
-#             PDFExporter().export_to_pdf(processed_images, temp_path)
-#
-#             # Печатаем PDF средствами ОС
-#             success = self._print_pdf(temp_path)
-#
-#             # Задержка перед удалением файла (особенно для Windows)
-#             if success and platform.system() == "Windows":
-#                 time.sleep(5)  # 5 секунд для Windows
-#             elif success:
-#                 time.sleep(2)  # 2 секунды для других ОС
-#
-#             return success
-#
-#         except Exception as e:
-#             logger.error(f"Ошибка печати: {e}")
-#             return False
-#         finally:
-#             # Удаляем временный файл после задержки
-#             path = Path(temp_path)
-#             if temp_path and path.exists():
-#                 try:
-#                     path.unlink()
-#                     logger.debug(f"Временный файл удален: {temp_path}")
-#                 except Exception as e:
-#                     logger.warning(f"Не удалось удалить временный файл {temp_path}: {e}")
-#
-#     @staticmethod
-#     def _print_pdf(pdf_path: str) -> bool:
-#         """Печатает PDF файл средствами ОС"""
-#
-#         try:
-#             system = platform.system()
-#             logger.debug(f"Печать PDF на системе: {system}, файл: {pdf_path}")
-#
-#             if system == "Windows":
-#                 os.startfile(pdf_path, "print")
-#                 logger.debug("Команда печати отправлена в Windows")
-#                 return True
-#             elif system == "Darwin":  # macOS
-#                 result = os.system(f'lpr "{pdf_path}"')
-#                 logger.debug(f"Команда lpr выполнена с кодом: {result}")
-#                 return result == 0
-#             elif system == "Linux":
-#                 result = os.system(f'lpr "{pdf_path}"')
-#                 logger.debug(f"Команда lpr выполнена с кодом: {result}")
-#                 return result == 0
-#             else:
-#                 logger.error(f"Не поддерживаемая платформа: {system}")
-#                 return False
-#
-#         except Exception as e:
-#             logger.error(f"Ошибка печати PDF: {e}")
-#             return False
+        if printed:
+            logger.info(f"Задание печати {job.job_id} выполнено")
+        else:
+            logger.warning(f"Задание печати {job.job_id} не завершено или завершилось с ошибкой")
+        return printed
@@ -0,0 +1,249 @@
+import platform
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from loguru import logger
+from PIL import Image
+
+from src.print_scale_images.config import ImageConfig, ImageInfo, PrintConfig
+from src.print_scale_images.handlers.exporters import (
+    PdfPageExporter,
+    check_page_count,
+    render_page,
+)
+from src.print_scale_images.handlers.pdf_writer import PDFWriter
+
+# Период опроса состояния задания печати, с
+POLL_INTERVAL = 1.0
+
+# Состояния задания Windows (JOB_STATUS_*), означающие его завершение
+JOB_STATUS_ERROR = 0x0002
+JOB_STATUS_DELETED = 0x0100
+JOB_STATUS_PRINTED = 0x0080
+
+
+@dataclass
+class PrintJob:
+    """Отправленное задание печати"""
+
+    job_id: str
+    name: str
+    page_count: int
+    printer: str = ""
+    # Файл задания (только для бэкенда "file")
+    path: Optional[Path] = None
+
+
+class PrintSpooler(ABC):
+    """Абстрактный спулер: страницы передаются бэкенду печати по одной, без временного PDF"""
+
+    def __init__(self, image_config: ImageConfig, printer_name: str = ""):
+        self.image_config = image_config
+        self.printer_name = printer_name
+        self.pdf_exporter = PdfPageExporter(image_config)
+
+    @abstractmethod
+    def print_pages(self, pages: Iterable[ImageInfo], name: str) -> PrintJob:
+        """Передает страницы на печать и возвращает отправленное задание"""
+
+    @abstractmethod
+    def wait(self, job: PrintJob, timeout: float) -> bool:
+        """Ожидает завершения задания, возвращает True, если оно напечатано"""
+
+    def _write_pdf(self, writer: PDFWriter, pages: Iterable[ImageInfo]) -> int:
+        """Записывает страницы в открытый PDF и возвращает их количество"""
+
+        page_count = self.pdf_exporter.write_pages(writer, pages)
+        check_page_count(page_count, "печати")
+        return page_count
+
+    def render_page(self, info: ImageInfo) -> Image.Image:
+        """Растеризует страницу A4 (для векторных страниц - с подписью)"""
+
+        return render_page(info, self.image_config, self.pdf_exporter.caption_builder)
+
+
+class GdiSpooler(PrintSpooler):
+    """Печать через GDI Windows (pywin32): страницы рисуются прямо в контекст принтера"""
+
+    def print_pages(self, pages: Iterable[ImageInfo], name: str) -> PrintJob:
+        import win32con
+        import win32print
+        import win32ui
+        from PIL import ImageWin
+
+        printer = self.printer_name or win32print.GetDefaultPrinter()
+        dc = win32ui.CreateDC()
+        dc.CreatePrinterDC(printer)
+        try:
+            # Страница печатается в натуральную величину (масштаб 1:1 не искажается): ее DPI
+            # переводится в точки принтера, а не вписывается в область печати. Координаты
+            # контекста отсчитываются от области печати, смещенной от края листа на PHYSICALOFFSET
+            dpi_x = dc.GetDeviceCaps(win32con.LOGPIXELSX)
+            dpi_y = dc.GetDeviceCaps(win32con.LOGPIXELSY)
+            sheet_width = dc.GetDeviceCaps(win32con.PHYSICALWIDTH)
+            sheet_height = dc.GetDeviceCaps(win32con.PHYSICALHEIGHT)
+            offset_x = dc.GetDeviceCaps(win32con.PHYSICALOFFSETX)
+            offset_y = dc.GetDeviceCaps(win32con.PHYSICALOFFSETY)
+            page_dpi = self.image_config.dpi
+            job_id = dc.StartDoc(name)
+            page_count = 0
+            try:
+                for info in pages:
+                    page = self.render_page(info)
+                    # Альбомная страница на книжном листе поворачивается
+                    if (page.width > page.height) != (sheet_width > sheet_height):
+                        page = page.transpose(Image.Transpose.ROTATE_90)
+                    if page.mode not in ("1", "L", "RGB"):
+                        page = page.convert("RGB")
+
+                    width = round(page.width * dpi_x / page_dpi)
+                    height = round(page.height * dpi_y / page_dpi)
+                    # По центру листа (для A4 - от его края); поля страницы вне области печати отсекаются
+                    left = (sheet_width - width) // 2 - offset_x
+                    top = (sheet_height - height) // 2 - offset_y
+
+                    dc.StartPage()
+                    ImageWin.Dib(page).draw(dc.GetHandleOutput(), (left, top, left + width, top + height))
+                    dc.EndPage()
+                    page_count += 1
+                check_page_count(page_count, "печати")
+            except BaseException:
+                dc.AbortDoc()
+                raise
+            dc.EndDoc()
+        finally:
+            dc.DeleteDC()
+
+        return PrintJob(job_id=str(job_id), name=name, page_count=page_count, printer=printer)
+
+    def wait(self, job: PrintJob, timeout: float) -> bool:
+        import pywintypes
+        import win32print
+
+        handle = win32print.OpenPrinter(job.printer)
+        try:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                try:
+                    status = win32print.GetJob(handle, int(job.job_id), 1)["Status"]
+                except pywintypes.error:
+                    # Задание удалено из очереди - печать завершена
+                    return True
+
+                if status & (JOB_STATUS_ERROR | JOB_STATUS_DELETED):
+                    return False
+                if status & JOB_STATUS_PRINTED:
+                    return True
+                time.sleep(POLL_INTERVAL)
+        finally:
+            win32print.ClosePrinter(handle)
+
+        return False
+
+
+class CupsSpooler(PrintSpooler):
+    """Печать через CUPS: PDF пишется прямо в стандартный ввод lp"""
+
+    def print_pages(self, pages: Iterable[ImageInfo], name: str) -> PrintJob:
+        command = ["lp", "-t", name]
+        if self.printer_name:
+            command += ["-d", self.printer_name]
+
+        process = subprocess.Popen(  # noqa: S603
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        try:
+            writer = PDFWriter(process.stdin, self.image_config.dpi)
+            page_count = self._write_pdf(writer, pages)
+            writer.close()
+        except BaseException:
+            # lp не создает задание, если ввод оборван
+            process.kill()
+            process.wait()
+            raise
+
+        stdout, stderr = process.communicate()
+        if process.returncode != 0:
+            message = stderr.decode(errors="replace").strip()
+            raise RuntimeError(f"lp завершился с кодом {process.returncode}: {message}")
+
+        # Вывод lp: "request id is Printer-123 (1 file(s))"
+        match = re.search(r"request id is (\S+)", stdout.decode(errors="replace"))
+        job_id = match.group(1) if match else ""
+        return PrintJob(job_id=job_id, name=name, page_count=page_count, printer=self.printer_name)
+
+    def wait(self, job: PrintJob, timeout: float) -> bool:
+        if not job.job_id:
+            logger.warning("lp не сообщил номер задания, завершение печати не отслеживается")
+            return True
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            # lpstat -o показывает только незавершенные задания
+            result = subprocess.run(["lpstat", "-o"], capture_output=True, text=True, check=False)  # noqa: S603, S607
+            if result.returncode != 0:
+                logger.warning(f"Не удалось получить состояние очереди печати: {result.stderr.strip()}")
+                return False
+            if not any(line.split(maxsplit=1)[:1] == [job.job_id] for line in result.stdout.splitlines()):
+                return True
+            time.sleep(POLL_INTERVAL)
+
+        return False
+
+
+class FileSpooler(PrintSpooler):
+    """Замена принтера для проверки: каждое задание сохраняется в каталог как PDF"""
+
+    def __init__(self, image_config: ImageConfig, spool_dir: str = ""):
+        super().__init__(image_config, printer_name="file")
+        self.spool_dir = Path(spool_dir) if spool_dir else Path(tempfile.gettempdir()) / "print_scale_images_spool"
+
+    def print_pages(self, pages: Iterable[ImageInfo], name: str) -> PrintJob:
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        job_id = str(time.time_ns())
+        safe_name = re.sub(r"[^\w.-]", "_", name)
+        path = self.spool_dir / f"{job_id}-{safe_name}.pdf"
+
+        # Недописанный файл удаляется писателем PDF, готовый появляется под итоговым именем атомарно
+        part_path = path.with_suffix(".pdf.part")
+        with PDFWriter(str(part_path), self.image_config.dpi) as writer:
+            page_count = self._write_pdf(writer, pages)
+        part_path.replace(path)
+
+        return PrintJob(job_id=job_id, name=name, page_count=page_count, printer=self.printer_name, path=path)
+
+    def wait(self, job: PrintJob, timeout: float) -> bool:
+        return job.path is not None and job.path.exists()
+
+
+def create_spooler(print_config: PrintConfig, image_config: ImageConfig) -> PrintSpooler:
+    """Создает спулер выбранного в конфигурации бэкенда"""
+
+    backend = print_config.printer_backend
+    if backend == "auto":
+        if platform.system() == "Windows":
+            backend = "gdi"
+        elif shutil.which("lp"):
+            backend = "cups"
+        else:
+            # Бэкенд "file" только для проверки и выбирается лишь явно: иначе задание молча
+            # сохранилось бы во временный каталог вместо печати
+            raise RuntimeError("Печать недоступна: команда lp не найдена (CUPS не установлен)")
+
+    match backend:
+        case "gdi":
+            return GdiSpooler(image_config, print_config.printer_name)
+        case "cups":
+            return CupsSpooler(image_config, print_config.printer_name)
+        case "file":
+            return FileSpooler(image_config, print_config.spool_dir)
+
+    raise ValueError(f"Неизвестный бэкенд печати: {backend}")
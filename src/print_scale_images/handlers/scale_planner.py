@@ -0,0 +1,151 @@
+"""Выбор масштаба и размещения изображения на странице (без загрузки PIL)"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from typing import Iterable
+
+from src.print_scale_images.config import ImageConfig
+
+# A4 в альбомной ориентации 300 DPI: 297mm x 210mm
+A4_SIZE_LANDSCAPE = (3508, 2480)
+
+
+def parse_scale(text: str) -> Fraction:
+    """Разбирает масштаб вида "1:2.5" (или "0.4") в точную дробь"""
+
+    if ":" in text:
+        left, right = text.split(":", 1)
+        scale = Fraction(left.strip()) / Fraction(right.strip())
+    else:
+        scale = Fraction(text.strip())
+
+    if scale <= 0:
+        raise ValueError(f"Недопустимый масштаб: {text}")
+    return scale
+
+
+def format_scale(scale: Fraction) -> str:
+    """Форматирует масштаб для подписи: 1:2.5, 1:4, 2:1"""
+
+    if scale <= 1:
+        return f"1:{_format_number(1 / scale)}"
+    return f"{_format_number(scale)}:1"
+
+
+def _format_number(value: Fraction) -> str:
+    """Число без лишних знаков: 4, 2.5, 10/3 как 10/3"""
+
+    if value.denominator == 1:
+        return str(value.numerator)
+
+    # Конечная десятичная дробь только при знаменателе вида 2^a * 5^b
+    denominator = value.denominator
+    for factor in (2, 5):
+        while denominator % factor == 0:
+            denominator //= factor
+    if denominator == 1:
+        return f"{float(value):g}"
+    return f"{value.numerator}/{value.denominator}"
+
+
+@dataclass(frozen=True)
+class PagePlan:
+    """Выбранный масштаб и размещение изображения на странице"""
+
+    scale: Fraction
+    # Масштаб в виде (знаменатель, числитель): (5, 2) - 1:2.5
+    scale_ratio: tuple[int, int]
+    scaled_size: tuple[int, int]
+    position: tuple[int, int]
+    page_size: tuple[int, int]
+
+    @property
+    def scale_text(self) -> str:
+        """Масштаб для подписи"""
+        return format_scale(self.scale)
+
+
+class ScalePlanner:
+    """Таблица допустимых масштабов для одной конфигурации
+
+    Для каждого масштаба заранее вычисляются наибольшие размеры исходника,
+    который при этом масштабе помещается на страницу, поэтому выбор масштаба
+    сводится к целочисленным сравнениям без деления и округлений.
+    """
+
+    def __init__(self, page_size: tuple[int, int], margin: int, text_margin: int, allowed_scales: Iterable[Fraction]):
+        self.page_size = page_size
+        self.text_margin = text_margin
+
+        # Максимальный размер с учетом отступов и места для подписи
+        self.max_width = page_size[0] - 2 * margin
+        self.max_height = page_size[1] - 2 * margin - text_margin
+
+        # Масштабы от крупного к мелкому и предельные размеры исходника для каждого
+        self.scales = tuple(sorted(set(allowed_scales), reverse=True))
+        if not self.scales:
+            raise ValueError("Не задано ни одного допустимого масштаба")
+        self.table = tuple((scale, int(self.max_width / scale), int(self.max_height / scale)) for scale in self.scales)
+
+        self._plans: dict[tuple[int, int], PagePlan] = {}
+
+    def select_scale(self, image_size: tuple[int, int]) -> Fraction:
+        """Наибольший допустимый масштаб, при котором изображение помещается (иначе самый мелкий)"""
+
+        width, height = image_size
+        for scale, fit_width, fit_height in self.table:
+            if width <= fit_width and height <= fit_height:
+                return scale
+        return self.scales[-1]
+
+    def plan(self, image_size: tuple[int, int]) -> PagePlan:
+        """План размещения изображения заданного размера (с кэшированием по размеру)"""
+
+        plan = self._plans.get(image_size)
+        if plan is None:
+            plan = self._plans[image_size] = self._make_plan(image_size)
+        return plan
+
+    def _make_plan(self, image_size: tuple[int, int]) -> PagePlan:
+        """Вычисляет план размещения"""
+
+        scale = self.select_scale(image_size)
+        width, height = image_size
+        scaled_size = (int(width * scale), int(height * scale))
+
+        # Позиция для центрирования
+        x = (self.page_size[0] - scaled_size[0]) // 2
+        y = (self.page_size[1] - scaled_size[1] - self.text_margin) // 2
+
+        return PagePlan(
+            scale=scale,
+            scale_ratio=(scale.denominator, scale.numerator),
+            scaled_size=scaled_size,
+            position=(x, y),
+            page_size=self.page_size,
+        )
+
+    def describe(self) -> str:
+        """Список допустимых масштабов для пользователя"""
+        return ", ".join(format_scale(scale) for scale in self.scales)
+
+
+@lru_cache(maxsize=32)
+def _get_planner(
+    page_size: tuple[int, int], margin: int, text_margin: int, allowed_scales: tuple[str, ...]
+) -> ScalePlanner:
+    """Планировщик для набора параметров (создается один раз)"""
+    return ScalePlanner(page_size, margin, text_margin, (parse_scale(scale) for scale in allowed_scales))
+
+
+def get_planner(config: ImageConfig) -> ScalePlanner:
+    """Планировщик масштабов для конфигурации"""
+    return _get_planner(A4_SIZE_LANDSCAPE, config.margin, config.text_margin, tuple(config.allowed_scales))
+
+
+def plan_page(image_size: tuple[int, int], config: ImageConfig) -> PagePlan:
+    """Выбирает масштаб и положение изображения на странице A4"""
+    return get_planner(config).plan(image_size)
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from PIL import Image, PngImagePlugin
+
+from src.print_scale_images.config import ImageConfig
+from src.print_scale_images.handlers.color_normalizer import ColorNormalizer
+from src.print_scale_images.handlers.page_cache import DEFAULT_CACHE_DIR, DiskCache
+from src.print_scale_images.handlers.tiled_reader import resize_low_memory
+
+# Размер миниатюры по большей стороне, пикселей
+THUMBNAIL_SIZE = 160
+
+# Лимит дискового кэша миниатюр, МБ
+THUMBNAIL_CACHE_MB = 64
+
+
+@dataclass
+class Thumbnail:
+    """Миниатюра изображения и размер исходника"""
+
+    image_path: str
+    image: Image.Image
+    original_size: tuple[int, int]
+
+
+class ThumbnailCache(DiskCache):
+    """Дисковый кэш миниатюр (PNG, размер исходника - в текстовом блоке)"""
+
+    ENTRY_SUFFIXES = (".png",)
+
+    def __init__(self, cache_dir: str = "", max_size_mb: int = THUMBNAIL_CACHE_MB):
+        super().__init__((Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR) / "thumbnails", max_size_mb)
+
+    @staticmethod
+    def make_key(image_path: str, size: int) -> str:
+        """Вычисляет ключ миниатюры по идентичности файла и размеру"""
+
+        path = Path(image_path).resolve()
+        stat = path.stat()
+        key_data = [str(path), stat.st_size, stat.st_mtime_ns, size]
+        return hashlib.sha1(json.dumps(key_data).encode(), usedforsecurity=False).hexdigest()
+
+    def get(self, image_path: str, size: int) -> Optional[Thumbnail]:
+        """Возвращает миниатюру из кэша или None"""
+
+        try:
+            entry = self.cache_dir / f"{self.make_key(image_path, size)}.png"
+            if not entry.exists():
+                return None
+
+            image = Image.open(entry)
+            image.load()
+            original_size = tuple(json.loads(image.text["original_size"]))
+            os.utime(entry)
+        except Exception as e:
+            logger.warning(f"Ошибка чтения миниатюры из кэша для {image_path}: {e}")
+            return None
+
+        return Thumbnail(image_path, image, original_size)
+
+    def put(self, thumbnail: Thumbnail, size: int) -> None:
+        """Сохраняет миниатюру в кэш"""
+
+        try:
+            entry = self.cache_dir / f"{self.make_key(thumbnail.image_path, size)}.png"
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+            info = PngImagePlugin.PngInfo()
+            info.add_text("original_size", json.dumps(thumbnail.original_size))
+
+            tmp_entry = entry.with_suffix(".png.tmp")
+            thumbnail.image.save(tmp_entry, "PNG", pnginfo=info)
+            tmp_entry.replace(entry)
+
+            self._add_size(entry.stat().st_size)
+        except Exception as e:
+            logger.warning(f"Ошибка записи миниатюры в кэш для {thumbnail.image_path}: {e}")
+
+
+class ThumbnailService:
+    """Фоновое построение миниатюр с дисковым кэшем
+
+    Исходник декодируется с уменьшением прямо в декодере (Image.draft для JPEG)
+    или по полосам (большие TIFF), поэтому миниатюра большого файла строится
+    без его полного декодирования в память.
+    """
+
+    def __init__(self, config: ImageConfig, size: int = THUMBNAIL_SIZE, workers: Optional[int] = None):
+        self.size = size
+        self.max_decode_mb = config.max_decode_mb
+        self.normalizer = ColorNormalizer()
+        self.cache = ThumbnailCache(config.cache_dir) if config.cache_size_mb > 0 else None
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1), thread_name_prefix="thumbnails"
+        )
+
+    def submit(self, image_path: str) -> Future:
+        """Запускает построение миниатюры в фоне, результат - Thumbnail"""
+        return self._executor.submit(self.get_thumbnail, image_path)
+
+    def get_thumbnail(self, image_path: str) -> Thumbnail:
+        """Возвращает миниатюру из кэша или строит ее"""
+
+        if self.cache is not None:
+            thumbnail = self.cache.get(image_path, self.size)
+            if thumbnail is not None:
+                return thumbnail
+
+        thumbnail = self.make_thumbnail(image_path)
+        if self.cache is not None:
+            self.cache.put(thumbnail, self.size)
+        return thumbnail
+
+    def make_thumbnail(self, image_path: str) -> Thumbnail:
+        """Строит миниатюру изображения"""
+
+        with Image.open(image_path) as image:
+            # После draft размер изображения меняется, поэтому исходный запоминается заранее
+            original_size = image.size
+            image.draft(None, (self.size, self.size))
+
+            # Большие TIFF уменьшаются по полосам, остальные - целиком
+            ratio = min(self.size / image.width, self.size / image.height, 1)
+            size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+            thumbnail = resize_low_memory(
+                image, size, Image.Resampling.BOX, self.max_decode_mb, self.normalizer.for_resize
+            )
+            if thumbnail is None:
+                thumbnail = self.normalizer.for_resize(image)
+                thumbnail.thumbnail((self.size, self.size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+                # Копия не зависит от закрываемого файла исходника
+                thumbnail = thumbnail.copy()
+
+        return Thumbnail(image_path, thumbnail, original_size)
+
+    def shutdown(self) -> None:
+        """Отменяет ожидающие задачи и останавливает пул"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,238 @@
+import math
+import struct
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional
+
+from loguru import logger
+from PIL import Image, TiffImagePlugin
+
+# Теги TIFF, описывающие расположение данных
+IMAGE_LENGTH = 257
+STRIP_OFFSETS = 273
+ROWS_PER_STRIP = 278
+STRIP_BYTE_COUNTS = 279
+PLANAR_CONFIGURATION = 284
+TILE_WIDTH = 322
+TILE_LENGTH = 323
+TILE_OFFSETS = 324
+TILE_BYTE_COUNTS = 325
+
+# Теги-указатели на другие части исходного файла: в фрагменте они недействительны
+POINTER_TAGS = (STRIP_OFFSETS, STRIP_BYTE_COUNTS, TILE_OFFSETS, TILE_BYTE_COUNTS, 330, 34665, 34853, 40965)
+
+# Запас исходных строк вокруг полосы, чтобы фильтр LANCZOS не давал швов
+LANCZOS_SUPPORT = 3
+
+# Тип LONG в TIFF
+TIFF_LONG = 4
+
+# Версия в заголовке классического TIFF (у BigTIFF - 43)
+CLASSIC_TIFF_VERSION = 42
+
+
+def byte_order(prefix: bytes) -> str:
+    """Порядок байт struct для префикса TIFF (II - little-endian, MM - big-endian)"""
+    return "<" if prefix == b"II" else ">"
+
+
+def pixel_bytes(mode: str) -> int:
+    """Размер пикселя изображения PIL в памяти"""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+class TiledTiffReader:
+    """Чтение больших TIFF по полосам с постепенным уменьшением
+
+    Изображение декодируется группами целых полос (strip) или рядов плиток (tile):
+    для каждой группы собирается небольшой TIFF в памяти с теми же тегами, который
+    декодирует PIL (libtiff). Каждая группа сразу уменьшается, поэтому в памяти
+    одновременно находится не более max_decode_bytes исходных пикселей.
+    """
+
+    def __init__(self, image: Image.Image, max_decode_bytes: int):
+        self.image = image
+        self.max_decode_bytes = max_decode_bytes
+
+        tags = image.tag_v2
+        self.width, self.height = image.size
+        self.tiled = TILE_OFFSETS in tags
+        if self.tiled:
+            self.block_height = tags[TILE_LENGTH]
+            self.offsets, self.byte_counts = tags[TILE_OFFSETS], tags[TILE_BYTE_COUNTS]
+            self.blocks_per_row = math.ceil(self.width / tags[TILE_WIDTH])
+        else:
+            self.block_height = min(tags.get(ROWS_PER_STRIP, self.height), self.height)
+            self.offsets, self.byte_counts = tags[STRIP_OFFSETS], tags[STRIP_BYTE_COUNTS]
+            self.blocks_per_row = 1
+
+        # Память на декодирование одной полосы (ряда плиток) целиком
+        self.block_bytes = self.width * self.block_height * pixel_bytes(image.mode)
+
+    @classmethod
+    def supports(cls, image: Image.Image) -> bool:
+        """Можно ли читать изображение по полосам"""
+        if image.format != "TIFF" or not getattr(image, "filename", None):
+            return False
+
+        tags = image.tag_v2
+        if tags.get(PLANAR_CONFIGURATION, 1) != 1:
+            return False
+        if not (TILE_OFFSETS in tags or STRIP_OFFSETS in tags):
+            return False
+
+        # Фрагменты собираются в классическом формате TIFF, BigTIFF декодируется целиком
+        with Path(image.filename).open("rb") as fp:
+            header = fp.read(4)
+        return len(header) == 4 and struct.unpack(byte_order(tags.prefix) + "H", header[2:])[0] == CLASSIC_TIFF_VERSION
+
+    @classmethod
+    def needs_low_memory(cls, image: Image.Image, max_decode_bytes: int) -> bool:
+        """Превышает ли полное декодирование изображения лимит памяти"""
+        width, height = image.size
+        return width * height * pixel_bytes(image.mode) > max_decode_bytes and cls.supports(image)
+
+    def resize(
+        self,
+        size: tuple[int, int],
+        resample: Image.Resampling,
+        convert: Optional[Callable[[Image.Image], Image.Image]] = None,
+    ) -> Image.Image:
+        """Уменьшает изображение до size, декодируя его по полосам
+
+        convert применяется к каждой полосе до масштабирования (приведение цветового режима).
+        """
+
+        out_width, out_height = size
+        scale_y = self.height / out_height
+        margin = math.ceil(LANCZOS_SUPPORT * scale_y)
+
+        # Сколько выходных строк можно получать за раз, не превышая лимит памяти
+        row_bytes = self.width * pixel_bytes(self.image.mode)
+        source_rows = max(self.block_height * 2, self.max_decode_bytes // row_bytes)
+        chunk_rows = max(1, int((source_rows - 2 * margin - 2 * self.block_height) / scale_y))
+
+        result = None
+        with Path(self.image.filename).open("rb") as fp:
+            for out_top in range(0, out_height, chunk_rows):
+                out_bottom = min(out_top + chunk_rows, out_height)
+
+                # Точный прямоугольник исходника для полосы и строки с запасом для фильтра
+                box_top, box_bottom = out_top * scale_y, out_bottom * scale_y
+                row0 = max(0, math.floor(box_top) - margin)
+                row1 = min(self.height, math.ceil(box_bottom) + margin)
+
+                band = self._decode_rows(fp, row0, row1)
+                if convert is not None:
+                    band = convert(band)
+                part = band.resize(
+                    (out_width, out_bottom - out_top),
+                    resample,
+                    box=(0, box_top - row0, self.width, box_bottom - row0),
+                )
+                if result is None:
+                    result = Image.new(part.mode, size)
+                    if part.mode == "P":
+                        result.putpalette(part.getpalette())
+                result.paste(part, (0, out_top))
+                del band, part
+
+        logger.debug(f"Изображение {self.image.filename} уменьшено по полосам до {size}")
+        return result
+
+    def _decode_rows(self, fp: BinaryIO, row0: int, row1: int) -> Image.Image:
+        """Декодирует строки [row0, row1) исходного изображения"""
+
+        first_block = row0 // self.block_height
+        last_block = math.ceil(row1 / self.block_height)
+        block_top = first_block * self.block_height
+        rows = min(last_block * self.block_height, self.height) - block_top
+
+        indexes = range(first_block * self.blocks_per_row, last_block * self.blocks_per_row)
+        band = Image.open(self._build_fragment(fp, indexes, rows))
+        band.load()
+
+        return band.crop((0, row0 - block_top, self.width, row1 - block_top))
+
+    def _build_fragment(self, fp: BinaryIO, indexes: range, rows: int) -> BytesIO:
+        """Собирает в памяти TIFF из выбранных полос/плиток исходного файла"""
+
+        tags = self.image.tag_v2
+        ifd = TiffImagePlugin.ImageFileDirectory_v2(prefix=tags.prefix)
+        for tag, value in tags.items():
+            if tag in POINTER_TAGS:
+                continue
+            ifd[tag] = value
+            if tag in tags.tagtype:
+                ifd.tagtype[tag] = tags.tagtype[tag]
+        ifd[IMAGE_LENGTH] = rows
+        if not self.tiled:
+            ifd[ROWS_PER_STRIP] = self.block_height
+
+        data = []
+        for index in indexes:
+            fp.seek(self.offsets[index])
+            data.append(fp.read(self.byte_counts[index]))
+
+        offsets_tag, counts_tag = (TILE_OFFSETS, TILE_BYTE_COUNTS) if self.tiled else (STRIP_OFFSETS, STRIP_BYTE_COUNTS)
+        ifd[counts_tag] = tuple(len(block) for block in data)
+        ifd.tagtype[counts_tag] = TIFF_LONG
+
+        relative_offsets, position = [], 0
+        for block in data:
+            relative_offsets.append(position)
+            position += len(block)
+
+        ifd.tagtype[offsets_tag] = TIFF_LONG
+        if self.tiled:
+            # Размер IFD не зависит от значений смещений, поэтому считаем его с нулевыми смещениями
+            ifd[offsets_tag] = (0,) * len(data)
+            data_start = 8 + len(ifd.tobytes(8))
+            ifd[offsets_tag] = tuple(data_start + offset for offset in relative_offsets)
+        else:
+            # PIL сам прибавляет к StripOffsets конец IFD: данные пишутся сразу за ним
+            ifd[offsets_tag] = tuple(relative_offsets)
+
+        fragment = BytesIO()
+        fragment.write(tags.prefix + struct.pack(byte_order(tags.prefix) + "HL", CLASSIC_TIFF_VERSION, 8))
+        fragment.write(ifd.tobytes(8))
+        for block in data:
+            fragment.write(block)
+        fragment.seek(0)
+
+        return fragment
+
+
+def resize_low_memory(
+    image: Image.Image,
+    size: tuple[int, int],
+    resample: Image.Resampling,
+    max_decode_mb: int,
+    convert: Optional[Callable[[Image.Image], Image.Image]] = None,
+) -> Optional[Image.Image]:
+    """Уменьшает большое TIFF изображение по полосам, если полное декодирование превышает лимит
+
+    Возвращает None, если изображение помещается в лимит или не поддерживается.
+    """
+
+    max_decode_bytes = max_decode_mb * 1024 * 1024
+    if max_decode_mb <= 0 or not TiledTiffReader.needs_low_memory(image, max_decode_bytes):
+        return None
+
+    reader = TiledTiffReader(image, max_decode_bytes)
+    if reader.block_bytes * 2 > max_decode_bytes:
+        logger.warning(
+            f"Полосы {image.filename} слишком велики для чтения по частям "
+            f"({reader.block_height} строк), изображение декодируется целиком"
+        )
+        return None
+
+    try:
+        return reader.resize(size, resample, convert)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Не удалось прочитать {image.filename} по полосам ({e}), изображение декодируется целиком")
+        return None
@@ -1,9 +1,11 @@
 from src.utils.files import calculate_crc32, get_file_date, get_file_size
 from src.utils.logger import configure_logger
+from src.utils.startup import report_first_window
 
 __all__ = (
     "configure_logger",
     "get_file_date",
     "get_file_size",
     "calculate_crc32",
+    "report_first_window",
 )
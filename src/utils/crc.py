@@ -0,0 +1,197 @@
+"""Block-parallel CRC32 and per-block CRC manifests
+
+A large file is split into blocks that are hashed concurrently (zlib.crc32 releases
+the GIL) and the block CRCs are combined into exactly the CRC32 of the whole file.
+The block CRCs can be kept as a manifest: verifying a file against it later shows
+which regions changed.
+"""
+
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from src.utils.file_io import (
+    DIRECT_ALIGNMENT,
+    IO_BUFFERED,
+    IO_DIRECT,
+    IO_STREAM,
+    FileReader,
+)
+
+MANIFEST_VERSION = 1
+
+# Bytes per block hashed by one task
+DEFAULT_BLOCK_SIZE = 64 * 1024 * 1024
+
+# Smaller files are not worth splitting
+PARALLEL_MIN_SIZE = 2 * DEFAULT_BLOCK_SIZE
+
+# Bytes per read
+READ_SIZE = 1024 * 1024
+
+# Reflected CRC-32 polynomial (the one used by zlib)
+_POLY = 0xEDB88320
+
+
+def _multmodp(a: int, b: int) -> int:
+    """Multiply a(x) by b(x) modulo the CRC polynomial (reflected bit order)"""
+    m = 1 << 31
+    product = 0
+    while True:
+        if a & m:
+            product ^= b
+            if (a & (m - 1)) == 0:
+                break
+        m >>= 1
+        b = (b >> 1) ^ _POLY if b & 1 else b >> 1
+    return product
+
+
+# x^(2^n) mod p for n = 0..31
+_X2N_TABLE = [1 << 30]
+for _ in range(31):
+    _X2N_TABLE.append(_multmodp(_X2N_TABLE[-1], _X2N_TABLE[-1]))
+
+
+def _x2nmodp(n: int, k: int) -> int:
+    """x^(n * 2^k) mod p"""
+    product = 1 << 31
+    while n:
+        if n & 1:
+            product = _multmodp(_X2N_TABLE[k & 31], product)
+        n >>= 1
+        k += 1
+    return product
+
+
+def crc32_combine(crc1: int, crc2: int, length2: int) -> int:
+    """CRC32 of A + B from crc32(A), crc32(B) and len(B) (the zlib crc32_combine algorithm)"""
+    return _multmodp(_x2nmodp(length2, 3), crc1) ^ (crc2 & 0xFFFFFFFF)
+
+
+def crc32_file(file_path, read_size: int = READ_SIZE, io_mode: str = IO_BUFFERED) -> int:
+    """CRC32 of a file read sequentially in fixed-size chunks (io_mode: see src.utils.file_io)"""
+    if io_mode == IO_BUFFERED:
+        crc = 0
+        with Path(file_path).open("rb") as f:
+            while chunk := f.read(read_size):
+                crc = zlib.crc32(chunk, crc)
+        return crc
+
+    with FileReader(file_path, io_mode) as reader:
+        return _range_crc(reader, 0, reader.size, read_size)
+
+
+@dataclass
+class CrcManifest:
+    """CRC32 of a file and of each of its blocks"""
+
+    size: int
+    block_size: int
+    crc32: int
+    blocks: list[int] = field(default_factory=list)
+    mtime_ns: int = 0
+
+    def block_range(self, index: int) -> tuple[int, int]:
+        """(offset, length) of a block"""
+        offset = index * self.block_size
+        return offset, min(self.block_size, self.size - offset)
+
+    def save(self, manifest_path) -> None:
+        """Write the manifest as JSON (CRCs as hex, like in the reports)"""
+        data = asdict(self)
+        data["version"] = MANIFEST_VERSION
+        data["crc32"] = f"{self.crc32:08X}"
+        data["blocks"] = [f"{crc:08X}" for crc in self.blocks]
+        path = Path(manifest_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(data, f)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, manifest_path) -> "CrcManifest":
+        with Path(manifest_path).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"Unsupported manifest version in {manifest_path}")
+        return cls(
+            size=data["size"],
+            block_size=data["block_size"],
+            crc32=int(data["crc32"], 16),
+            blocks=[int(crc, 16) for crc in data["blocks"]],
+            mtime_ns=data.get("mtime_ns", 0),
+        )
+
+
+def _range_crc(reader: FileReader, offset: int, length: int, read_size: int = READ_SIZE) -> int:
+    """CRC32 of length bytes from offset, read into a buffer of the reader
+
+    In the direct mode reads are always whole aligned buffers (block sizes are multiples
+    of the alignment, and only the last block of a file may end unaligned, at its end);
+    the bytes past the range are not hashed.
+    """
+    view = memoryview(reader.allocate(read_size))
+    crc = 0
+    end = offset + length
+    while offset < end:
+        buffer = view if reader.direct else view[: min(len(view), end - offset)]
+        read = min(reader.read_into(buffer, offset), end - offset)
+        if read <= 0:
+            break
+        crc = zlib.crc32(view[:read], crc)
+        offset += read
+    return crc
+
+
+def crc32_blocks(
+    file_path, block_size: int = DEFAULT_BLOCK_SIZE, workers: Optional[int] = None, io_mode: str = IO_BUFFERED
+) -> CrcManifest:
+    """Hash the blocks of a file concurrently and combine them into the CRC32 of the whole file"""
+
+    if io_mode == IO_DIRECT and block_size % DIRECT_ALIGNMENT:
+        # Blocks would start at unaligned offsets
+        io_mode = IO_STREAM
+    with FileReader(file_path, io_mode) as reader:
+        stat = os.fstat(reader.fd)
+        size = stat.st_size
+        ranges = [(offset, min(block_size, size - offset)) for offset in range(0, size, block_size)]
+
+        workers = max(1, min(workers or os.cpu_count() or 1, len(ranges)))
+        if workers == 1:
+            blocks = [_range_crc(reader, offset, length) for offset, length in ranges]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="crc32") as executor:
+                blocks = list(executor.map(lambda block: _range_crc(reader, *block), ranges))
+
+    crc = 0
+    for (_, length), block_crc in zip(ranges, blocks):
+        crc = crc32_combine(crc, block_crc, length)
+    return CrcManifest(size, block_size, crc, blocks, stat.st_mtime_ns)
+
+
+def verify_manifest(
+    file_path, manifest: CrcManifest, workers: Optional[int] = None, io_mode: str = IO_BUFFERED
+) -> list[tuple[int, int]]:
+    """Changed regions of a file as (offset, length), adjacent blocks merged; empty if unchanged"""
+
+    current = crc32_blocks(file_path, manifest.block_size, workers, io_mode)
+    changed = []
+    for index in range(max(len(current.blocks), len(manifest.blocks))):
+        old = manifest.blocks[index] if index < len(manifest.blocks) else None
+        new = current.blocks[index] if index < len(current.blocks) else None
+        if old == new and current.block_range(index) == manifest.block_range(index):
+            continue
+
+        offset = index * manifest.block_size
+        end = min(offset + manifest.block_size, max(manifest.size, current.size))
+        if changed and changed[-1][0] + changed[-1][1] == offset:
+            changed[-1] = (changed[-1][0], end - changed[-1][0])
+        else:
+            changed.append((offset, end - offset))
+    return changed
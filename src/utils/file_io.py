@@ -0,0 +1,141 @@
+"""File reading modes for scans that should not evict other data from the OS page cache
+
+    buffered - ordinary reads through the page cache (default)
+    stream   - posix_fadvise(SEQUENTIAL) on open and DONTNEED on the ranges already read
+               (and on the whole file on close), so a scan streams through the cache
+               instead of filling it
+    direct   - O_DIRECT reads into page-aligned buffers, bypassing the cache entirely
+
+Where a mode is not supported (no posix_fadvise on Windows and macOS, no O_DIRECT on
+tmpfs and some network filesystems) the reader falls back to the next one: direct to
+stream, stream to buffered, with a single warning per process.
+"""
+
+import errno
+import mmap
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+from loguru import logger
+
+IO_BUFFERED = "buffered"
+IO_STREAM = "stream"
+IO_DIRECT = "direct"
+IO_MODES = (IO_BUFFERED, IO_STREAM, IO_DIRECT)
+
+# O_DIRECT offsets, lengths and buffer addresses must be multiples of the device block size
+DIRECT_ALIGNMENT = 4096
+
+# The stream mode drops the window of this size that ends this far behind the read position.
+# Pages read a moment ago may not be droppable yet, and DONTNEED skips a large folio that is
+# only partly in the range, so the windows of consecutive reads overlap: dropping just the
+# range read (or the same range later) left most of a file cached
+DROP_BEHIND = 8 * 1024 * 1024
+
+_warned: set[str] = set()
+
+
+def _warn_once(key: str, message: str) -> None:
+    if key not in _warned:
+        _warned.add(key)
+        logger.warning(message)
+
+
+class FileReader:
+    """Positional reads of a file in one of the IO_MODES
+
+    read_into() may be called from several threads at once (block-parallel hashing),
+    each with its own buffer from allocate(). `mode` is the mode actually used after
+    fallbacks.
+    """
+
+    def __init__(self, file_path, io_mode: str = IO_BUFFERED):
+        if io_mode not in IO_MODES:
+            raise ValueError(f"Unknown I/O mode: {io_mode!r}, expected one of {', '.join(IO_MODES)}")
+
+        self.path = Path(file_path)
+        self.mode = io_mode
+        self._lock = None
+        flags = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+
+        if self.mode == IO_DIRECT and not hasattr(os, "O_DIRECT"):
+            _warn_once("direct", "O_DIRECT is not supported on this platform, using the stream I/O mode")
+            self.mode = IO_STREAM
+        if self.mode == IO_STREAM and not hasattr(os, "posix_fadvise"):
+            _warn_once("stream", "posix_fadvise is not supported on this platform, using the buffered I/O mode")
+            self.mode = IO_BUFFERED
+
+        if self.mode == IO_DIRECT:
+            try:
+                self.fd = os.open(self.path, flags | os.O_DIRECT)
+            except OSError as e:
+                # EINVAL: the filesystem does not support O_DIRECT (tmpfs, some FUSE and network mounts)
+                if e.errno != errno.EINVAL:
+                    raise
+                _warn_once(f"direct:{self.path.stat().st_dev}", f"O_DIRECT failed ({e}), using the stream I/O mode")
+                self.mode = IO_STREAM
+                self.fd = os.open(self.path, flags)
+        else:
+            self.fd = os.open(self.path, flags)
+
+        if self.mode == IO_STREAM:
+            os.posix_fadvise(self.fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if not hasattr(os, "pread"):
+            # Windows: seek + read, one thread at a time
+            self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return os.fstat(self.fd).st_size
+
+    @property
+    def direct(self) -> bool:
+        return self.mode == IO_DIRECT
+
+    def allocate(self, size: int) -> Union[bytearray, mmap.mmap]:
+        """Read buffer: page-aligned and rounded up to DIRECT_ALIGNMENT in the direct mode"""
+        if self.direct:
+            return mmap.mmap(-1, -(-size // DIRECT_ALIGNMENT) * DIRECT_ALIGNMENT)
+        return bytearray(size)
+
+    def read_into(self, buffer, offset: int) -> int:
+        """Fill buffer from offset, returns the number of bytes read (0 at the end of the file)
+
+        In the direct mode offset and len(buffer) must be multiples of DIRECT_ALIGNMENT.
+        In the stream mode the DROP_BEHIND bytes that end DROP_BEHIND bytes before the end
+        of this range are dropped from the page cache: their data has been consumed.
+        """
+        if hasattr(os, "preadv"):
+            length = os.preadv(self.fd, [buffer], offset)
+        elif self._lock is None:
+            data = os.pread(self.fd, len(buffer), offset)
+            length = len(data)
+            buffer[:length] = data
+        else:
+            with self._lock:
+                os.lseek(self.fd, offset, os.SEEK_SET)
+                data = os.read(self.fd, len(buffer))
+            length = len(data)
+            buffer[:length] = data
+
+        end = offset + length
+        if self.mode == IO_STREAM and end > DROP_BEHIND:
+            start = max(0, end - 2 * DROP_BEHIND)
+            os.posix_fadvise(self.fd, start, end - DROP_BEHIND - start, os.POSIX_FADV_DONTNEED)
+        return length
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            if self.mode == IO_STREAM:
+                # The last DROP_BEHIND bytes of every range read
+                os.posix_fadvise(self.fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            os.close(self.fd)
+            self.fd = -1
+
+    def __enter__(self) -> "FileReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
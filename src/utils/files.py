@@ -1,19 +1,46 @@
+import os
+import queue
+import re
+import threading
 import zlib
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
 
 from loguru import logger
 
+from src.utils.crc import PARALLEL_MIN_SIZE, crc32_blocks, crc32_file
+from src.utils.file_io import IO_BUFFERED, FileReader
 
-def calculate_crc32(file_path):
-    """Calculate CRC32 checksum for a file"""
+# Read-ahead ring: buffer count and size, and the file size from which it pays off
+READ_AHEAD_BUFFERS = 4
+READ_AHEAD_BUFFER_SIZE = 1024 * 1024
+READ_AHEAD_MIN_SIZE = 4 * READ_AHEAD_BUFFER_SIZE
+
+
+def calculate_crc32(file_path, workers=1, manifest_path=None, io_mode=IO_BUFFERED):
+    """Calculate CRC32 checksum for a file
+
+    With workers > 1, files of at least PARALLEL_MIN_SIZE bytes are split into blocks hashed
+    concurrently and combined into the same CRC32. manifest_path additionally saves the
+    per-block CRCs for a later verify_manifest (see src.utils.crc). Other files of at least
+    READ_AHEAD_MIN_SIZE bytes are read ahead in a background thread while hashing.
+    io_mode selects how the file is read, e.g. without filling the page cache (see src.utils.file_io).
+    """
     try:
-        prev = 0
-        path = Path(file_path)
-        with path.open("rb") as f:
-            for line in f:
-                prev = zlib.crc32(line, prev)
-        return f"{prev & 0xFFFFFFFF:08X}"
+        size = Path(file_path).stat().st_size
+        if manifest_path is not None or (workers > 1 and size >= PARALLEL_MIN_SIZE):
+            manifest = crc32_blocks(file_path, workers=workers, io_mode=io_mode)
+            if manifest_path is not None:
+                manifest.save(manifest_path)
+            crc = manifest.crc32
+        elif size >= READ_AHEAD_MIN_SIZE:
+            crc = 0
+            for chunk in iter_read_ahead(file_path, io_mode=io_mode):
+                crc = zlib.crc32(chunk, crc)
+        else:
+            crc = crc32_file(file_path, io_mode=io_mode)
+        return f"{crc & 0xFFFFFFFF:08X}"
     except Exception as e:
         logger.error(f"Error calculating CRC32 for {file_path}: {e}")
         return f"ERROR: {str(e)}"
@@ -46,3 +73,155 @@ def get_filename_without_extension(filepath: str) -> str:
     Возвращает имя файла без расширения
     """
     return Path(filepath).stem
+
+
+def natural_sort_key(name: str) -> list:
+    """Sort key that orders embedded numbers numerically ("file2" before "file10")"""
+    return [int(part) if part.isdigit() else part.casefold() for part in re.split(r"(\d+)", name)]
+
+
+def iter_files(directory, extensions: Optional[tuple[str, ...]] = None, recursive: bool = False) -> Iterator[str]:
+    """Walk a directory with os.scandir and yield file paths as they are discovered
+
+    Files of each directory are yielded in natural order before its subdirectories
+    are visited, so consumers can start working while the walk is still running.
+    """
+    pending = [str(directory)]
+    while pending:
+        current = pending.pop()
+        files, subdirs = [], []
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            if extensions is None or entry.name.lower().endswith(extensions):
+                                files.append(entry)
+                        elif recursive and entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry)
+                    except OSError as e:
+                        logger.warning(f"Error reading {entry.path}: {e}")
+        except OSError as e:
+            logger.warning(f"Error scanning directory {current}: {e}")
+            continue
+
+        for entry in sorted(files, key=lambda item: natural_sort_key(item.name)):
+            yield entry.path
+
+        # Стек: добавляем в обратном порядке, чтобы обходить подкаталоги по порядку
+        for entry in sorted(subdirs, key=lambda item: natural_sort_key(item.name), reverse=True):
+            pending.append(entry.path)
+
+
+# Marks the end of the items of iter_in_background
+_FINISHED = object()
+
+
+def _put_unless_stopped(items: queue.Queue, stop: threading.Event, item) -> bool:
+    """Put an item into a bounded queue, give up (False) once stop is set"""
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _produce(
+    iterable: Iterable, items: queue.Queue, stop: threading.Event, on_finished: Optional[Callable[[int], None]]
+) -> None:
+    """Producer thread of iter_in_background: (True, item) entries, (False, error) on failure"""
+    count = 0
+    try:
+        for item in iterable:
+            if not _put_unless_stopped(items, stop, (True, item)):
+                return
+            count += 1
+    except Exception as e:
+        _put_unless_stopped(items, stop, (False, e))
+    else:
+        if on_finished is not None:
+            on_finished(count)
+    finally:
+        _put_unless_stopped(items, stop, (True, _FINISHED))
+
+
+def iter_in_background(
+    iterable: Iterable, max_buffer: int = 1024, on_finished: Optional[Callable[[int], None]] = None
+) -> Iterator:
+    """Consume an iterable in a background thread and yield its items as they arrive
+
+    Lets slow producers (e.g. directory walks on network shares) run ahead of the
+    consumer. The producer stops when the returned generator is closed. on_finished is
+    called from the producer thread with the number of items once the iterable is
+    exhausted (e.g. to show determinate progress when a directory walk is over).
+    """
+    items = queue.Queue(max_buffer)
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=_produce, args=(iterable, items, stop, on_finished), name="background-iterator", daemon=True
+    )
+    thread.start()
+
+    try:
+        while (entry := items.get())[1] is not _FINISHED:
+            ok, item = entry
+            if not ok:
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_read_ahead(
+    file_path,
+    buffer_count: int = READ_AHEAD_BUFFERS,
+    buffer_size: int = READ_AHEAD_BUFFER_SIZE,
+    io_mode: str = IO_BUFFERED,
+) -> Iterator[memoryview]:
+    """Read a file in a background thread into a ring of preallocated buffers
+
+    Yields memoryviews of the filled buffers in file order. A view is valid only until
+    the next one is requested: its buffer then goes back to the reader. While the
+    consumer processes one buffer (e.g. hashes it), the reader fills the others, so
+    disk reads overlap the processing instead of alternating with it. Read errors are
+    raised in the consumer; the reader stops when the generator is closed.
+    io_mode is one of src.utils.file_io.IO_MODES.
+    """
+    reader = FileReader(file_path, io_mode)
+    buffers = [reader.allocate(buffer_size) for _ in range(buffer_count)]
+    free = queue.Queue()
+    filled = queue.Queue()
+    for index in range(buffer_count):
+        free.put(index)
+
+    def read():
+        offset = 0
+        try:
+            with reader:
+                while (index := free.get()) is not None:
+                    length = reader.read_into(buffers[index], offset)
+                    if not length:
+                        break
+                    offset += length
+                    filled.put((index, length))
+        except Exception as e:
+            filled.put((None, e))
+            return
+        filled.put((None, None))
+
+    thread = threading.Thread(target=read, name="read-ahead", daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            index, length = filled.get()
+            if index is None:
+                if length is not None:
+                    raise length
+                return
+            yield memoryview(buffers[index])[:length]
+            free.put(index)
+    finally:
+        free.put(None)
@@ -0,0 +1,177 @@
+"""Per-device I/O lanes for scans
+
+Hashing files of one spinning disk in parallel makes its heads seek back and forth and is
+slower than reading them one by one, while different disks (and SSDs or network shares)
+can be read concurrently. DeviceLanes groups files by st_dev and gives every device its
+own worker lane: a thread pool sized by the kind of the device. All lanes run at once.
+
+    with DeviceLanes() as lanes:
+        for path, crc in lanes.map(calculate_crc32, paths):
+            ...
+"""
+
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from loguru import logger
+
+HDD = "hdd"
+SSD = "ssd"
+NETWORK = "network"
+UNKNOWN = "unknown"
+DEVICE_KINDS = (HDD, SSD, NETWORK, UNKNOWN)
+
+# Workers per lane by device kind. Unknown devices (no detection outside Linux) are read
+# one file at a time, as before the lanes: they may be spinning disks
+LANE_WORKERS = {HDD: 1, SSD: 4, NETWORK: 4, UNKNOWN: 1}
+
+NETWORK_FILESYSTEMS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "ceph", "glusterfs", "fuse.sshfs", "afs")
+
+# Nothing to seek: read like an SSD
+MEMORY_FILESYSTEMS = ("tmpfs", "ramfs")
+
+# Files queued in all lanes at once by map(): enough to keep every lane busy while the
+# results are consumed in order, without a future per file of a large tree
+MAX_IN_FLIGHT = 256
+
+
+def parse_lane_workers(values: Optional[list[str]]) -> dict[str, int]:
+    """LANE_WORKERS updated from "kind=N" strings (the --lane-workers command line option)"""
+    workers = dict(LANE_WORKERS)
+    for value in values or []:
+        kind, _, count = value.partition("=")
+        kind = kind.strip().lower()
+        if kind not in DEVICE_KINDS or not count.strip().isdigit() or int(count) < 1:
+            kinds = ", ".join(DEVICE_KINDS)
+            raise ValueError(f"Invalid lane workers {value!r}, expected KIND=N with KIND one of {kinds}")
+        workers[kind] = int(count)
+    return workers
+
+
+@lru_cache(maxsize=None)
+def _mounts() -> dict[int, tuple[str, str]]:
+    """st_dev -> (filesystem type, source) of the mounted filesystems (Linux)"""
+    mounts = {}
+    try:
+        with Path("/proc/self/mountinfo").open(encoding="utf-8", errors="replace") as f:
+            for line in f:
+                fields, _, tail = line.partition(" - ")
+                major, _, minor = fields.split()[2].partition(":")
+                fstype, source = (tail.split() + ["", ""])[:2]
+                mounts[os.makedev(int(major), int(minor))] = (fstype, source)
+    except (OSError, ValueError, IndexError):
+        pass
+    return mounts
+
+
+def _rotational(device: int) -> Optional[bool]:
+    """Whether a block device is a spinning disk (None if it is not a block device)"""
+    sys_path = Path(f"/sys/dev/block/{os.major(device)}:{os.minor(device)}")
+    # A partition has no queue of its own, it is the one of its disk
+    for queue in (sys_path / "queue", sys_path / ".." / "queue"):
+        try:
+            return (queue / "rotational").read_text().strip() == "1"
+        except OSError:
+            continue
+    return None
+
+
+@lru_cache(maxsize=None)
+def device_kind(device: int) -> str:
+    """HDD, SSD, NETWORK or UNKNOWN for an st_dev"""
+    if not sys.platform.startswith("linux"):
+        return UNKNOWN
+
+    fstype, source = _mounts().get(device, ("", ""))
+    if fstype in NETWORK_FILESYSTEMS or (fstype.startswith("fuse.") and ":" in source):
+        return NETWORK
+    if fstype in MEMORY_FILESYSTEMS:
+        return SSD
+
+    rotational = _rotational(device)
+    if rotational is None and source.startswith("/dev/"):
+        # btrfs, zfs and the like report an anonymous st_dev: look at the mounted block device
+        try:
+            rotational = _rotational(Path(source).stat().st_rdev)
+        except OSError:
+            pass
+    if rotational is None:
+        return UNKNOWN
+    return HDD if rotational else SSD
+
+
+class DeviceLanes:
+    """Runs file tasks in one bounded worker lane per device, all lanes concurrently
+
+    submit() only queues a task and map() keeps up to max_in_flight files queued, so each
+    lane works through its own files: a single HDD is still read sequentially, several
+    disks in parallel. Lanes are created on first use, their size comes from
+    workers[device_kind].
+    """
+
+    def __init__(self, workers: Optional[dict[str, int]] = None, max_in_flight: int = MAX_IN_FLIGHT):
+        self.workers = dict(LANE_WORKERS if workers is None else workers)
+        self.max_in_flight = max(1, max_in_flight)
+        self._lanes: dict[int, ThreadPoolExecutor] = {}
+        # directory -> st_dev: files of a directory are on its device (one stat per directory)
+        self._devices: dict[str, int] = {}
+
+    def device_of(self, file_path) -> int:
+        directory = str(Path(file_path).parent)
+        device = self._devices.get(directory)
+        if device is None:
+            try:
+                device = Path(directory).stat().st_dev
+            except OSError:
+                device = -1
+            self._devices[directory] = device
+        return device
+
+    def submit(self, file_path, fn: Callable, *args, **kwargs) -> Future:
+        device = self.device_of(file_path)
+        lane = self._lanes.get(device)
+        if lane is None:
+            kind = device_kind(device) if device >= 0 else UNKNOWN
+            workers = max(1, self.workers.get(kind, 1))
+            lane = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"lane-{device}")
+            self._lanes[device] = lane
+            logger.info(f"I/O lane for device {device} ({kind}): {workers} worker(s)")
+        return lane.submit(fn, *args, **kwargs)
+
+    def map(self, fn: Callable, file_paths: Iterable, *args) -> Iterator[tuple]:
+        """Yield (file_path, fn(file_path, *args)) in the order of file_paths
+
+        At most max_in_flight files are queued at a time: the oldest result is waited for
+        before the next file is submitted.
+        """
+        pending: deque = deque()
+        try:
+            for file_path in file_paths:
+                pending.append((file_path, self.submit(file_path, fn, file_path, *args)))
+                if len(pending) >= self.max_in_flight:
+                    file_path, future = pending.popleft()
+                    yield file_path, future.result()
+
+            while pending:
+                file_path, future = pending.popleft()
+                yield file_path, future.result()
+        finally:
+            # An error or an abandoned scan does not hash the queued files
+            for _, future in pending:
+                future.cancel()
+
+    def shutdown(self, cancel: bool = False) -> None:
+        for lane in self._lanes.values():
+            lane.shutdown(wait=True, cancel_futures=cancel)
+        self._lanes.clear()
+
+    def __enter__(self) -> "DeviceLanes":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown(cancel=exc_type is not None)
@@ -0,0 +1,23 @@
+import os
+import time
+from pathlib import Path
+
+# Переменная окружения с путем к файлу, в который записывается момент показа первого окна
+STARTUP_PROBE_ENV = "MAV_UTILS_STARTUP_PROBE"
+
+
+def report_first_window(root):
+    """Report time-to-first-window and exit when the startup probe is enabled
+
+    Used by scripts/measure_startup.py: the timestamp is written as soon as the
+    Tk event loop becomes idle with the first window shown, then the process exits.
+    """
+    probe_path = os.environ.get(STARTUP_PROBE_ENV)
+    if not probe_path:
+        return
+
+    def write_probe():
+        Path(probe_path).write_text(f"{time.time():.6f}", encoding="utf-8")
+        os._exit(0)
+
+    root.after(0, write_probe)
@@ -0,0 +1,348 @@
+"""Directory change watching: inotify on Linux (through ctypes), polling elsewhere
+
+Raw events are debounced: a created or modified file is reported only after it
+has produced no events and kept the same size and mtime for `settle` seconds,
+so files that are still being copied are not picked up half-written.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from src.utils.files import iter_files
+
+# Event kinds
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+# Events were lost (inotify queue overflow): the consumer has to reconcile the whole tree
+RESCAN = "rescan"
+
+# inotify flags (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass(frozen=True)
+class FileEvent:
+    """A settled change of a file (or directory, for deletions and rescans)"""
+
+    kind: str
+    path: str
+    is_dir: bool = False
+
+
+class _PollingBackend:
+    """Detects changes by comparing (size, mtime) snapshots of the tree"""
+
+    def __init__(self, directory: str, recursive: bool, extensions: Optional[tuple[str, ...]], interval: float):
+        self.directory = directory
+        self.recursive = recursive
+        self.extensions = extensions
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _take_snapshot(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for path in iter_files(self.directory, self.extensions, self.recursive):
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout: float) -> list[FileEvent]:
+        delay = self._next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return []
+        if delay > 0:
+            time.sleep(delay)
+        self._next_poll = time.monotonic() + self.interval
+
+        previous, self._snapshot = self._snapshot, self._take_snapshot()
+        events = [FileEvent(DELETED, path) for path in previous if path not in self._snapshot]
+        for path, signature in self._snapshot.items():
+            if path not in previous:
+                events.append(FileEvent(CREATED, path))
+            elif previous[path] != signature:
+                events.append(FileEvent(MODIFIED, path))
+        return events
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyBackend:
+    """Linux inotify through libc, one watch per directory"""
+
+    def __init__(self, directory: str, recursive: bool):
+        self.recursive = recursive
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: dict[int, str] = {}
+        try:
+            self._add_tree(directory)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK | IN_ONLYDIR)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(error, f"inotify_add_watch failed for {directory}: {os.strerror(error)}")
+        self._watches[wd] = directory
+
+    def _add_tree(self, directory: str) -> list[str]:
+        """Watch a directory (and its subdirectories), return the files already in it"""
+        self._add_watch(directory)
+        files = []
+        if not self.recursive:
+            return files
+
+        for root, subdirs, names in os.walk(directory):
+            for name in subdirs:
+                self._add_watch(str(Path(root) / name))
+            files.extend(str(Path(root) / name) for name in names)
+        return files
+
+    def read(self, timeout: float) -> list[FileEvent]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+
+        events = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + _EVENT_HEADER.size : offset + _EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += _EVENT_HEADER.size + length
+                events.extend(self._translate(wd, mask, os.fsdecode(name)))
+        return events
+
+    def _translate(self, wd: int, mask: int, name: str) -> list[FileEvent]:
+        if mask & IN_Q_OVERFLOW:
+            return [FileEvent(RESCAN, "", is_dir=True)]
+        if mask & IN_IGNORED:
+            self._watches.pop(wd, None)
+            return []
+
+        directory = self._watches.get(wd)
+        if directory is None or not name:
+            return []
+        path = str(Path(directory) / name)
+
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO) and self.recursive:
+                # Files may have landed in the directory before the watch was added
+                return [FileEvent(CREATED, file) for file in self._add_tree(path)]
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                return [FileEvent(DELETED, path, is_dir=True)]
+            return []
+
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            return [FileEvent(CREATED, path)]
+        if mask & (IN_MODIFY | IN_CLOSE_WRITE):
+            return [FileEvent(MODIFIED, path)]
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+            return [FileEvent(DELETED, path)]
+        return []
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _load_libc():
+    """libc with the inotify functions"""
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError(errno.ENOSYS, "inotify is not available")
+    libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+    return libc
+
+
+@dataclass
+class _Pending:
+    """A file with unsettled changes"""
+
+    kind: str
+    last_event: float
+    signature: Optional[tuple[int, int]] = None
+    is_dir: bool = False
+
+
+class DirectoryWatcher:
+    """Watches a directory for new, changed and deleted files
+
+    inotify is used on Linux; elsewhere, on failure (e.g. the watch limit is
+    reached) or with use_inotify=False the tree is polled every poll_interval
+    seconds. Polling is the only option for network shares, where changes made
+    by other machines produce no local events.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        recursive: bool = False,
+        extensions: Optional[tuple[str, ...]] = None,
+        settle: float = 2.0,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+        report_existing: bool = False,
+    ):
+        self.directory = str(directory)
+        self.recursive = recursive
+        self.extensions = extensions
+        self.settle = settle
+        self._pending: dict[str, _Pending] = {}
+
+        self._backend = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._backend = _InotifyBackend(self.directory, recursive)
+            except OSError as e:
+                logger.warning(f"inotify unavailable for {self.directory} ({e}), falling back to polling")
+        if self._backend is None:
+            self._backend = _PollingBackend(self.directory, recursive, extensions, poll_interval)
+
+        if report_existing:
+            # Existing files go through the same settle check as new ones
+            now = time.monotonic()
+            for path in iter_files(self.directory, extensions, recursive):
+                self._pending[path] = _Pending(CREATED, now)
+
+    @property
+    def backend(self) -> str:
+        """Name of the change detection backend"""
+        return "inotify" if isinstance(self._backend, _InotifyBackend) else "polling"
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._backend.close()
+
+    def iter_batches(
+        self, stop_event: Optional[threading.Event] = None, tick: float = 0.5
+    ) -> Iterator[list[FileEvent]]:
+        """Yield lists of settled events until stop_event is set"""
+        while stop_event is None or not stop_event.is_set():
+            batch = self.poll(tick)
+            if batch:
+                yield batch
+
+    def poll(self, timeout: float) -> list[FileEvent]:
+        """Wait up to timeout seconds for changes and return the settled ones (possibly none)"""
+        for event in self._backend.read(timeout):
+            self._add(event)
+        return self._collect()
+
+    def _add(self, event: FileEvent) -> None:
+        """Merge a raw event into the pending changes"""
+        if event.kind == RESCAN:
+            self._pending.clear()
+            self._pending[""] = _Pending(RESCAN, 0.0)
+            return
+        if event.is_dir:
+            # Pending changes inside a deleted directory are moot
+            prefix = event.path + os.sep
+            for path in [path for path in self._pending if path.startswith(prefix)]:
+                del self._pending[path]
+            self._pending[event.path] = _Pending(DELETED, 0.0, is_dir=True)
+            return
+        if self.extensions is not None and not event.path.lower().endswith(self.extensions):
+            return
+
+        now = time.monotonic()
+        pending = self._pending.get(event.path)
+        if event.kind == DELETED:
+            if pending is not None and pending.kind == CREATED:
+                # Created and removed before it settled: nothing to report
+                del self._pending[event.path]
+            else:
+                self._pending[event.path] = _Pending(DELETED, 0.0)
+        elif pending is None:
+            self._pending[event.path] = _Pending(event.kind, now)
+        else:
+            if pending.kind == DELETED:
+                pending.kind = MODIFIED
+            pending.last_event = now
+
+    def _collect(self) -> list[FileEvent]:
+        """Take the settled changes out of the pending ones"""
+        now = time.monotonic()
+        batch = []
+        for path, pending in list(self._pending.items()):
+            if pending.kind == RESCAN:
+                batch.append(FileEvent(RESCAN, self.directory, is_dir=True))
+                del self._pending[path]
+                continue
+            if pending.kind == DELETED:
+                batch.append(FileEvent(DELETED, path, is_dir=pending.is_dir))
+                del self._pending[path]
+                continue
+            if now - pending.last_event < self.settle:
+                continue
+
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                if pending.kind != CREATED:
+                    batch.append(FileEvent(DELETED, path))
+                del self._pending[path]
+                continue
+
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if signature != pending.signature:
+                # Still changing (e.g. a copy over the network that raises no events): keep waiting
+                pending.signature = signature
+                pending.last_event = now
+                continue
+
+            batch.append(FileEvent(pending.kind, path))
+            del self._pending[path]
+        return batch